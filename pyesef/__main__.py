@@ -4,7 +4,19 @@ import argparse
 
 from pyesef import __version__
 from pyesef.download import download_packages
+from pyesef.download.api_extractor import NORDIC_COUNTRY_LIST, FilingFilter
+from pyesef.download.archive_store import ArchiveStore
+from pyesef.download.benchmark import benchmark_download
+from pyesef.download.catalog import FilingCatalog
+from pyesef.download.downloader import DOWNLOAD_MAX_WORKERS
+from pyesef.download.mirror import MIRROR_PORT, run_mirror
+from pyesef.download.pipeline import run_pipeline
+from pyesef.download.slim_archive import slim_store
 from pyesef.parse_xbrl_file import ReadFiling, UpdateStatementDefinitionJson
+from pyesef.parse_xbrl_file.benchmark import benchmark_profiles
+from pyesef.parse_xbrl_file.common import ExtractionEngine
+from pyesef.parse_xbrl_file.ledger import ProcessingLedger
+from pyesef.parse_xbrl_file.triage import TriageCache
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Handle XBRL files.")
@@ -27,14 +39,166 @@ if __name__ == "__main__":
         action="store_true",
         help="Update statement definitions",
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes to use when exporting filings",
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=DOWNLOAD_MAX_WORKERS,
+        help="Number of packages to download at the same time",
+    )
+    parser.add_argument(
+        "--base-url",
+        help="Download from a mirror at this URL instead of filings.xbrl.org",
+    )
+    parser.add_argument(
+        "--mirror",
+        type=int,
+        nargs="?",
+        const=MIRROR_PORT,
+        metavar="PORT",
+        help=(
+            f"Serve the downloaded packages and the catalog to other nodes, on port "
+            f"{MIRROR_PORT} by default"
+        ),
+    )
+    parser.add_argument(
+        "--country",
+        action="append",
+        help="Download the filings of a country, may be repeated (default: Nordics)",
+    )
+    parser.add_argument(
+        "--lei",
+        action="append",
+        help="Download the filings of an LEI code, may be repeated",
+    )
+    parser.add_argument(
+        "--period-end",
+        help="Download the filings of a period end date, or of a year like 2023",
+    )
+    parser.add_argument(
+        "--verify-archives",
+        action="store_true",
+        help=(
+            "Check the CRC of every stored package, in the background when "
+            "downloading"
+        ),
+    )
+    parser.add_argument(
+        "--slim",
+        action="store_true",
+        help=(
+            "Keep only the files XBRL needs of each package, as they download or, "
+            "without -d or -p, of the stored packages"
+        ),
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Keep the Arelle session warm between filings when exporting",
+    )
+    parser.add_argument(
+        "--no-validate",
+        action="store_true",
+        help="Export without running the ESEF disclosure system checks",
+    )
+    parser.add_argument(
+        "--engine",
+        type=ExtractionEngine,
+        choices=list(ExtractionEngine),
+        default=ExtractionEngine.ARELLE,
+        help=(
+            "Engine used to extract facts when exporting, json also downloads the "
+            "xBRL-JSON reports"
+        ),
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Parse filings again that failed in a way that may be transient",
+    )
+    parser.add_argument(
+        "--from-catalog",
+        action="store_true",
+        help="Export the downloaded filings in the catalog that aren't parsed yet",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Time loading all filings with and without ESEF validation",
+    )
+    parser.add_argument(
+        "--benchmark-download",
+        action="store_true",
+        help="Time crawling and downloading filings from a local stand-in server",
+    )
+    parser.add_argument(
+        "--pipeline",
+        "-p",
+        action="store_true",
+        help="Download and export at the same time, parsing each package as it lands",
+    )
 
     org_args = parser.parse_args()
 
-    if org_args.download:
-        download_packages()
+    filing_filter = FilingFilter(
+        country_list=tuple(org_args.country or NORDIC_COUNTRY_LIST),
+        lei_list=tuple(org_args.lei or ()),
+        period_end=org_args.period_end,
+    )
+
+    if org_args.pipeline:
+        run_pipeline(
+            max_workers=org_args.download_workers,
+            filing_filter=filing_filter,
+            jobs=org_args.jobs,
+            warm_session=org_args.warm,
+            validate=not org_args.no_validate,
+            engine=org_args.engine,
+            retry_failed=org_args.retry_failed,
+            base_url=org_args.base_url,
+            slim=org_args.slim,
+        )
+    elif org_args.download:
+        download_packages(
+            max_workers=org_args.download_workers,
+            verify_in_background=org_args.verify_archives,
+            filing_filter=filing_filter,
+            base_url=org_args.base_url,
+            fetch_json=org_args.engine == ExtractionEngine.JSON,
+            slim=org_args.slim,
+        )
+    else:
+        if org_args.slim:
+            slim_store()
+        if org_args.verify_archives:
+            ArchiveStore().verify_all()
 
-    if org_args.export:
-        ReadFiling(should_move_parsed_file=True)
+    if org_args.export and not org_args.pipeline:
+        ReadFiling(
+            jobs=org_args.jobs,
+            warm_session=org_args.warm,
+            validate=not org_args.no_validate,
+            engine=org_args.engine,
+            ledger=ProcessingLedger(),
+            retry_failed=org_args.retry_failed,
+            catalog=FilingCatalog() if org_args.from_catalog else None,
+            triage_cache=TriageCache(),
+        )
+
+    if org_args.benchmark:
+        benchmark_profiles()
+
+    if org_args.benchmark_download:
+        benchmark_download(max_workers=org_args.download_workers)
 
     if org_args.update:
         UpdateStatementDefinitionJson()
+
+    if org_args.mirror is not None:
+        run_mirror(port=org_args.mirror)
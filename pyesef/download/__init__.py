@@ -2,67 +2,74 @@
 
 from __future__ import annotations
 
-import os
-from pathlib import Path
-import zipfile
-
-import requests
-
-from pyesef.download.api_extractor import api_to_filing_record_list
+from pyesef.download.api_extractor import FilingFilter, api_to_filing_record_list
+from pyesef.download.http_cache import PATH_API_CACHE, HttpCache
 from pyesef.log import LOGGER
-from pyesef.utils.decorators import retry
-
-from .common import Filing
-
 
-def is_valid_zip(file_path: str) -> bool:
-    """Return True if file is a valid ZIP file."""
-    try:
-        with zipfile.ZipFile(file_path, "r") as zip_ref:
-            # Check if the zip file is valid
-            zip_ref.testzip()
-            return True
-    except zipfile.BadZipFile:
-        return False
-
-
-@retry()
-def _download_and_verify_package(filing: Filing) -> None:
+from .archive_store import PATH_STORE, ArchiveStore
+from .catalog import PATH_CATALOG, DownloadState, FilingCatalog
+from .common import PATH_ARCHIVES, in_data_folder, is_valid_zip
+from .downloader import (
+    DOWNLOAD_MAX_WORKERS,
+    HostRateLimiter,
+    PackageDownloader,
+    ThroughputMeter,
+)
+
+__all__ = ["download_packages", "is_valid_zip"]
+
+
+def download_packages(
+    max_workers: int = DOWNLOAD_MAX_WORKERS,
+    verify_in_background: bool = False,
+    filing_filter: FilingFilter | None = None,
+    *,
+    base_url: str | None = None,
+    data_folder: str | None = None,
+    rate_limiter: HostRateLimiter | None = None,
+    fetch_json: bool = False,
+    slim: bool = False,
+) -> ThroughputMeter:
     """
-    Download a package and store it the archive-folder.
+    Download XBRL-packages from XBRL.org.
 
-    Verify that it's a valid ZIP, or delete the file.
+    The archive, store, catalog and API cache are kept in the project root, or in the
+    data folder if one is given. With fetch_json, the xBRL-JSON reports are downloaded
+    next to the packages, and with slim only the files XBRL needs are kept.
     """
-    Path(filing.download_folder).mkdir(
-        parents=True,
-        exist_ok=True,
+    filing_filter = filing_filter or FilingFilter()
+
+    catalog = FilingCatalog(in_data_folder(PATH_CATALOG, data_folder))
+    catalog.upsert(
+        api_to_filing_record_list(
+            http_cache=HttpCache(in_data_folder(PATH_API_CACHE, data_folder)),
+            filing_filter=filing_filter,
+            base_url=base_url,
+        )
     )
 
-    LOGGER.info(f"Downloading {filing.file_url}")
-
-    # The file already exists, do an early return
-    if os.path.exists(filing.write_location):
-        LOGGER.info(f"File {filing.file_url} already exists, skipping")
-        return
-
-    req = requests.get(filing.file_url, stream=True, timeout=30)
-    with open(filing.write_location, "wb") as _file:
-        for chunk in req.iter_content(chunk_size=2048):
-            _file.write(chunk)
-
-    if not is_valid_zip(filing.write_location):
-        LOGGER.warning(f"{filing.write_location} not a valid zip, deleting")
-        os.remove(filing.write_location)
-
-
-def download_packages() -> None:
-    """Download XBRL-packages from XBRL.org."""
-    data_list = api_to_filing_record_list()
-
-    LOGGER.info(f"{len(data_list)} items found")
-
-    for idx, item in enumerate(data_list):
-        if idx % 10 == 0:
-            LOGGER.info(f"Parsing {idx}/{len(data_list)}")
-
-        _download_and_verify_package(item)
+    data_list = [
+        filing
+        for download_state in (DownloadState.PENDING, DownloadState.FAILED)
+        for filing in catalog.filings(download_state=download_state)
+        if filing_filter.matches(filing)
+    ]
+
+    LOGGER.info(f"{len(catalog)} items in the catalog, {len(data_list)} to download")
+
+    meter = PackageDownloader(
+        max_workers=max_workers,
+        rate_limiter=rate_limiter,
+        archive_store=ArchiveStore(in_data_folder(PATH_STORE, data_folder)),
+        verify_in_background=verify_in_background,
+        catalog=catalog,
+        base_url=base_url,
+        archive_folder=(
+            None if data_folder is None else in_data_folder(PATH_ARCHIVES, data_folder)
+        ),
+        fetch_json=fetch_json,
+        slim=slim,
+    ).download(data_list)
+    catalog.close()
+
+    return meter
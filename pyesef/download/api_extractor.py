@@ -2,83 +2,272 @@
 
 from __future__ import annotations
 
-import json
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from functools import partial
+import hashlib
+from itertools import chain
 import math
-from urllib import request
+from typing import Any
+from urllib.parse import urlencode
 
-from pyesef.download.common import Country, Filing
+import requests
+
+from pyesef.download.common import BASE_URL, Country, Filing, create_session
+from pyesef.download.http_cache import HttpCache, SyncState
 from pyesef.log import LOGGER
+from pyesef.utils.decorators import (
+    NETWORK_BACKOFF,
+    NETWORK_JITTER,
+    is_retryable_error,
+    retry,
+)
+
+# Loads 500 items at a time, the newest first
+API_PAGE_SIZE = 500
+API_SORT = "-date_added"
+API_PATH = (
+    f"api/filings?sort={API_SORT}&page%5Bsize%5D={API_PAGE_SIZE}&page%5Bnumber%5D="
+)
+API_URL = f"{BASE_URL}{API_PATH}"
+
+# Pages are numbered from 1
+API_FIRST_PAGE_NO = 1
+
+# Number of pages fetched at the same time
+API_MAX_CONCURRENT_REQUESTS = 8
+
+API_TIMEOUT = 30
+
+# Pages that fail with a busy or unreachable server are tried again with backoff
+API_ATTEMPTS = 5
+
+NORDIC_COUNTRY_LIST = (
+    Country.DENMARK.value,
+    Country.FINLAND.value,
+    Country.ICELAND.value,
+    Country.NORWAY.value,
+    Country.SWEDEN.value,
+)
+
+# The length of a full date, shorter periods like a year can't be filtered by the API
+PERIOD_END_DATE_LENGTH = len("2023-12-31")
+
 
-# Loads 500 items at a time
-API_URL = "https://filings.xbrl.org/api/filings?page%5Bsize%5D=500&page%5Bnumber%5D="
+@dataclass(frozen=True)
+class FilingFilter:
+    """
+    Select the filings to load from the API.
 
+    Countries and exact period end dates are sent to the API as filter[...]
+    parameters, with one query per country. LEI codes, and periods given as a year or
+    a month, are matched after loading. Every filing is checked against all the
+    conditions, so the result is the same if the API ignores a filter.
+    """
 
-DEBUG_FILTER_LEI_LIST: list[str] = []
+    # No countries means all countries
+    country_list: tuple[str, ...] = NORDIC_COUNTRY_LIST
+    lei_list: tuple[str, ...] = ()
+    # A date, or the start of one like "2023" or "2023-12"
+    period_end: str | None = None
 
+    def query_list(self) -> list[dict[str, str]]:
+        """Return the filter parameters of each query to send to the API."""
+        period_query = (
+            {"filter[period_end]": self.period_end}
+            if self.period_end is not None
+            and len(self.period_end) == PERIOD_END_DATE_LENGTH
+            else {}
+        )
+        if not self.country_list:
+            return [period_query]
+        return [
+            {"filter[country]": country_iso_2, **period_query}
+            for country_iso_2 in self.country_list
+        ]
 
-def api_to_filing_record_list() -> list[Filing]:
-    """Load API data."""
-    filing_list: list[Filing] = []
-    hash_list: list[str] = []
+    def matches(self, filing: Filing) -> bool:
+        """Return True if a filing meets all the conditions."""
+        return (
+            (not self.country_list or filing.country_iso_2 in self.country_list)
+            and (not self.lei_list or filing.lei in self.lei_list)
+            and (
+                self.period_end is None or filing.period_end.startswith(self.period_end)
+            )
+        )
 
-    # Determine number of pages with data
-    with request.urlopen(f"{API_URL}0") as url:
-        data = json.loads(url.read().decode())
-        max_page_no = math.ceil(data["meta"]["count"] / 30)
 
-    page_no = 0
+def _page_url(page_no: int, query: dict[str, str], base_url: str | None) -> str:
+    """Return the URL of a page of filings."""
+    api_url = API_URL if base_url is None else f"{base_url.rstrip('/')}/{API_PATH}"
+    if not query:
+        return f"{api_url}{page_no}"
+    return f"{api_url}{page_no}&{urlencode(query)}"
 
-    while page_no < max_page_no:
-        LOGGER.info(f"Working on page {page_no}")
-        with request.urlopen(f"{API_URL}{page_no}") as url:
-            data = json.loads(url.read().decode())
 
-            # There is no more data, we can return here
-            if len(data["data"]) == 0:
-                LOGGER.info("No data, aborting")
-                return filing_list
+def sync_key(query_list: list[dict[str, str]], base_url: str | None = None) -> str:
+    """Return the key of the sync state of a set of queries."""
+    url_list = [_page_url(API_FIRST_PAGE_NO, query, base_url) for query in query_list]
+    return hashlib.sha256("\n".join(url_list).encode()).hexdigest()[:16]
 
-            for filing in data["data"]:
 
-                attributes = filing["attributes"]
-                country_iso_2 = attributes["country"]
+@retry(
+    num_attempts=API_ATTEMPTS,
+    backoff=NETWORK_BACKOFF,
+    jitter=NETWORK_JITTER,
+    retry_if=is_retryable_error,
+)
+def _fetch_page(
+    session: requests.Session,
+    page_no: int,
+    http_cache: HttpCache | None = None,
+    query: dict[str, str] | None = None,
+    base_url: str | None = None,
+) -> dict[str, Any]:
+    """Fetch a page of filings."""
+    LOGGER.info(f"Working on page {page_no} {query or ''}")
+    url = _page_url(page_no, query or {}, base_url)
+    if http_cache is not None:
+        return http_cache.get_json(session=session, url=url, timeout=API_TIMEOUT)
 
-                # Filter on the Nordics
-                if country_iso_2 not in [
-                    Country.DENMARK.value,
-                    Country.FINLAND.value,
-                    Country.ICELAND.value,
-                    Country.NORWAY.value,
-                    Country.SWEDEN.value,
-                ]:
-                    continue
+    response = session.get(url, timeout=API_TIMEOUT)
+    response.raise_for_status()
+    data: dict[str, Any] = response.json()
+    return data
 
-                relationships = filing["relationships"]
 
-                related_list = str(relationships["entity"]["links"]["related"]).split(
-                    "/"
+def _new_pages(
+    fetch_page: Callable[[int], dict[str, Any]],
+    first_page: dict[str, Any],
+    page_no_range: range,
+    last_sync_state: SyncState,
+) -> Iterator[dict[str, Any]]:
+    """
+    Fetch pages one at a time, up to the first without filings added since a sync.
+
+    The newest filings come first, so the pages after it don't have any either.
+    """
+    page = first_page
+    yield page
+    for page_no in page_no_range:
+        if not last_sync_state.has_new(page["data"]):
+            return
+        page = fetch_page(page_no)
+        yield page
+
+
+def _fetch_pages(
+    max_workers: int,
+    http_cache: HttpCache | None = None,
+    query_list: list[dict[str, str]] | None = None,
+    base_url: str | None = None,
+    last_sync_state: SyncState | None = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Fetch the pages of filings of each query, in page order.
+
+    The number of pages is worked out from the count on the first page. On the first
+    sync the other pages are fetched in parallel, after that only the pages with
+    filings added since the last sync are fetched.
+    """
+    with (
+        create_session(max_workers=max_workers) as session,
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+    ):
+        for query in query_list or [{}]:
+            fetch_page = partial(
+                _fetch_page,
+                session,
+                http_cache=http_cache,
+                query=query,
+                base_url=base_url,
+            )
+            first_page = fetch_page(API_FIRST_PAGE_NO)
+            max_page_no = math.ceil(first_page["meta"]["count"] / API_PAGE_SIZE)
+            page_no_range = range(
+                API_FIRST_PAGE_NO + 1, API_FIRST_PAGE_NO + max_page_no
+            )
+
+            if last_sync_state is None or last_sync_state.is_empty:
+                yield from chain([first_page], executor.map(fetch_page, page_no_range))
+            else:
+                yield from _new_pages(
+                    fetch_page, first_page, page_no_range, last_sync_state
                 )
 
-                lei = related_list[-1]
 
-                # Allow debugging by filtering on the LEI codes in DEBUG_FILTER_LEI_LIST
-                if len(DEBUG_FILTER_LEI_LIST) > 0 and lei not in DEBUG_FILTER_LEI_LIST:
-                    continue
+def iter_filing_records(
+    max_workers: int = API_MAX_CONCURRENT_REQUESTS,
+    http_cache: HttpCache | None = None,
+    filing_filter: FilingFilter | None = None,
+    base_url: str | None = None,
+) -> Iterator[Filing]:
+    """
+    Yield the filings of the API as the pages arrive, the newest first.
+
+    With a HTTP cache, pages that haven't changed since the last run are served from
+    the cache. The newest filing seen is kept for the queries of the filter, and the
+    next sync only reads the pages up to the filings seen before, so it yields the
+    filings added since and the filings of the last page it reads. By default the
+    filings of the Nordic countries are loaded from filings.xbrl.org.
+    """
+    filing_filter = filing_filter or FilingFilter()
+    query_list = filing_filter.query_list()
+    key = sync_key(query_list, base_url)
+    hash_set: set[tuple[str, str]] = set()
+    last_sync_state = (
+        SyncState.load(key, http_cache.cache_folder)
+        if http_cache is not None
+        else SyncState()
+    )
+    sync_state = replace(last_sync_state)
+    new_filing_count = 0
+
+    for data in _fetch_pages(
+        max_workers=max_workers,
+        http_cache=http_cache,
+        query_list=query_list,
+        base_url=base_url,
+        last_sync_state=last_sync_state,
+    ):
+        for filing in data["data"]:
+            new_filing_count += last_sync_state.is_new(filing)
+            sync_state.update(filing)
+
+            filing_record = Filing.from_api(filing)
+
+            # Filter what the API couldn't
+            if not filing_filter.matches(filing_record):
+                continue
 
-                period_end = attributes["period_end"]
+            # Keep the newest filing of each entity and period
+            hash_key = (filing_record.lei, filing_record.period_end)
+            if hash_key not in hash_set:
+                hash_set.add(hash_key)
+                yield filing_record
 
-                hash_key = f"{lei}{period_end}"
-                if hash_key not in hash_list:
-                    filing_list.append(
-                        Filing(
-                            lei=lei,
-                            country_iso_2=attributes["country"],
-                            period_end=period_end,
-                            package_url=attributes["package_url"],
-                        )
-                    )
-                    hash_list.append(hash_key)
+    if http_cache is not None:
+        LOGGER.info(
+            f"Catalog synced, {new_filing_count} new filings, "
+            f"{http_cache.hit_count} pages unchanged and "
+            f"{http_cache.received_bytes} bytes received"
+        )
+        sync_state.save(key, http_cache.cache_folder)
 
-        page_no += 1
 
-    return filing_list
+def api_to_filing_record_list(
+    max_workers: int = API_MAX_CONCURRENT_REQUESTS,
+    http_cache: HttpCache | None = None,
+    filing_filter: FilingFilter | None = None,
+    base_url: str | None = None,
+) -> list[Filing]:
+    """Load API data, see iter_filing_records."""
+    return list(
+        iter_filing_records(
+            max_workers=max_workers,
+            http_cache=http_cache,
+            filing_filter=filing_filter,
+            base_url=base_url,
+        )
+    )
@@ -0,0 +1,115 @@
+"""
+Cut pages of filings the way the filings.xbrl.org API does.
+
+The API is JSON:API: a page is asked for with page[size] and page[number], filtered
+with filter[country] and filter[period_end], and sorted with sort, where a field
+starting with a minus sign is descending. The mirror and the stand-in both answer it.
+"""
+
+from __future__ import annotations
+
+from functools import partial
+import math
+from typing import Any
+
+API_FILINGS_PATH = "/api/filings"
+
+
+class PageQueryError(Exception):
+    """Raised when the page parameters of a request can't be read."""
+
+
+# The filters of the filings API, by the filing attribute they match
+API_FILTER_LIST = ("country", "period_end")
+
+# The fields the filings of the API can be sorted by
+API_SORT_FIELD_LIST = ("date_added", "id")
+
+
+def page_parameters(query: dict[str, list[str]]) -> tuple[int, int]:
+    """
+    Return the size and number of the page a request asks for.
+
+    Page 0 is served as page 1, like the real API. Raises PageQueryError if the size or
+    number isn't a whole number, or the size isn't positive.
+    """
+    try:
+        page_size = int(query.get("page[size]", ["100"])[0])
+        page_no = int(query.get("page[number]", ["1"])[0])
+    except ValueError as exc:
+        raise PageQueryError(f"Page parameters are not whole numbers: {exc}") from exc
+
+    if page_size < 1:
+        raise PageQueryError(f"Page size {page_size} is not positive")
+
+    return page_size, max(page_no, 1)
+
+
+def page_filters(query: dict[str, list[str]]) -> dict[str, str]:
+    """Return the filters of a request, by the filing attribute they match."""
+    return {
+        name: query[f"filter[{name}]"][0]
+        for name in API_FILTER_LIST
+        if f"filter[{name}]" in query
+    }
+
+
+def page_sort(query: dict[str, list[str]]) -> list[tuple[str, bool]]:
+    """
+    Return the fields a request sorts the filings by, and if each is descending.
+
+    Raises PageQueryError for a field the filings can't be sorted by.
+    """
+    sort_list: list[tuple[str, bool]] = []
+    for field in query.get("sort", [""])[0].split(","):
+        if not field:
+            continue
+        name = field.removeprefix("-")
+        if name not in API_SORT_FIELD_LIST:
+            raise PageQueryError(f"Filings can't be sorted by {name}")
+        sort_list.append((name, field.startswith("-")))
+    return sort_list
+
+
+def _sort_value(filing: dict[str, Any], name: str) -> int | str:
+    """Return the value a filing is sorted by."""
+    if name == "id":
+        return int(filing["id"])
+    return str(filing["attributes"][name] or "")
+
+
+def page_body(
+    filing_list: list[dict[str, Any]], count: int, page_size: int
+) -> dict[str, Any]:
+    """Return a page of API filings, out of the given number of matching filings."""
+    return {
+        "meta": {"count": count},
+        "links": {"last": math.ceil(count / page_size)},
+        "data": filing_list,
+    }
+
+
+def api_page(
+    filing_list: list[dict[str, Any]], query: dict[str, list[str]]
+) -> dict[str, Any]:
+    """Return a page of API filings for the parameters of a request, like the API."""
+    page_size, page_no = page_parameters(query)
+    filter_map = page_filters(query)
+
+    filing_list = [
+        filing
+        for filing in filing_list
+        if all(
+            filing["attributes"][name] == value for name, value in filter_map.items()
+        )
+    ]
+    # Sorted by the last field first, the sort is stable
+    for name, is_descending in reversed(page_sort(query)):
+        filing_list = sorted(
+            filing_list, key=partial(_sort_value, name=name), reverse=is_descending
+        )
+
+    first = (page_no - 1) * page_size
+    return page_body(
+        filing_list[first : first + page_size], len(filing_list), page_size
+    )
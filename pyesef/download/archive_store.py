@@ -0,0 +1,180 @@
+"""
+A content-addressed store of downloaded packages.
+
+Packages are stored once by the SHA-256 of their content, and each filing location in
+the archive folder is a hard link to the stored package. A filing that is published
+again under a different URL is therefore neither downloaded nor stored twice.
+
+Downloads are hashed while they are streamed to disk, and checked by reading the
+central directory of the zip only. The full CRC check of every member is left to an
+optional pass, which can run in the background while downloads continue.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import hashlib
+import os
+import shutil
+import zipfile
+
+from pyesef.const import PATH_PROJECT_ROOT
+from pyesef.log import LOGGER
+from pyesef.parse_xbrl_file.ledger import (
+    HASH_CHUNK_SIZE,
+    members_digest,
+    slim_members_digest,
+    slim_original_sha256,
+)
+
+PATH_STORE = os.path.abspath(os.path.join(PATH_PROJECT_ROOT, "store"))
+
+FILE_ENDING_ZIP = ".zip"
+
+
+def sha256_of_file(file_path: str) -> hashlib._Hash:
+    """Return a SHA-256 object fed with the content of a file, to continue hashing."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256
+
+
+def has_valid_central_directory(file_path: str) -> bool:
+    """
+    Return True if the central directory of a zip file is sound.
+
+    Only the central directory is read: it must list at least one member, and every
+    member must fit inside the file.
+    """
+    try:
+        file_size = os.path.getsize(file_path)
+        with zipfile.ZipFile(file_path, "r") as zip_ref:
+            info_list = zip_ref.infolist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+    return bool(info_list) and all(
+        info.header_offset + info.compress_size <= file_size for info in info_list
+    )
+
+
+def has_original_members(file_path: str) -> bool:
+    """
+    Return True if a slim package lists its members the way its original did.
+
+    The names, sizes and CRCs of the members must match the digest the slim package
+    recorded of them when it was made.
+    """
+    try:
+        with zipfile.ZipFile(file_path, "r") as zip_ref:
+            info_list = [info for info in zip_ref.infolist() if not info.is_dir()]
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+    return slim_members_digest(file_path) == members_digest(info_list)
+
+
+def has_valid_members(file_path: str) -> bool:
+    """Return True if all members of a zip file pass their CRC check."""
+    try:
+        with zipfile.ZipFile(file_path, "r") as zip_ref:
+            return zip_ref.testzip() is None
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+class ArchiveStore:
+    """Store packages by the hash of their content."""
+
+    def __init__(self, store_folder: str = PATH_STORE) -> None:
+        """Init class."""
+        self.store_folder = store_folder
+
+    def package_path(self, sha256: str) -> str:
+        """Return the path of a stored package."""
+        return os.path.join(self.store_folder, sha256[:2], f"{sha256}{FILE_ENDING_ZIP}")
+
+    def has(self, sha256: str | None) -> bool:
+        """Return True if a package is in the store."""
+        return sha256 is not None and os.path.exists(self.package_path(sha256))
+
+    def link(self, sha256: str, write_location: str) -> None:
+        """Make a filing location point to a stored package."""
+        os.makedirs(os.path.dirname(write_location), exist_ok=True)
+        temp_path = f"{write_location}.tmp"
+        try:
+            os.link(self.package_path(sha256), temp_path)
+        except OSError:
+            # Hard links don't work across file systems, fall back to a copy
+            shutil.copyfile(self.package_path(sha256), temp_path)
+        os.replace(temp_path, write_location)
+
+    def add(self, file_path: str, sha256: str, write_location: str) -> None:
+        """Move a downloaded file into the store and link its filing location."""
+        package_path = self.package_path(sha256)
+        if os.path.exists(package_path):
+            LOGGER.info(f"{write_location} is already stored as {sha256}")
+            os.remove(file_path)
+        else:
+            os.makedirs(os.path.dirname(package_path), exist_ok=True)
+            os.replace(file_path, package_path)
+
+        self.link(sha256, write_location)
+
+    def sha256_list(self) -> list[str]:
+        """Return the hashes of all stored packages."""
+        if not os.path.isdir(self.store_folder):
+            return []
+
+        return sorted(
+            file.removesuffix(FILE_ENDING_ZIP)
+            for prefix in os.listdir(self.store_folder)
+            if os.path.isdir(os.path.join(self.store_folder, prefix))
+            for file in os.listdir(os.path.join(self.store_folder, prefix))
+            if file.endswith(FILE_ENDING_ZIP)
+        )
+
+    def verify(self, sha256: str) -> bool:
+        """
+        Check the content hash and the CRC of every member of a stored package.
+
+        A slim package can't be checked against the hash of the package it was made
+        from. It must name it, and its members must match those it kept of it.
+        """
+        package_path = self.package_path(sha256)
+        original_sha256 = slim_original_sha256(package_path)
+        if original_sha256 is None:
+            is_valid = sha256_of_file(package_path).hexdigest() == sha256
+        else:
+            is_valid = original_sha256 == sha256 and has_original_members(package_path)
+        is_valid = is_valid and has_valid_members(package_path)
+        if not is_valid:
+            LOGGER.warning(f"Stored package {sha256} is corrupt")
+        return is_valid
+
+    def verify_all(self) -> list[str]:
+        """Check all stored packages and return the hashes of the corrupt ones."""
+        return [sha256 for sha256 in self.sha256_list() if not self.verify(sha256)]
+
+
+class BackgroundVerifier:
+    """Check stored packages in a background thread while downloads continue."""
+
+    def __init__(self, archive_store: ArchiveStore) -> None:
+        """Init class."""
+        self.archive_store = archive_store
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future_list: list[Future[bool]] = []
+
+    def submit(self, sha256: str) -> None:
+        """Queue a stored package for checking."""
+        self._future_list.append(
+            self._executor.submit(self.archive_store.verify, sha256)
+        )
+
+    def wait(self) -> int:
+        """Wait for all checks and return the number of corrupt packages."""
+        self._executor.shutdown(wait=True)
+        return sum(not future.result() for future in self._future_list)
@@ -0,0 +1,99 @@
+"""Benchmark the crawler and the downloader against a local stand-in server."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import tempfile
+import time
+
+from pyesef.log import LOGGER
+
+from . import download_packages
+from .api_extractor import FilingFilter, api_to_filing_record_list
+from .downloader import DOWNLOAD_MAX_WORKERS, HostRateLimiter
+from .stand_in import StandInConfig, serve_stand_in
+
+# The stand-in server is local, so the per-host limit shouldn't be what is measured
+BENCHMARK_REQUESTS_PER_SECOND = 10_000.0
+
+
+@dataclass
+class DownloadBenchmark:
+    """Represent how fast filings were crawled and downloaded."""
+
+    filing_count: int
+    crawl_seconds: float
+    download_count: int
+    failed_count: int
+    download_seconds: float
+    megabytes: float
+
+    @property
+    def crawl_filings_per_second(self) -> float:
+        """Return the filings listed per second by the crawler."""
+        return self.filing_count / self.crawl_seconds if self.crawl_seconds else 0.0
+
+    @property
+    def download_filings_per_second(self) -> float:
+        """Return the packages downloaded per second."""
+        if not self.download_seconds:
+            return 0.0
+        return (self.download_count - self.failed_count) / self.download_seconds
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """Return the download throughput."""
+        return self.megabytes / self.download_seconds if self.download_seconds else 0.0
+
+
+def benchmark_download(
+    config: StandInConfig | None = None,
+    max_workers: int = DOWNLOAD_MAX_WORKERS,
+) -> DownloadBenchmark:
+    """
+    Crawl and download all filings of a stand-in server.
+
+    The packages are downloaded to a temporary data folder, which is removed again.
+    """
+    config = config or StandInConfig()
+    filing_filter = FilingFilter(country_list=config.country_list)
+
+    with serve_stand_in(config) as base_url, tempfile.TemporaryDirectory() as folder:
+        start_time = time.perf_counter()
+        filing_list = api_to_filing_record_list(
+            filing_filter=filing_filter, base_url=base_url
+        )
+        crawl_seconds = time.perf_counter() - start_time
+
+        meter = download_packages(
+            max_workers=max_workers,
+            filing_filter=filing_filter,
+            base_url=base_url,
+            data_folder=folder,
+            rate_limiter=HostRateLimiter(
+                rate=BENCHMARK_REQUESTS_PER_SECOND,
+                capacity=BENCHMARK_REQUESTS_PER_SECOND,
+            ),
+        )
+
+        benchmark = DownloadBenchmark(
+            filing_count=len(filing_list),
+            crawl_seconds=crawl_seconds,
+            download_count=meter.done_count,
+            failed_count=meter.failed_count,
+            download_seconds=meter.elapsed_seconds,
+            megabytes=meter.byte_count / 1_000_000,
+        )
+
+    LOGGER.info(
+        f"Crawled {benchmark.filing_count} filings at "
+        f"{benchmark.crawl_filings_per_second:.1f} filings/s"
+    )
+    LOGGER.info(
+        f"Downloaded {benchmark.download_count - benchmark.failed_count}/"
+        f"{benchmark.download_count} packages at "
+        f"{benchmark.download_filings_per_second:.1f} filings/s and "
+        f"{benchmark.megabytes_per_second:.2f} MB/s"
+    )
+
+    return benchmark
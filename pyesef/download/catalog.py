@@ -0,0 +1,288 @@
+"""
+A local catalog of filings, stored in SQLite.
+
+The catalog holds the API attributes of each filing together with its download and
+parse state, so the downloader and the parser can select the filings to work on with
+an indexed query instead of walking the archive folder. There is one filing per LEI
+and period end, like in the API extractor.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from enum import StrEnum
+import os
+import sqlite3
+from threading import Lock
+from typing import Any
+
+from pyesef.const import PATH_PROJECT_ROOT
+
+from .common import Filing
+
+PATH_CATALOG = os.path.abspath(os.path.join(PATH_PROJECT_ROOT, "catalog.sqlite"))
+
+
+class DownloadState(StrEnum):
+    """Define the download state of a filing."""
+
+    PENDING = "pending"
+    DOWNLOADED = "downloaded"
+    FAILED = "failed"
+
+
+class ParseState(StrEnum):
+    """Define the parse state of a filing."""
+
+    PENDING = "pending"
+    PARSED = "parsed"
+    FAILED = "failed"
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS filing (
+    lei TEXT NOT NULL,
+    period_end TEXT NOT NULL,
+    country_iso_2 TEXT NOT NULL,
+    package_url TEXT NOT NULL,
+    filing_id INTEGER,
+    sha256 TEXT,
+    json_url TEXT,
+    date_added TEXT,
+    error_count INTEGER,
+    warning_count INTEGER,
+    write_location TEXT,
+    download_state TEXT NOT NULL DEFAULT 'pending',
+    parse_state TEXT NOT NULL DEFAULT 'pending',
+    PRIMARY KEY (lei, period_end)
+);
+CREATE INDEX IF NOT EXISTS filing_country_period
+    ON filing (country_iso_2, period_end);
+CREATE INDEX IF NOT EXISTS filing_download_state ON filing (download_state);
+CREATE INDEX IF NOT EXISTS filing_parse_state ON filing (parse_state);
+CREATE INDEX IF NOT EXISTS filing_sha256 ON filing (sha256);
+CREATE INDEX IF NOT EXISTS filing_write_location ON filing (write_location);
+"""
+
+# The columns that come from the API, in the order of the Filing fields
+API_COLUMNS = (
+    "country_iso_2",
+    "package_url",
+    "period_end",
+    "lei",
+    "sha256",
+    "filing_id",
+    "json_url",
+    "date_added",
+    "error_count",
+    "warning_count",
+)
+
+# The catalog column of each field the filings of the API can be sorted by
+SORT_COLUMN_BY_FIELD = {"date_added": "date_added", "id": "filing_id"}
+
+# A package published again under a new URL has to be downloaded and parsed again
+UPSERT = f"""
+INSERT INTO filing ({", ".join(API_COLUMNS)})
+VALUES ({", ".join("?" for _ in API_COLUMNS)})
+ON CONFLICT (lei, period_end) DO UPDATE SET
+    download_state = CASE WHEN package_url = excluded.package_url
+        THEN download_state ELSE 'pending' END,
+    parse_state = CASE WHEN package_url = excluded.package_url
+        THEN parse_state ELSE 'pending' END,
+    {", ".join(f"{column} = excluded.{column}" for column in API_COLUMNS)}
+"""
+
+
+class FilingCatalog:
+    """Keep the filings, and how far they have been processed, in SQLite."""
+
+    def __init__(self, catalog_path: str = PATH_CATALOG) -> None:
+        """Init class."""
+        self.catalog_path = catalog_path
+        # The downloader updates the catalog from its worker threads
+        self._lock = Lock()
+        self._connection = sqlite3.connect(catalog_path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the catalog."""
+        self._connection.close()
+
+    def __len__(self) -> int:
+        """Return the number of filings in the catalog."""
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM filing"
+            ).fetchone()
+        return int(count)
+
+    def _execute(self, sql: str, parameters: Iterable[Any] = ()) -> None:
+        """Run a statement that changes the catalog."""
+        with self._lock, self._connection:
+            self._connection.execute(sql, tuple(parameters))
+
+    def upsert(self, filing_list: Iterable[Filing]) -> None:
+        """Add filings to the catalog, or update their API attributes."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                UPSERT,
+                (
+                    tuple(getattr(filing, column) for column in API_COLUMNS)
+                    for filing in filing_list
+                ),
+            )
+
+    def filings(
+        self,
+        *,
+        country_iso_2: str | None = None,
+        year: int | None = None,
+        download_state: DownloadState | None = None,
+        parse_state: ParseState | None = None,
+    ) -> list[Filing]:
+        """Return the filings that match all the given conditions."""
+        condition_list = ["1 = 1"]
+        parameter_list: list[str] = []
+
+        if country_iso_2 is not None:
+            condition_list.append("country_iso_2 = ?")
+            parameter_list.append(country_iso_2)
+        if year is not None:
+            # A range on the text column, so the index can be used
+            condition_list.append("period_end BETWEEN ? AND ?")
+            parameter_list += [f"{year}-01-01", f"{year}-12-31"]
+        if download_state is not None:
+            condition_list.append("download_state = ?")
+            parameter_list.append(download_state)
+        if parse_state is not None:
+            condition_list.append("parse_state = ?")
+            parameter_list.append(parse_state)
+
+        with self._lock:
+            row_list = self._connection.execute(
+                f"SELECT {', '.join(API_COLUMNS)} FROM filing "
+                f"WHERE {' AND '.join(condition_list)} ORDER BY lei, period_end",
+                parameter_list,
+            ).fetchall()
+
+        return [Filing(**dict(row)) for row in row_list]
+
+    def downloaded_page(
+        self,
+        *,
+        limit: int,
+        offset: int,
+        country_iso_2: str | None = None,
+        period_end: str | None = None,
+        sort_list: Iterable[tuple[str, bool]] = (),
+    ) -> tuple[int, list[tuple[Filing, str]]]:
+        """
+        Return a page of the downloaded filings that match the given conditions.
+
+        The filings are sorted by the API fields in the sort list, and whether each is
+        descending, then by LEI and period end. Returns the number of filings that
+        match, and the filings of the page with the location of their package.
+        """
+        condition_list = ["download_state = ?"]
+        parameter_list: list[str | int] = [DownloadState.DOWNLOADED.value]
+
+        if country_iso_2 is not None:
+            condition_list.append("country_iso_2 = ?")
+            parameter_list.append(country_iso_2)
+        if period_end is not None:
+            condition_list.append("period_end = ?")
+            parameter_list.append(period_end)
+
+        where = " AND ".join(condition_list)
+        order_by = ", ".join(
+            [
+                f"{SORT_COLUMN_BY_FIELD[field]} {'DESC' if is_descending else 'ASC'}"
+                for field, is_descending in sort_list
+            ]
+            + ["lei", "period_end"]
+        )
+        with self._lock:
+            (count,) = self._connection.execute(
+                f"SELECT COUNT(*) FROM filing WHERE {where}", parameter_list
+            ).fetchone()
+            # Bounded by the count, a page far past the end can't overflow SQLite
+            row_list = self._connection.execute(
+                f"SELECT {', '.join(API_COLUMNS)}, write_location FROM filing "
+                f"WHERE {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                [*parameter_list, min(limit, count), min(offset, count)],
+            ).fetchall()
+
+        return int(count), [
+            (
+                Filing(**{column: row[column] for column in API_COLUMNS}),
+                row["write_location"],
+            )
+            for row in row_list
+        ]
+
+    def downloaded_file(self, url_path: str) -> sqlite3.Row | None:
+        """
+        Return the downloaded filing with a package or xBRL-JSON URL path.
+
+        The row holds the location and hash of the package, and its URLs.
+        """
+        url_path = url_path.lstrip("/")
+        with self._lock:
+            row: sqlite3.Row | None = self._connection.execute(
+                "SELECT write_location, sha256, package_url, json_url FROM filing "
+                "WHERE download_state = ? "
+                "AND (ltrim(package_url, '/') = ? OR ltrim(json_url, '/') = ?)",
+                [DownloadState.DOWNLOADED.value, url_path, url_path],
+            ).fetchone()
+        return row
+
+    def packages_to_parse(self, retry_failed: bool = False) -> list[sqlite3.Row]:
+        """Return the location, country and hash of downloaded packages to parse."""
+        parse_state_list = [ParseState.PENDING.value]
+        if retry_failed:
+            parse_state_list.append(ParseState.FAILED.value)
+
+        with self._lock:
+            return self._connection.execute(
+                "SELECT write_location, country_iso_2, sha256 FROM filing "
+                "WHERE download_state = ? AND parse_state IN "
+                f"({', '.join('?' for _ in parse_state_list)}) "
+                "ORDER BY write_location",
+                [DownloadState.DOWNLOADED.value, *parse_state_list],
+            ).fetchall()
+
+    def record_download(
+        self, filing: Filing, write_location: str | None, sha256: str | None
+    ) -> None:
+        """Record that a filing was downloaded, or failed to download if no location."""
+        self._execute(
+            "UPDATE filing SET download_state = ?, write_location = ?, "
+            "sha256 = COALESCE(?, sha256) WHERE lei = ? AND period_end = ?",
+            (
+                (
+                    DownloadState.DOWNLOADED
+                    if write_location is not None
+                    else DownloadState.FAILED
+                ).value,
+                write_location,
+                sha256,
+                filing.lei,
+                filing.period_end,
+            ),
+        )
+
+    def record_parse(
+        self, write_location: str, sha256: str | None, is_parsed: bool
+    ) -> None:
+        """Record the outcome of parsing a package, for all filings that share it."""
+        self._execute(
+            "UPDATE filing SET parse_state = ? WHERE write_location = ? OR sha256 = ?",
+            (
+                (ParseState.PARSED if is_parsed else ParseState.FAILED).value,
+                write_location,
+                sha256,
+            ),
+        )
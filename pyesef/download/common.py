@@ -1,14 +1,49 @@
 """Common."""
 
+from __future__ import annotations
+
 from dataclasses import dataclass
 from enum import StrEnum
 import os
+from typing import Any
+import zipfile
+
+import requests
+from requests.adapters import HTTPAdapter
 
+from pyesef.const import PATH_PROJECT_ROOT
 from pyesef.parse_xbrl_file.read_and_save_filings import PATH_ARCHIVES
 
 BASE_URL = "https://filings.xbrl.org/"
 
 
+def in_data_folder(path: str, data_folder: str | None) -> str:
+    """Move a path below the project root to a data folder, if one is given."""
+    if data_folder is None:
+        return path
+    return os.path.join(data_folder, os.path.relpath(path, PATH_PROJECT_ROOT))
+
+
+def create_session(max_workers: int) -> requests.Session:
+    """Create a session that keeps a connection open for each worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def is_valid_zip(file_path: str) -> bool:
+    """Return True if file is a valid ZIP file."""
+    try:
+        with zipfile.ZipFile(file_path, "r") as zip_ref:
+            # Check if the zip file is valid
+            zip_ref.testzip()
+            return True
+    except zipfile.BadZipFile:
+        return False
+
+
 class Country(StrEnum):
     """Representation of different countries."""
 
@@ -27,11 +62,74 @@ class Filing:
     package_url: str
     period_end: str
     lei: str
+    # The SHA-256 of the package, as reported by the API
+    sha256: str | None = None
+    filing_id: int | None = None
+    json_url: str | None = None
+    date_added: str | None = None
+    error_count: int | None = None
+    warning_count: int | None = None
+
+    @classmethod
+    def from_api(cls, filing: dict[str, Any]) -> Filing:
+        """Create a filing from an item of the API."""
+        attributes = filing["attributes"]
+        related_list = str(filing["relationships"]["entity"]["links"]["related"]).split(
+            "/"
+        )
+
+        return cls(
+            country_iso_2=attributes["country"],
+            package_url=attributes["package_url"],
+            period_end=attributes["period_end"],
+            lei=related_list[-1],
+            sha256=attributes.get("sha256"),
+            filing_id=int(filing["id"]),
+            json_url=attributes.get("json_url"),
+            date_added=attributes.get("date_added"),
+            error_count=attributes.get("error_count"),
+            warning_count=attributes.get("warning_count"),
+        )
+
+    def to_api(self) -> dict[str, Any]:
+        """Return the filing as an item of the API."""
+        return {
+            "type": "filing",
+            "id": str(self.filing_id),
+            "attributes": {
+                "country": self.country_iso_2,
+                "package_url": self.package_url,
+                "period_end": self.period_end,
+                "sha256": self.sha256,
+                "json_url": self.json_url,
+                "date_added": self.date_added,
+                "error_count": self.error_count,
+                "warning_count": self.warning_count,
+            },
+            "relationships": {
+                "entity": {"links": {"related": f"/api/entities/{self.lei}"}}
+            },
+        }
+
+    def file_url_at(self, base_url: str) -> str:
+        """Return the file URL on a server."""
+        return f"{base_url.rstrip('/')}/{self.package_url.lstrip('/')}"
 
     @property
     def file_url(self) -> str:
         """Return file URL."""
-        return f"{BASE_URL}/{self.package_url}"
+        return self.file_url_at(BASE_URL)
+
+    def json_file_url_at(self, base_url: str) -> str | None:
+        """Return the URL of the xBRL-JSON report on a server, if there is one."""
+        if self.json_url is None:
+            return None
+        return f"{base_url.rstrip('/')}/{self.json_url.lstrip('/')}"
+
+    @property
+    def json_file_url(self) -> str | None:
+        """Return the URL of the xBRL-JSON report, if there is one."""
+        return self.json_file_url_at(BASE_URL)
 
     @property
     def download_folder(self) -> str:
@@ -50,7 +148,12 @@ class Filing:
     @property
     def write_location(self) -> str:
         """Return file write location."""
+        return self.write_location_in(PATH_ARCHIVES)
+
+    def write_location_in(self, archive_folder: str) -> str:
+        """Return the file write location in an archive folder."""
         return os.path.join(
-            self.download_folder,
+            archive_folder,
+            self.country_iso_2,
             self.file_name,
         )
@@ -0,0 +1,633 @@
+"""Download packages in parallel over a shared session."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent import futures
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+import hashlib
+import json
+import os
+from pathlib import Path
+from threading import Lock
+import time
+from typing import cast
+from urllib.parse import urlsplit
+
+import requests
+
+from pyesef.log import LOGGER
+from pyesef.parse_xbrl_file.ledger import slim_original_sha256
+from pyesef.parse_xbrl_file.read_xbrl_json import json_report_path
+from pyesef.utils.decorators import (
+    NETWORK_BACKOFF,
+    NETWORK_JITTER,
+    CircuitBreaker,
+    RetryStats,
+    is_retryable_error,
+    retry,
+)
+
+from .archive_store import (
+    ArchiveStore,
+    BackgroundVerifier,
+    has_valid_central_directory,
+    sha256_of_file,
+)
+from .catalog import FilingCatalog
+from .common import Filing, create_session
+from .slim_archive import slim_package
+
+# Number of packages downloaded at the same time
+DOWNLOAD_MAX_WORKERS = 4
+
+# Read the response in 64 KB chunks and write through an 8 MB buffer. A dropped
+# connection loses the chunk being read, so the reads are kept small
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+
+DOWNLOAD_TIMEOUT = 30
+
+# An interrupted download is resumed where it stopped, so allow a few more attempts
+DOWNLOAD_ATTEMPTS = 5
+
+HTTP_STATUS_PARTIAL_CONTENT = 206
+HTTP_STATUS_RANGE_NOT_SATISFIABLE = 416
+
+# Requests started per second against each host, and the burst allowed
+HOST_REQUESTS_PER_SECOND = 2.0
+HOST_BURST = 4
+
+# Seconds between throughput reports
+THROUGHPUT_REPORT_INTERVAL = 10.0
+
+
+class TokenBucket:
+    """Limit how often something may happen, while allowing short bursts."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Init class."""
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated_at = clock()
+        self._lock = Lock()
+
+    def _take(self) -> float:
+        """Take a token, or return the number of seconds until one is available."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        while (wait := self._take()) > 0:
+            self._sleep(wait)
+
+
+class HostRateLimiter:
+    """Keep a token bucket for each host."""
+
+    def __init__(
+        self,
+        rate: float = HOST_REQUESTS_PER_SECOND,
+        capacity: float = HOST_BURST,
+    ) -> None:
+        """Init class."""
+        self.rate = rate
+        self.capacity = capacity
+        self._bucket_by_host: dict[str, TokenBucket] = {}
+        self._lock = Lock()
+
+    def acquire(self, url: str) -> None:
+        """Wait until a request may be sent to the host of a URL."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._bucket_by_host.get(host)
+            if bucket is None:
+                bucket = TokenBucket(rate=self.rate, capacity=self.capacity)
+                self._bucket_by_host[host] = bucket
+        bucket.acquire()
+
+
+class ThroughputMeter:
+    """Count the packages and bytes downloaded by all workers."""
+
+    def __init__(
+        self,
+        total_count: int | None,
+        report_interval: float = THROUGHPUT_REPORT_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Init class."""
+        self.total_count = total_count
+        self.report_interval = report_interval
+        self._clock = clock
+        self._started_at = clock()
+        self._reported_at = self._started_at
+        self._lock = Lock()
+        self.byte_count = 0
+        self.done_count = 0
+        self.failed_count = 0
+
+    @property
+    def elapsed_seconds(self) -> float:
+        """Return the time since the downloads started."""
+        return self._clock() - self._started_at
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """Return the average throughput so far."""
+        elapsed = self.elapsed_seconds
+        if elapsed <= 0:
+            return 0.0
+        return self.byte_count / 1_000_000 / elapsed
+
+    def add_bytes(self, byte_count: int) -> None:
+        """Count bytes received, and report if it's time to."""
+        with self._lock:
+            self.byte_count += byte_count
+            now = self._clock()
+            if now - self._reported_at < self.report_interval:
+                return
+            self._reported_at = now
+        self.report()
+
+    def package_done(self, failed: bool = False) -> None:
+        """Count a package that is done."""
+        with self._lock:
+            self.done_count += 1
+            self.failed_count += failed
+
+    def report(self) -> None:
+        """Log the aggregate throughput."""
+        total = "?" if self.total_count is None else self.total_count
+        LOGGER.info(
+            f"{self.done_count}/{total} packages, "
+            f"{self.byte_count / 1_000_000:.1f} MB at "
+            f"{self.megabytes_per_second:.2f} MB/s"
+        )
+
+
+def _content_range(content_range: str) -> tuple[int, int | None]:
+    """Return the first byte and the total size of a Content-Range header."""
+    byte_range, _, total = content_range.removeprefix("bytes ").partition("/")
+    return int(byte_range.partition("-")[0]), int(total) if total.isdigit() else None
+
+
+@dataclass
+class PartialDownload:
+    """
+    Represent a download in progress.
+
+    The bytes are written to a .part file and its validators to a state file next to
+    it, so an interrupted download can be resumed with a Range request.
+    """
+
+    part_path: str
+    etag: str | None = None
+    last_modified: str | None = None
+    content_length: int | None = None
+
+    @property
+    def state_path(self) -> str:
+        """Return the path of the state file."""
+        return f"{self.part_path}.json"
+
+    @property
+    def offset(self) -> int:
+        """Return the number of bytes downloaded so far."""
+        try:
+            return os.path.getsize(self.part_path)
+        except OSError:
+            return 0
+
+    @property
+    def is_complete(self) -> bool:
+        """Return True if all bytes have been downloaded."""
+        return self.content_length is not None and self.offset == self.content_length
+
+    @classmethod
+    def load(cls, write_location: str) -> PartialDownload:
+        """Load the download in progress of a file."""
+        part_download = cls(part_path=f"{write_location}.part")
+        try:
+            with open(part_download.state_path, encoding="UTF-8") as state_file:
+                return cls(**json.load(state_file))
+        except (OSError, ValueError, TypeError):
+            # Without validators we can't tell if the bytes are still current
+            part_download.remove()
+            return part_download
+
+    def save(self) -> None:
+        """Save the validators of the download."""
+        with open(self.state_path, "w", encoding="UTF-8") as state_file:
+            json.dump(asdict(self), state_file)
+
+    def remove(self) -> None:
+        """Remove the .part file and its state."""
+        for path in (self.part_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def range_headers(self) -> dict[str, str]:
+        """Return the headers that ask for the rest of the file, if it is unchanged."""
+        # If-Range needs a strong validator
+        validator = (
+            self.etag
+            if self.etag is not None and not self.etag.startswith("W/")
+            else self.last_modified
+        )
+        if self.offset == 0 or validator is None:
+            return {}
+        return {"Range": f"bytes={self.offset}-", "If-Range": validator}
+
+    def start(self, response: requests.Response) -> bool:
+        """
+        Check a response against the download so far.
+
+        Return True if the response continues the .part file, and False if it holds
+        the whole file.
+        """
+        if response.status_code == HTTP_STATUS_PARTIAL_CONTENT:
+            first_byte, total = _content_range(response.headers["Content-Range"])
+            if first_byte != self.offset or total != self.content_length:
+                self.remove()
+                # Retried as a dropped download, which starts over
+                raise ConnectionError(
+                    f"Range {first_byte}-/{total} doesn't match .part file"
+                )
+            return True
+
+        content_length = response.headers.get("Content-Length")
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        self.content_length = int(content_length) if content_length else None
+        self.save()
+        return False
+
+
+class PackageDownloader:
+    """Download packages with a pool of workers sharing a single session."""
+
+    def __init__(
+        self,
+        max_workers: int = DOWNLOAD_MAX_WORKERS,
+        rate_limiter: HostRateLimiter | None = None,
+        *,
+        archive_store: ArchiveStore | None = None,
+        verify_in_background: bool = False,
+        catalog: FilingCatalog | None = None,
+        base_url: str | None = None,
+        archive_folder: str | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        fetch_json: bool = False,
+        slim: bool = False,
+    ) -> None:
+        """
+        Init class.
+
+        Packages are downloaded from filings.xbrl.org to the archive folder, unless
+        another server or folder is given. Failed downloads are retried with backoff,
+        and all workers pause when too many of them fail.
+
+        With fetch_json, the xBRL-JSON report of each filing, if published, is
+        downloaded next to its package. With slim, only the files XBRL needs are kept
+        of each package.
+        """
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.archive_store = archive_store or ArchiveStore()
+        self.verify_in_background = verify_in_background
+        self.catalog = catalog
+        self.base_url = base_url
+        self.archive_folder = archive_folder
+        self.fetch_json = fetch_json
+        self.slim = slim
+        self._verifier: BackgroundVerifier | None = None
+
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.retry_stats = RetryStats()
+        self._download_with_retry = retry(
+            num_attempts=DOWNLOAD_ATTEMPTS,
+            backoff=NETWORK_BACKOFF,
+            jitter=NETWORK_JITTER,
+            retry_if=is_retryable_error,
+            circuit_breaker=self.circuit_breaker,
+            stats=self.retry_stats,
+        )(self._download_and_verify_package)
+        self._download_json_with_retry = retry(
+            num_attempts=DOWNLOAD_ATTEMPTS,
+            backoff=NETWORK_BACKOFF,
+            jitter=NETWORK_JITTER,
+            retry_if=is_retryable_error,
+            circuit_breaker=self.circuit_breaker,
+            stats=self.retry_stats,
+        )(self._download_json)
+
+    def _file_url(self, filing: Filing) -> str:
+        """Return the URL to download a filing from."""
+        if self.base_url is None:
+            return filing.file_url
+        return filing.file_url_at(self.base_url)
+
+    def _json_file_url(self, filing: Filing) -> str | None:
+        """Return the URL to download the xBRL-JSON report of a filing from."""
+        if self.base_url is None:
+            return filing.json_file_url
+        return filing.json_file_url_at(self.base_url)
+
+    def _write_location(self, filing: Filing) -> str:
+        """Return the location to download a filing to."""
+        if self.archive_folder is None:
+            return filing.write_location
+        return filing.write_location_in(self.archive_folder)
+
+    def _download_part(
+        self,
+        session: requests.Session,
+        filing: Filing,
+        part_download: PartialDownload,
+        meter: ThroughputMeter,
+    ) -> str:
+        """Download the rest of a package to its .part file and return its hash."""
+        self.rate_limiter.acquire(self._file_url(filing))
+
+        with session.get(
+            self._file_url(filing),
+            headers=part_download.range_headers(),
+            stream=True,
+            timeout=DOWNLOAD_TIMEOUT,
+        ) as response:
+            if response.status_code == HTTP_STATUS_RANGE_NOT_SATISFIABLE:
+                part_download.remove()
+                # Retried as a dropped download, which starts over
+                raise ConnectionError(
+                    f"Range from byte {part_download.offset} not satisfiable"
+                )
+            response.raise_for_status()
+
+            # Hash while streaming, a resumed download first hashes the bytes so far
+            if part_download.start(response):
+                sha256 = sha256_of_file(part_download.part_path)
+                mode = "ab"
+            else:
+                sha256 = hashlib.sha256()
+                mode = "wb"
+
+            with open(
+                part_download.part_path, mode, buffering=DOWNLOAD_WRITE_BUFFER_SIZE
+            ) as _file:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    _file.write(chunk)
+                    sha256.update(chunk)
+                    meter.add_bytes(len(chunk))
+
+        if part_download.content_length is not None and not part_download.is_complete:
+            raise ConnectionError(
+                f"Download stopped after {part_download.offset} of "
+                f"{part_download.content_length} bytes"
+            )
+
+        return sha256.hexdigest()
+
+    def _download_and_verify_package(
+        self,
+        session: requests.Session,
+        filing: Filing,
+        meter: ThroughputMeter,
+    ) -> str | None:
+        """
+        Download a package and store it the archive-folder, and return its hash.
+
+        The package is downloaded to a .part file, which is resumed where it stopped
+        when retried. Verify that it's a valid ZIP before it is stored, or delete the
+        file.
+        """
+        part_download = PartialDownload.load(self._write_location(filing))
+
+        if part_download.is_complete:
+            sha256 = sha256_of_file(part_download.part_path).hexdigest()
+        else:
+            sha256 = self._download_part(session, filing, part_download, meter)
+
+        if not has_valid_central_directory(part_download.part_path):
+            LOGGER.warning(f"{self._write_location(filing)} not a valid zip, deleting")
+            part_download.remove()
+            return None
+
+        # A slim package from a mirror is known by the package it was made from
+        sha256 = slim_original_sha256(part_download.part_path) or sha256
+
+        if filing.sha256 is not None and filing.sha256 != sha256:
+            LOGGER.warning(
+                f"{self._file_url(filing)} has hash {sha256}, "
+                f"the catalog says {filing.sha256}"
+            )
+
+        if self.slim:
+            slim_package(part_download.part_path, sha256)
+
+        self.archive_store.add(
+            part_download.part_path, sha256, self._write_location(filing)
+        )
+        part_download.remove()
+
+        if self._verifier is not None:
+            self._verifier.submit(sha256)
+
+        return sha256
+
+    def _fetch_package(
+        self, session: requests.Session, filing: Filing, meter: ThroughputMeter
+    ) -> str | None:
+        """Make a package available at its filing location and return its hash."""
+        # The file already exists, do an early return
+        if os.path.exists(self._write_location(filing)):
+            LOGGER.debug(f"File {self._file_url(filing)} already exists, skipping")
+            return filing.sha256
+
+        # The same package was published under another URL
+        if filing.sha256 is not None and self.archive_store.has(filing.sha256):
+            LOGGER.info(f"{self._file_url(filing)} is already stored, linking")
+            self.archive_store.link(filing.sha256, self._write_location(filing))
+            return filing.sha256
+
+        LOGGER.info(f"Downloading {self._file_url(filing)}")
+        return self._download_with_retry(session, filing, meter)
+
+    def _download_json(
+        self, session: requests.Session, filing: Filing, meter: ThroughputMeter
+    ) -> None:
+        """Download the xBRL-JSON report of a filing next to its package."""
+        json_file_url = cast(str, self._json_file_url(filing))
+        json_location = json_report_path(self._write_location(filing))
+        part_path = f"{json_location}.part"
+        self.rate_limiter.acquire(json_file_url)
+
+        byte_count = 0
+        with session.get(
+            json_file_url, stream=True, timeout=DOWNLOAD_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            with open(part_path, "wb") as _file:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    _file.write(chunk)
+                    byte_count += len(chunk)
+                    meter.add_bytes(len(chunk))
+
+        content_length = response.headers.get("Content-Length")
+        if content_length is not None and byte_count < int(content_length):
+            os.remove(part_path)
+            raise ConnectionError(
+                f"Download stopped after {byte_count} of {content_length} bytes"
+            )
+
+        os.replace(part_path, json_location)
+
+    def _fetch_json(
+        self, session: requests.Session, filing: Filing, meter: ThroughputMeter
+    ) -> None:
+        """Download the xBRL-JSON report of a filing, if published and missing."""
+        json_file_url = self._json_file_url(filing)
+        if json_file_url is None or os.path.exists(
+            json_report_path(self._write_location(filing))
+        ):
+            return
+
+        try:
+            self._download_json_with_retry(session, filing, meter)
+        except (OSError, requests.RequestException) as exc:
+            # The package is parsed instead
+            LOGGER.warning(f"Unable to download {json_file_url}: {exc}")
+
+    def _download_package(
+        self, session: requests.Session, filing: Filing, meter: ThroughputMeter
+    ) -> tuple[Filing, str] | None:
+        """
+        Download a package, logging failures instead of stopping the pool.
+
+        Return the filing with the hash of its package and its location, if the
+        package is in place.
+        """
+        Path(os.path.dirname(self._write_location(filing))).mkdir(
+            parents=True,
+            exist_ok=True,
+        )
+
+        sha256 = None
+        try:
+            sha256 = self._fetch_package(session, filing, meter)
+        except (OSError, requests.RequestException) as exc:
+            LOGGER.error(f"Unable to download {self._file_url(filing)}: {exc}")
+
+        is_downloaded = os.path.exists(self._write_location(filing))
+        if is_downloaded and self.fetch_json:
+            self._fetch_json(session, filing, meter)
+        meter.package_done(failed=not is_downloaded)
+
+        if self.catalog is not None:
+            self.catalog.record_download(
+                filing, self._write_location(filing) if is_downloaded else None, sha256
+            )
+
+        if not is_downloaded:
+            return None
+        return replace(filing, sha256=sha256 or filing.sha256), self._write_location(
+            filing
+        )
+
+    def _start(self, total_count: int | None) -> ThroughputMeter:
+        """Prepare a run of downloads and return its meter."""
+        if self.verify_in_background:
+            self._verifier = BackgroundVerifier(self.archive_store)
+        return ThroughputMeter(total_count=total_count)
+
+    def _finish(self, meter: ThroughputMeter) -> None:
+        """Report on a run of downloads, once the background checks are done."""
+        meter.report()
+        LOGGER.info(f"Download retries: {self.retry_stats.summary()}")
+
+        if self._verifier is not None:
+            LOGGER.info(f"{self._verifier.wait()} corrupt packages found")
+            self._verifier = None
+
+    def download(self, filing_list: list[Filing]) -> ThroughputMeter:
+        """Download all packages of a list of filings."""
+        meter = self._start(total_count=len(filing_list))
+
+        with (
+            create_session(max_workers=self.max_workers) as session,
+            ThreadPoolExecutor(max_workers=self.max_workers) as executor,
+        ):
+            for future in [
+                executor.submit(self._download_package, session, filing, meter)
+                for filing in filing_list
+            ]:
+                future.result()
+
+        self._finish(meter)
+        return meter
+
+    def download_iter(
+        self, filing_iter: Iterable[Filing], window: int
+    ) -> Iterator[tuple[Filing, str]]:
+        """
+        Download packages as the filings arrive, and yield each one that is in place.
+
+        The filing is yielded with the hash of its package and its location, in the
+        order the downloads finish. At most window packages are downloading or
+        waiting to be taken, so the downloads never get further ahead of the consumer
+        than that.
+        """
+        meter = self._start(total_count=None)
+
+        with (
+            create_session(max_workers=self.max_workers) as session,
+            ThreadPoolExecutor(max_workers=self.max_workers) as executor,
+        ):
+            pending: set[Future[tuple[Filing, str] | None]] = set()
+            try:
+                for filing in filing_iter:
+                    if len(pending) >= window:
+                        done, pending = futures.wait(
+                            pending, return_when=futures.FIRST_COMPLETED
+                        )
+                        yield from _downloaded(done)
+                    pending.add(
+                        executor.submit(self._download_package, session, filing, meter)
+                    )
+                yield from _downloaded(futures.as_completed(pending))
+            finally:
+                # Downloads that haven't started aren't wanted if the consumer stopped
+                for future in pending:
+                    future.cancel()
+
+        self._finish(meter)
+
+
+def _downloaded(
+    future_iter: Iterable[Future[tuple[Filing, str] | None]],
+) -> Iterator[tuple[Filing, str]]:
+    """Yield the packages of finished downloads that are in place."""
+    for future in future_iter:
+        if (downloaded := future.result()) is not None:
+            yield downloaded
@@ -0,0 +1,172 @@
+"""
+Keep API responses and the catalog sync state between runs.
+
+Each cached response is stored in its own file together with its ETag and
+Last-Modified validators. Requests for a cached URL are sent as conditional
+requests, and a 304 Not Modified response is answered from the cache, so pages that
+haven't changed since the last sync only cost a few hundred bytes.
+
+The sync state is the newest filing seen by the last sync of the same queries. The
+crawl reads the newest filings first and stops at the first page without new ones.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+from threading import Lock
+from typing import Any
+
+import requests
+
+from pyesef.const import PATH_PROJECT_ROOT
+
+PATH_API_CACHE = os.path.abspath(os.path.join(PATH_PROJECT_ROOT, "cache", "api"))
+
+FILE_NAME_SYNC_STATE = "sync_state-{sync_key}.json"
+
+HTTP_STATUS_NOT_MODIFIED = 304
+
+
+def _write_json(file_path: str, data: Any) -> None:
+    """Write a JSON file, replacing any earlier version in one step."""
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "w", encoding="UTF-8") as json_file:
+        json.dump(data, json_file)
+    os.replace(temp_path, file_path)
+
+
+@dataclass
+class CachedResponse:
+    """Represent a cached JSON response."""
+
+    url: str
+    etag: str | None
+    last_modified: str | None
+    data: Any
+
+
+class HttpCache:
+    """Cache JSON responses on disk and revalidate them with conditional requests."""
+
+    def __init__(self, cache_folder: str = PATH_API_CACHE) -> None:
+        """Init class."""
+        self.cache_folder = cache_folder
+        os.makedirs(cache_folder, exist_ok=True)
+        # Number of requests answered from the cache, and of bytes received
+        self._lock = Lock()
+        self.hit_count = 0
+        self.received_bytes = 0
+
+    def _file_path(self, url: str) -> str:
+        """Return the cache file of a URL."""
+        return os.path.join(
+            self.cache_folder, f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+        )
+
+    def load(self, url: str) -> CachedResponse | None:
+        """Return the cached response of a URL."""
+        try:
+            with open(self._file_path(url), encoding="UTF-8") as cache_file:
+                return CachedResponse(**json.load(cache_file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def get_json(
+        self, session: requests.Session, url: str, timeout: int
+    ) -> dict[str, Any]:
+        """Return the JSON of a URL, using the cached copy if it is still valid."""
+        cached_response = self.load(url)
+
+        headers = {}
+        if cached_response is not None:
+            if cached_response.etag:
+                headers["If-None-Match"] = cached_response.etag
+            if cached_response.last_modified:
+                headers["If-Modified-Since"] = cached_response.last_modified
+
+        response = session.get(url, headers=headers, timeout=timeout)
+        is_not_modified = (
+            cached_response is not None
+            and response.status_code == HTTP_STATUS_NOT_MODIFIED
+        )
+        with self._lock:
+            self.received_bytes += len(response.content)
+            self.hit_count += is_not_modified
+
+        if cached_response is not None and is_not_modified:
+            data: dict[str, Any] = cached_response.data
+            return data
+
+        response.raise_for_status()
+        data = response.json()
+
+        _write_json(
+            self._file_path(url),
+            asdict(
+                CachedResponse(
+                    url=url,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    data=data,
+                )
+            ),
+        )
+
+        return data
+
+
+@dataclass
+class SyncState:
+    """Represent how far the filing catalog has been synced, for a set of queries."""
+
+    # The highest filing id and date added seen in the catalog
+    max_filing_id: int = 0
+    max_date_added: str = ""
+
+    @staticmethod
+    def _file_path(cache_folder: str, sync_key: str) -> str:
+        """Return the file of the sync state of a set of queries."""
+        return os.path.join(
+            cache_folder, FILE_NAME_SYNC_STATE.format(sync_key=sync_key)
+        )
+
+    @classmethod
+    def load(cls, sync_key: str, cache_folder: str = PATH_API_CACHE) -> SyncState:
+        """Load the sync state of the last run of a set of queries."""
+        try:
+            with open(
+                cls._file_path(cache_folder, sync_key), encoding="UTF-8"
+            ) as state_file:
+                return cls(**json.load(state_file))
+        except (OSError, ValueError, TypeError):
+            return cls()
+
+    def save(self, sync_key: str, cache_folder: str = PATH_API_CACHE) -> None:
+        """Save the sync state of a set of queries."""
+        os.makedirs(cache_folder, exist_ok=True)
+        _write_json(self._file_path(cache_folder, sync_key), asdict(self))
+
+    @property
+    def is_empty(self) -> bool:
+        """Return True if nothing has been synced yet."""
+        return self.max_filing_id == 0 and not self.max_date_added
+
+    def is_new(self, filing: dict[str, Any]) -> bool:
+        """Return True if a filing was added after the last sync."""
+        return (filing["attributes"].get("date_added") or "") > self.max_date_added or (
+            int(filing["id"]) > self.max_filing_id
+        )
+
+    def has_new(self, filing_list: list[dict[str, Any]]) -> bool:
+        """Return True if any of the filings of a page was added after the last sync."""
+        return any(self.is_new(filing) for filing in filing_list)
+
+    def update(self, filing: dict[str, Any]) -> None:
+        """Move the high-water mark past a filing."""
+        self.max_filing_id = max(self.max_filing_id, int(filing["id"]))
+        self.max_date_added = max(
+            self.max_date_added, filing["attributes"].get("date_added") or ""
+        )
@@ -0,0 +1,359 @@
+"""
+Serve the downloaded packages and the catalog to other nodes.
+
+A mirror answers like filings.xbrl.org for the filings it has downloaded, at the same
+URLs: the API pages come from the catalog, and the packages and xBRL-JSON reports from
+the archive. Other nodes point their downloader at the mirror with --base-url and
+download over the LAN instead.
+
+Files are served with an ETag and a Last-Modified date, and answer Range and If-Range
+requests so interrupted downloads resume. Files and pages answer conditional GETs with
+304 Not Modified, so a node that is up to date transfers almost nothing.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+from threading import Thread
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from pyesef.log import LOGGER
+from pyesef.parse_xbrl_file.ledger import slim_original_sha256
+from pyesef.parse_xbrl_file.read_xbrl_json import json_report_path
+
+from .api_pages import (
+    API_FILINGS_PATH,
+    PageQueryError,
+    page_body,
+    page_filters,
+    page_parameters,
+    page_sort,
+)
+from .archive_store import PATH_STORE, ArchiveStore
+from .catalog import PATH_CATALOG, FilingCatalog
+from .common import in_data_folder
+
+MIRROR_HOST = "0.0.0.0"
+MIRROR_PORT = 8765
+
+# Files are sent in chunks of this size
+MIRROR_CHUNK_SIZE = 1024 * 1024
+
+HTTP_STATUS_OK = 200
+HTTP_STATUS_PARTIAL_CONTENT = 206
+HTTP_STATUS_NOT_MODIFIED = 304
+HTTP_STATUS_BAD_REQUEST = 400
+HTTP_STATUS_NOT_FOUND = 404
+HTTP_STATUS_RANGE_NOT_SATISFIABLE = 416
+
+
+class RangeNotSatisfiableError(Exception):
+    """Raised when a requested range is outside the file."""
+
+
+def parse_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """
+    Return the first and last byte of a single byte range.
+
+    A header that can't be read, or asks for several ranges, is ignored and None is
+    returned, so the whole file is sent.
+    """
+    unit, _, byte_range = range_header.partition("=")
+    first_text, dash, last_text = byte_range.strip().partition("-")
+    if unit.strip() != "bytes" or not dash or "," in byte_range:
+        return None
+
+    try:
+        if first_text == "":
+            # The last bytes of the file
+            first, last = max(size - int(last_text), 0), size - 1
+        else:
+            first = int(first_text)
+            last = min(int(last_text), size - 1) if last_text else size - 1
+    except ValueError:
+        return None
+
+    if first >= size or first > last:
+        raise RangeNotSatisfiableError(range_header)
+
+    return first, last
+
+
+@dataclass
+class MirrorFile:
+    """Represent a file that is served by a mirror."""
+
+    path: str
+    etag: str
+    content_type: str
+
+
+class MirrorData:
+    """Find the filings and files a mirror serves."""
+
+    def __init__(self, catalog: FilingCatalog, archive_store: ArchiveStore) -> None:
+        """Init class."""
+        self.catalog = catalog
+        self.archive_store = archive_store
+
+    def page(self, query: dict[str, list[str]]) -> dict[str, Any]:
+        """
+        Return a page of the downloaded filings.
+
+        Filings are only listed with an xBRL-JSON report if the mirror has it. Raises
+        PageQueryError if the page parameters can't be read.
+        """
+        page_size, page_no = page_parameters(query)
+        filter_map = page_filters(query)
+        count, row_list = self.catalog.downloaded_page(
+            limit=page_size,
+            offset=(page_no - 1) * page_size,
+            country_iso_2=filter_map.get("country"),
+            period_end=filter_map.get("period_end"),
+            sort_list=page_sort(query),
+        )
+
+        filing_list: list[dict[str, Any]] = []
+        for filing, write_location in row_list:
+            item = filing.to_api()
+            if not os.path.exists(json_report_path(write_location)):
+                item["attributes"]["json_url"] = None
+            filing_list.append(item)
+
+        return page_body(filing_list, count, page_size)
+
+    def file(self, url_path: str) -> MirrorFile | None:
+        """Return the package or xBRL-JSON report at a URL path, if downloaded."""
+        row = self.catalog.downloaded_file(url_path)
+        if row is None:
+            return None
+
+        sha256 = row["sha256"]
+        if row["package_url"].lstrip("/") == url_path.lstrip("/"):
+            path = row["write_location"]
+            if not os.path.exists(path) and self.archive_store.has(sha256):
+                path = self.archive_store.package_path(sha256)
+            content_type = "application/zip"
+        else:
+            path = json_report_path(row["write_location"])
+            content_type = "application/json"
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        # The hash names a package, but not the bytes of a slim package made from it.
+        # The size and time tell versions of a slim package or a report apart.
+        if (
+            content_type == "application/zip"
+            and sha256
+            and slim_original_sha256(path) is None
+        ):
+            etag = f'"{sha256}"'
+        else:
+            version = f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+            etag = f'"{hashlib.sha256(version).hexdigest()[:32]}"'
+
+        return MirrorFile(path=path, etag=etag, content_type=content_type)
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    """Answer the requests of other nodes."""
+
+    protocol_version = "HTTP/1.1"
+    data: MirrorData
+
+    def log_message(self, *args: Any) -> None:
+        """Log requests at debug level."""
+        LOGGER.debug(f"Mirror {self.address_string()} {args[0] % args[1:]}")
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Serve a page of filings, a package or an xBRL-JSON report."""
+        self._serve(send_body=True)
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        """Serve the headers of a GET."""
+        self._serve(send_body=False)
+
+    def _serve(self, send_body: bool) -> None:
+        """Serve a request."""
+        url = urlsplit(self.path)
+        if url.path == API_FILINGS_PATH:
+            try:
+                page = self.data.page(parse_qs(url.query))
+            except PageQueryError:
+                self._send_empty(HTTP_STATUS_BAD_REQUEST)
+            else:
+                self._serve_page(page, send_body)
+            return
+
+        mirror_file = self.data.file(unquote(url.path))
+        if mirror_file is None:
+            self._send_empty(HTTP_STATUS_NOT_FOUND)
+        else:
+            self._serve_file(mirror_file, send_body)
+
+    def _send_empty(
+        self, status_code: int, header_map: dict[str, str] | None = None
+    ) -> None:
+        """Send a response without a body."""
+        self.send_response(status_code)
+        for name, value in (header_map or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve_page(self, page: dict[str, Any], send_body: bool) -> None:
+        """Serve a page of filings, or 304 if the client has it already."""
+        body = json.dumps(page).encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+        if self._etag_matches(etag):
+            self._send_empty(HTTP_STATUS_NOT_MODIFIED, {"ETag": etag})
+            return
+
+        self.send_response(HTTP_STATUS_OK)
+        self.send_header("Content-Type", "application/vnd.api+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _etag_matches(self, etag: str) -> bool:
+        """Return True if If-None-Match names the ETag."""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is None:
+            return False
+        tag_list = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tag_list or etag in tag_list
+
+    def _is_not_modified(self, etag: str, mtime: float) -> bool:
+        """Return True if a conditional GET can be answered with 304."""
+        if self.headers.get("If-None-Match") is not None:
+            return self._etag_matches(etag)
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def _requested_range(
+        self, etag: str, last_modified: str, size: int
+    ) -> tuple[int, int] | None:
+        """Return the byte range to send, None for the whole file."""
+        range_header = self.headers.get("Range")
+        if range_header is None:
+            return None
+
+        # A range of a file that has changed since is no use, send all of it
+        if_range = self.headers.get("If-Range")
+        if if_range is not None and if_range not in (etag, last_modified):
+            return None
+
+        return parse_range(range_header, size)
+
+    def _serve_file(self, mirror_file: MirrorFile, send_body: bool) -> None:
+        """Serve a file, or the requested range of it."""
+        stat = os.stat(mirror_file.path)
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        validator_map = {"ETag": mirror_file.etag, "Last-Modified": last_modified}
+
+        if self._is_not_modified(mirror_file.etag, stat.st_mtime):
+            self._send_empty(HTTP_STATUS_NOT_MODIFIED, validator_map)
+            return
+
+        try:
+            byte_range = self._requested_range(
+                mirror_file.etag, last_modified, stat.st_size
+            )
+        except RangeNotSatisfiableError:
+            self._send_empty(
+                HTTP_STATUS_RANGE_NOT_SATISFIABLE,
+                {"Content-Range": f"bytes */{stat.st_size}"},
+            )
+            return
+
+        if byte_range is None:
+            first, last = 0, stat.st_size - 1
+            self.send_response(HTTP_STATUS_OK)
+        else:
+            first, last = byte_range
+            self.send_response(HTTP_STATUS_PARTIAL_CONTENT)
+            self.send_header("Content-Range", f"bytes {first}-{last}/{stat.st_size}")
+
+        self.send_header("Content-Type", mirror_file.content_type)
+        self.send_header("Content-Length", str(last - first + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        for name, value in validator_map.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        if send_body:
+            self._write_file(mirror_file.path, first, last - first + 1)
+
+    def _write_file(self, path: str, first: int, length: int) -> None:
+        """Write part of a file to the response."""
+        with open(path, "rb") as file:
+            file.seek(first)
+            while length > 0 and (chunk := file.read(min(MIRROR_CHUNK_SIZE, length))):
+                self.wfile.write(chunk)
+                length -= len(chunk)
+
+
+def _mirror_server(
+    host: str, port: int, data_folder: str | None
+) -> tuple[ThreadingHTTPServer, FilingCatalog]:
+    """Return a server for the catalog and store in the data folder."""
+    catalog = FilingCatalog(in_data_folder(PATH_CATALOG, data_folder))
+    data = MirrorData(
+        catalog=catalog,
+        archive_store=ArchiveStore(in_data_folder(PATH_STORE, data_folder)),
+    )
+    handler = type("Handler", (MirrorHandler,), {"data": data})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server, catalog
+
+
+@contextmanager
+def serve_mirror(
+    host: str = MIRROR_HOST, port: int = MIRROR_PORT, data_folder: str | None = None
+) -> Iterator[str]:
+    """Run a mirror in the background and yield its base URL."""
+    server, catalog = _mirror_server(host, port, data_folder)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+        catalog.close()
+
+
+def run_mirror(
+    host: str = MIRROR_HOST, port: int = MIRROR_PORT, data_folder: str | None = None
+) -> None:
+    """Run a mirror until interrupted."""
+    server, catalog = _mirror_server(host, port, data_folder)
+    LOGGER.info(f"Serving the archive on http://{host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        LOGGER.info("Mirror stopped")
+    finally:
+        server.server_close()
+        catalog.close()
@@ -0,0 +1,132 @@
+"""
+Crawl, download and parse filings at the same time.
+
+Filings flow from the API pages to the downloader and on to the parser as soon as
+they are available, so a package is parsed while the next ones download. The queues
+between the stages are bounded: the downloader waits when the parser falls behind,
+and never gets more than a few packages ahead of it.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+
+from pyesef.parse_xbrl_file import ParseListData, ReadFiling
+from pyesef.parse_xbrl_file.common import ExtractionEngine
+from pyesef.parse_xbrl_file.ledger import PATH_LEDGER, ProcessingLedger
+from pyesef.parse_xbrl_file.triage import PATH_TRIAGE_CACHE, TriageCache
+
+from .api_extractor import FilingFilter, iter_filing_records
+from .archive_store import PATH_STORE, ArchiveStore
+from .catalog import PATH_CATALOG, FilingCatalog, ParseState
+from .common import PATH_ARCHIVES, Filing, in_data_folder
+from .downloader import DOWNLOAD_MAX_WORKERS, HostRateLimiter, PackageDownloader
+from .http_cache import PATH_API_CACHE, HttpCache
+
+# Packages downloading or downloaded and waiting for the parser, at most
+PIPELINE_QUEUE_SIZE = 8
+
+
+def _catalogued(
+    filing_iter: Iterable[Filing],
+    catalog: FilingCatalog,
+    filing_filter: FilingFilter,
+    retry_failed: bool = False,
+) -> Iterator[Filing]:
+    """
+    Add filings to the catalog as they pass, then yield the catalogued ones to parse.
+
+    A sync only crawls the filings added since the last one. The filings of earlier
+    syncs that haven't been parsed, or failed to parse if they are to be tried again,
+    are taken from the catalog.
+    """
+    key_set: set[tuple[str, str]] = set()
+    for filing in filing_iter:
+        catalog.upsert([filing])
+        key_set.add((filing.lei, filing.period_end))
+        yield filing
+
+    parse_state_list = [ParseState.PENDING]
+    if retry_failed:
+        parse_state_list.append(ParseState.FAILED)
+
+    for parse_state in parse_state_list:
+        for filing in catalog.filings(parse_state=parse_state):
+            if (
+                filing_filter.matches(filing)
+                and (filing.lei, filing.period_end) not in key_set
+            ):
+                yield filing
+
+
+def run_pipeline(
+    max_workers: int = DOWNLOAD_MAX_WORKERS,
+    filing_filter: FilingFilter | None = None,
+    *,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    jobs: int = 1,
+    warm_session: bool = False,
+    validate: bool = True,
+    engine: ExtractionEngine = ExtractionEngine.ARELLE,
+    retry_failed: bool = False,
+    base_url: str | None = None,
+    data_folder: str | None = None,
+    rate_limiter: HostRateLimiter | None = None,
+    slim: bool = False,
+) -> ReadFiling:
+    """
+    Download and parse the filings of the API, parsing each package as it lands.
+
+    The catalog, ledger, triage cache, archive, store and API cache are the same as
+    when downloading and parsing one after the other, in the project root or in the
+    data folder if one is given. The xBRL-JSON reports are downloaded as well for the
+    json engine, and with slim only the files XBRL needs are kept of each package.
+    """
+    filing_filter = filing_filter or FilingFilter()
+    catalog = FilingCatalog(in_data_folder(PATH_CATALOG, data_folder))
+    downloader = PackageDownloader(
+        max_workers=max_workers,
+        rate_limiter=rate_limiter,
+        archive_store=ArchiveStore(in_data_folder(PATH_STORE, data_folder)),
+        catalog=catalog,
+        base_url=base_url,
+        archive_folder=(
+            None if data_folder is None else in_data_folder(PATH_ARCHIVES, data_folder)
+        ),
+        fetch_json=engine == ExtractionEngine.JSON,
+        slim=slim,
+    )
+    filing_iter = _catalogued(
+        iter_filing_records(
+            http_cache=HttpCache(in_data_folder(PATH_API_CACHE, data_folder)),
+            filing_filter=filing_filter,
+            base_url=base_url,
+        ),
+        catalog,
+        filing_filter,
+        retry_failed,
+    )
+
+    read_filing = ReadFiling(
+        jobs=jobs,
+        warm_session=warm_session,
+        validate=validate,
+        engine=engine,
+        ledger=ProcessingLedger(in_data_folder(PATH_LEDGER, data_folder)),
+        retry_failed=retry_failed,
+        catalog=catalog,
+        package_source=(
+            ParseListData(
+                zip_file_path=write_location,
+                language_code=filing.country_iso_2,
+                sha256=filing.sha256,
+            )
+            for filing, write_location in downloader.download_iter(
+                filing_iter, window=queue_size
+            )
+        ),
+        triage_cache=TriageCache(in_data_folder(PATH_TRIAGE_CACHE, data_folder)),
+    )
+    catalog.close()
+
+    return read_filing
@@ -0,0 +1,169 @@
+"""
+Rewrite packages into slim packages with only the files XBRL needs.
+
+Report packages often hold large images, PDFs and fonts that Arelle never reads, but
+that still take disk space and page cache, and are indexed when the package is
+opened. A slim package keeps the inline XBRL reports, the extension taxonomy and
+META-INF, and names the hash of the package it was made from in its zip comment. The
+ledger and the archive store go by that hash, so a package isn't parsed or downloaded
+again because it was slimmed. The comment also holds a digest of the names, sizes and
+CRCs of the kept members as the original package listed them, which the archive store
+checks the slim package against.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+import os
+import zipfile
+
+from pyesef.log import LOGGER
+from pyesef.parse_xbrl_file.ledger import (
+    SLIM_COMMENT_PREFIX,
+    SLIM_MEMBERS_SEPARATOR,
+    members_digest,
+    slim_original_sha256,
+)
+from pyesef.parse_xbrl_file.read_and_save_filings import PATH_ARCHIVES
+from pyesef.parse_xbrl_file.read_inline_xbrl import FILE_ENDINGS_INLINE
+
+from .archive_store import FILE_ENDING_ZIP, ArchiveStore
+
+FILE_ENDINGS_TAXONOMY = (".xsd", ".xml")
+
+
+@dataclass
+class SlimResult:
+    """Represent the outcome of slimming a package."""
+
+    kept_count: int = 0
+    dropped_count: int = 0
+    original_size: int = 0
+    slim_size: int = 0
+
+    @property
+    def saved_bytes(self) -> int:
+        """Return the bytes saved on disk."""
+        return self.original_size - self.slim_size
+
+    def add(self, other: SlimResult) -> None:
+        """Add the outcome of slimming another package."""
+        self.kept_count += other.kept_count
+        self.dropped_count += other.dropped_count
+        self.original_size += other.original_size
+        self.slim_size += other.slim_size
+
+
+def _is_kept(name: str, has_reports_folder: bool) -> bool:
+    """
+    Return True if a member of a package is needed to read it as XBRL.
+
+    Inline XBRL documents are kept from the reports folder, or from anywhere in a
+    package that doesn't have one.
+    """
+    lower_name = name.lower()
+    if "meta-inf/" in f"/{lower_name}" or lower_name.endswith(FILE_ENDINGS_TAXONOMY):
+        return True
+
+    if lower_name.endswith(FILE_ENDINGS_INLINE):
+        return not has_reports_folder or "/reports/" in f"/{lower_name}"
+
+    return False
+
+
+def write_slim_package(zip_file_path: str, slim_path: str, sha256: str) -> SlimResult:
+    """Write a slim copy of a package, made from the package with the given hash."""
+    result = SlimResult(original_size=os.path.getsize(zip_file_path))
+
+    with (
+        zipfile.ZipFile(zip_file_path, "r") as zip_in,
+        zipfile.ZipFile(slim_path, "w", zipfile.ZIP_DEFLATED) as zip_out,
+    ):
+        info_list = [info for info in zip_in.infolist() if not info.is_dir()]
+        has_reports_folder = any(
+            "/reports/" in f"/{info.filename.lower()}" for info in info_list
+        )
+
+        kept_info_list = [
+            info for info in info_list if _is_kept(info.filename, has_reports_folder)
+        ]
+        for info in kept_info_list:
+            zip_out.writestr(info, zip_in.read(info))
+        result.kept_count = len(kept_info_list)
+        result.dropped_count = len(info_list) - len(kept_info_list)
+
+        zip_out.comment = (
+            f"{SLIM_COMMENT_PREFIX}{sha256}"
+            f"{SLIM_MEMBERS_SEPARATOR}{members_digest(kept_info_list)}"
+        ).encode()
+
+    result.slim_size = os.path.getsize(slim_path)
+    return result
+
+
+def slim_package(zip_file_path: str, sha256: str) -> SlimResult:
+    """
+    Slim a package, unless it is slim already.
+
+    The slim package is written next to the package and then replaces it, so the
+    package is never left half written. Filing locations that are hard links to the
+    package keep the original until they are linked again.
+    """
+    if slim_original_sha256(zip_file_path) is not None:
+        return SlimResult()
+
+    slim_path = f"{zip_file_path}.slim"
+    try:
+        result = write_slim_package(zip_file_path, slim_path, sha256)
+        os.replace(slim_path, zip_file_path)
+    finally:
+        if os.path.exists(slim_path):
+            os.remove(slim_path)
+
+    return result
+
+
+def _location_list_by_file_id(archive_folder: str) -> dict[tuple[int, int], list[str]]:
+    """Return the packages in an archive folder, by their device and inode."""
+    location_list_by_file_id: dict[tuple[int, int], list[str]] = defaultdict(list)
+    for folder, _, file_list in os.walk(archive_folder):
+        for file in file_list:
+            if file.endswith(FILE_ENDING_ZIP):
+                location = os.path.join(folder, file)
+                stat = os.stat(location)
+                location_list_by_file_id[(stat.st_dev, stat.st_ino)].append(location)
+    return location_list_by_file_id
+
+
+def slim_store(
+    archive_store: ArchiveStore | None = None, archive_folder: str = PATH_ARCHIVES
+) -> SlimResult:
+    """
+    Slim all packages in the archive store and return the total outcome.
+
+    The filing locations in the archive folder that are hard links to a stored
+    package are linked to its slim package.
+    """
+    archive_store = archive_store or ArchiveStore()
+    location_list_by_file_id = _location_list_by_file_id(archive_folder)
+    total = SlimResult()
+
+    for sha256 in archive_store.sha256_list():
+        package_path = archive_store.package_path(sha256)
+        try:
+            stat = os.stat(package_path)
+            total.add(slim_package(package_path, sha256))
+            for location in location_list_by_file_id.get(
+                (stat.st_dev, stat.st_ino), []
+            ):
+                archive_store.link(sha256, location)
+        except (OSError, zipfile.BadZipFile) as exc:
+            LOGGER.warning(f"Unable to slim stored package {sha256}: {exc}")
+
+    LOGGER.info(
+        f"Dropped {total.dropped_count} files from the stored packages, "
+        f"saving {total.saved_bytes / 1_000_000:.1f} MB"
+    )
+
+    return total
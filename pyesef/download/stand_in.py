@@ -0,0 +1,280 @@
+"""
+A local stand-in for filings.xbrl.org.
+
+The server answers the paginated filings API, including its filters and sort order,
+and serves a synthetic zip package for each filing. Latency, bandwidth, failures and
+throttling can be injected, so the crawler and the downloader can be measured and
+tested without the real service.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import random
+from threading import Lock, Thread
+import time
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+import zipfile
+
+from .api_extractor import NORDIC_COUNTRY_LIST
+from .api_pages import API_FILINGS_PATH, PageQueryError, api_page
+
+# Packages are written in chunks of this size, so bandwidth can be limited
+STAND_IN_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class StandInConfig:
+    """Define the filings a stand-in server holds and how it misbehaves."""
+
+    filing_count: int = 200
+    # Size of the synthetic report in each package, it doesn't compress
+    package_size: int = 256 * 1024
+    country_list: tuple[str, ...] = NORDIC_COUNTRY_LIST
+    # Seconds before each response
+    latency: float = 0.0
+    # Bytes per second for each package transfer, None for no limit
+    bandwidth: float | None = None
+    # Share of package requests answered with 503 Service Unavailable
+    error_rate: float = 0.0
+    # Share of package transfers where the connection is dropped half way
+    drop_rate: float = 0.0
+    # Share of package requests answered with 429 Too Many Requests, and the
+    # seconds asked for in its Retry-After header
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+    seed: int = 0
+
+
+@dataclass
+class StandInPackage:
+    """Represent a package served by the stand-in server."""
+
+    content: bytes
+    etag: str
+    content_type: str = "application/zip"
+
+
+def _synthetic_package(idx: int, config: StandInConfig) -> bytes:
+    """Return a zip package with a random report, the same for each index and seed."""
+    report = random.Random(f"{config.seed}-{idx}").randbytes(config.package_size)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zip_file:
+        zip_file.writestr(f"package-{idx}/reports/report.xhtml", report)
+    return buffer.getvalue()
+
+
+def _synthetic_json_report(lei: str, period_end: str) -> bytes:
+    """Return an xBRL-JSON report with a single fact."""
+    return json.dumps(
+        {
+            "documentInfo": {
+                "documentType": "https://xbrl.org/2021/xbrl-json",
+                "namespaces": {
+                    "ifrs-full": "https://xbrl.ifrs.org/taxonomy/2022-03-24/ifrs-full",
+                    "iso4217": "http://www.xbrl.org/2003/iso4217",
+                    "lei": "http://standards.iso.org/iso/17442",
+                },
+            },
+            "facts": {
+                "f1": {
+                    "value": "1000.0",
+                    "decimals": 0,
+                    "dimensions": {
+                        "concept": "ifrs-full:Revenue",
+                        "entity": f"lei:{lei}",
+                        "period": f"{period_end}T00:00:00",
+                        "unit": "iso4217:EUR",
+                    },
+                }
+            },
+        }
+    ).encode()
+
+
+class StandInData:
+    """Hold the filings and packages of a stand-in server."""
+
+    def __init__(self, config: StandInConfig) -> None:
+        """Init class."""
+        self.config = config
+        self.filing_list: list[dict[str, Any]] = []
+        self.package_by_path: dict[str, StandInPackage] = {}
+        self._random = random.Random(config.seed)
+        self._lock = Lock()
+
+        for idx in range(config.filing_count):
+            content = _synthetic_package(idx, config)
+            sha256 = hashlib.sha256(content).hexdigest()
+            lei = f"STANDIN{idx:013d}"
+            country_iso_2 = config.country_list[idx % len(config.country_list)]
+            period_end = f"{2021 + idx % 3}-12-31"
+            file_url = f"/{lei}/{period_end}/ESEF/{country_iso_2}/0/{lei}-{period_end}"
+            package_url = f"{file_url}.zip"
+            json_url = f"{file_url}.json"
+
+            self.package_by_path[package_url] = StandInPackage(
+                content=content, etag=f'"{sha256[:16]}"'
+            )
+            self.package_by_path[json_url] = StandInPackage(
+                content=_synthetic_json_report(lei, period_end),
+                etag=f'"{sha256[16:32]}"',
+                content_type="application/json",
+            )
+            self.filing_list.append(
+                {
+                    "type": "filing",
+                    "id": str(idx + 1),
+                    "attributes": {
+                        "sha256": sha256,
+                        "json_url": json_url,
+                        "date_added": str(
+                            datetime(2024, 1, 1) + timedelta(seconds=idx)
+                        ),
+                        "package_url": package_url,
+                        "country": country_iso_2,
+                        "period_end": period_end,
+                        "error_count": 0,
+                        "warning_count": 0,
+                    },
+                    "relationships": {
+                        "entity": {"links": {"related": f"/api/entities/{lei}"}}
+                    },
+                }
+            )
+
+    def draw(self, rate: float) -> bool:
+        """Return True with the given probability."""
+        with self._lock:
+            return self._random.random() < rate
+
+    def page(self, query: dict[str, list[str]]) -> dict[str, Any]:
+        """Return a page of filings for the parameters of a request."""
+        return api_page(self.filing_list, query)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answer the requests of a stand-in server."""
+
+    # Keep connections open, like the real service
+    protocol_version = "HTTP/1.1"
+    close_connection: bool
+    data: StandInData
+
+    def log_message(self, *args: Any) -> None:
+        """Keep the log quiet."""
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Serve a page of filings, a package or an xBRL-JSON report."""
+        time.sleep(self.data.config.latency)
+
+        url = urlsplit(self.path)
+        if url.path == API_FILINGS_PATH:
+            self._serve_page(parse_qs(url.query))
+        elif url.path in self.data.package_by_path:
+            self._serve_package(self.data.package_by_path[url.path])
+        else:
+            self._send_empty(404)
+
+    def _send_empty(self, status_code: int) -> None:
+        """Send a response without a body."""
+        self.send_response(status_code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve_page(self, query: dict[str, list[str]]) -> None:
+        """Serve a page of filings, or 304 if the client has it already."""
+        try:
+            body = json.dumps(self.data.page(query)).encode()
+        except PageQueryError:
+            self._send_empty(400)
+            return
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self._send_empty(304)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.api+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve_package(self, package: StandInPackage) -> None:
+        """Serve a package, or the requested range of it."""
+        if self.data.draw(self.data.config.error_rate):
+            self._send_empty(503)
+            return
+        if self.data.draw(self.data.config.throttle_rate):
+            self.send_response(429)
+            self.send_header("Retry-After", str(self.data.config.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        first_byte = 0
+        range_header = self.headers.get("Range")
+        if range_header is not None and self.headers.get("If-Range") == package.etag:
+            first_byte = int(range_header.removeprefix("bytes=").partition("-")[0])
+            if first_byte >= len(package.content):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(package.content)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header(
+                "Content-Range",
+                f"bytes {first_byte}-{len(package.content) - 1}/"
+                f"{len(package.content)}",
+            )
+        else:
+            self.send_response(200)
+
+        body = package.content[first_byte:]
+        self.send_header("Content-Type", package.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", package.etag)
+        self.end_headers()
+
+        if self.data.draw(self.data.config.drop_rate):
+            body = body[: len(body) // 2]
+            self.close_connection = True
+
+        self._write_throttled(body)
+
+    def _write_throttled(self, body: bytes) -> None:
+        """Write a body no faster than the configured bandwidth."""
+        bandwidth = self.data.config.bandwidth
+        for start in range(0, len(body), STAND_IN_CHUNK_SIZE):
+            chunk = body[start : start + STAND_IN_CHUNK_SIZE]
+            self.wfile.write(chunk)
+            if bandwidth is not None:
+                time.sleep(len(chunk) / bandwidth)
+
+
+@contextmanager
+def serve_stand_in(config: StandInConfig | None = None) -> Iterator[str]:
+    """Run a stand-in server on a free local port and yield its base URL."""
+    handler = type(
+        "Handler", (StandInHandler,), {"data": StandInData(config or StandInConfig())}
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
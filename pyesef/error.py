@@ -3,3 +3,7 @@
 
 class PyEsefError(Exception):
     """A general error."""
+
+
+class InvalidPackageError(PyEsefError):
+    """A package that can't be read as an ESEF package."""
@@ -1,6 +1,6 @@
 """Init."""
 
 from .load_statement_definition import UpdateStatementDefinitionJson
-from .read_and_save_filings import ReadFiling
+from .read_and_save_filings import ParseListData, ReadFiling
 
-__all__ = ["ReadFiling", "UpdateStatementDefinitionJson"]
+__all__ = ["ParseListData", "ReadFiling", "UpdateStatementDefinitionJson"]
@@ -0,0 +1,83 @@
+"""
+Read the labels of the base taxonomies that extension taxonomies import.
+
+The lxml and xBRL-JSON engines read the extension taxonomy from the package, which
+only labels the extension concepts. The base taxonomy, like the IFRS taxonomy, isn't
+part of the package. It's loaded with Arelle through its web cache, once per process
+for each schema that is imported, and its concepts are labelled the way Arelle
+labels them when it loads a filing. A schema that can't be loaded is tried again for
+the next filings that import it, up to a few times.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from .common import Controller, load_base_taxonomy
+
+# Times a base taxonomy is loaded before giving up on it for the rest of the run
+BASE_TAXONOMY_MAX_ATTEMPTS = 3
+
+
+def _load_labels(schema_url: str, cntlr: Controller) -> dict[str, str] | None:
+    """Return the standard labels of a base taxonomy, None if it can't be loaded."""
+    model_xbrl = load_base_taxonomy(cntlr, schema_url)
+    try:
+        if model_xbrl.modelDocument is None:
+            return None
+
+        label_by_clark: dict[str, str] = {}
+        for qname, concept in model_xbrl.qnameConcepts.items():
+            label = concept.label(
+                fallbackToQname=False, lang=cntlr.modelManager.defaultLang
+            )
+            if label is not None:
+                label_by_clark[qname.clarkNotation] = label
+        return label_by_clark
+    finally:
+        model_xbrl.close()
+
+
+class BaseTaxonomyLabels:
+    """Keep the labels of the base taxonomy concepts, by the schema defining them."""
+
+    def __init__(self) -> None:
+        """Init class."""
+        self._labels_by_schema: dict[str, dict[str, str]] = {}
+        self._failure_count_by_schema: dict[str, int] = {}
+
+    def get(
+        self, schema_url_list: Iterable[str], cntlr: Controller
+    ) -> dict[str, str] | None:
+        """
+        Return the labels of the concepts of base taxonomy schemas, by clark name.
+
+        Returns None if a schema can't be loaded, in which case a filing should be
+        loaded with Arelle to be labelled. A schema that failed to load, like when the
+        network was down, is loaded again for later filings, until it has failed
+        BASE_TAXONOMY_MAX_ATTEMPTS times.
+        """
+        label_by_clark: dict[str, str] = {}
+        for schema_url in schema_url_list:
+            schema_labels = self._labels(schema_url, cntlr)
+            if schema_labels is None:
+                return None
+            label_by_clark.update(schema_labels)
+
+        return label_by_clark
+
+    def _labels(self, schema_url: str, cntlr: Controller) -> dict[str, str] | None:
+        """Return the labels of a schema, loading it unless it failed too often."""
+        if schema_url in self._labels_by_schema:
+            return self._labels_by_schema[schema_url]
+
+        failure_count = self._failure_count_by_schema.get(schema_url, 0)
+        if failure_count >= BASE_TAXONOMY_MAX_ATTEMPTS:
+            return None
+
+        schema_labels = _load_labels(schema_url, cntlr)
+        if schema_labels is None:
+            self._failure_count_by_schema[schema_url] = failure_count + 1
+        else:
+            self._labels_by_schema[schema_url] = schema_labels
+        return schema_labels
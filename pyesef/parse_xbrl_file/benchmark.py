@@ -0,0 +1,106 @@
+"""Benchmark the extraction profiles."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import StrEnum
+import os
+import statistics
+import time
+
+from pyesef.log import LOGGER
+
+from .common import Controller, add_plugin_modules, load_model_xbrl
+from .read_and_save_filings import FILE_ENDING_ZIP, PATH_ARCHIVES
+
+
+class ExtractionProfile(StrEnum):
+    """Representation of the ways to load a filing."""
+
+    STRICT = "strict"
+    FAST = "fast"
+
+
+@dataclass
+class ProfileTiming:
+    """Represent the time it took to load a filing with a profile."""
+
+    zip_file_path: str
+    profile: ExtractionProfile
+    load_seconds: float
+    fact_count: int
+
+
+def _time_load(
+    zip_file_path: str, cntlr: Controller, profile: ExtractionProfile
+) -> ProfileTiming:
+    """Load a filing and measure the time it took."""
+    start_time = time.perf_counter()
+    model_xbrl = load_model_xbrl(zip_file_path=zip_file_path, cntlr=cntlr)
+    load_seconds = time.perf_counter() - start_time
+
+    fact_count = len(model_xbrl.facts)
+    model_xbrl.close()
+
+    return ProfileTiming(
+        zip_file_path=zip_file_path,
+        profile=profile,
+        load_seconds=load_seconds,
+        fact_count=fact_count,
+    )
+
+
+def benchmark_profiles(filing_folder: str = PATH_ARCHIVES) -> list[ProfileTiming]:
+    """
+    Load every filing in the folder with the strict and the fast profile.
+
+    The profiles take turns for each filing so that both see the same state of the
+    file system and web caches.
+    """
+    zip_file_path_list = sorted(
+        os.path.join(subdir, file)
+        for subdir, _, files in os.walk(filing_folder)
+        for file in files
+        if file.endswith(FILE_ENDING_ZIP)
+    )
+
+    cntlr_by_profile = {
+        ExtractionProfile.FAST: Controller(validate=False),
+        ExtractionProfile.STRICT: Controller(validate=True),
+    }
+    # Plugins can only be added once a controller has set up the plugin manager
+    add_plugin_modules(validate=False)
+    add_plugin_modules(validate=True)
+
+    timing_list: list[ProfileTiming] = []
+    for zip_file_path in zip_file_path_list:
+        for profile, cntlr in cntlr_by_profile.items():
+            try:
+                timing = _time_load(
+                    zip_file_path=zip_file_path, cntlr=cntlr, profile=profile
+                )
+            except OSError as exc:
+                LOGGER.warning(f"Unable to load {zip_file_path}: {exc}")
+                continue
+
+            LOGGER.info(
+                f"{os.path.basename(zip_file_path)} {profile}: "
+                f"{timing.load_seconds:.2f}s, {timing.fact_count} facts"
+            )
+            timing_list.append(timing)
+
+    for cntlr in cntlr_by_profile.values():
+        cntlr.close()
+
+    for profile in ExtractionProfile:
+        load_seconds_list = [
+            timing.load_seconds for timing in timing_list if timing.profile == profile
+        ]
+        if load_seconds_list:
+            LOGGER.info(
+                f"{profile}: {len(load_seconds_list)} filings, "
+                f"mean {statistics.mean(load_seconds_list):.2f}s, "
+                f"median {statistics.median(load_seconds_list):.2f}s per filing"
+            )
+
+    return timing_list
@@ -1,16 +1,22 @@
 """Common functions and constants."""
 
-from dataclasses import dataclass
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
 from datetime import date
 from enum import StrEnum
+import fnmatch
 import fractions
-from typing import Any
+import math
+import re
+from typing import IO, Any
 
 from arelle import FileSource as FileSourceFile, PluginManager
 from arelle.Cntlr import Cntlr
 from arelle.CntlrCmdLine import filesourceEntrypointFiles
 from arelle.FileSource import FileSource
 from arelle.ModelXbrl import ModelXbrl
+import pandas as pd
 
 
 class StatementName(StrEnum):
@@ -22,12 +28,55 @@ class StatementName(StrEnum):
     INCOME_STATEMENT = "IncomeStatement"
 
 
+class ExtractionEngine(StrEnum):
+    """Define the engines that can extract facts from a filing."""
+
+    # Load the filing into an Arelle ModelXbrl
+    ARELLE = "arelle"
+    # Stream the inline XBRL documents with lxml, falling back to Arelle if needed
+    LXML = "lxml"
+    # Read the facts from the xBRL-JSON report next to the package, falling back to
+    # lxml if there is none and to Arelle if needed
+    JSON = "json"
+
+
 def clean_linkrole(link_role: str) -> str:
     """Clean link role."""
     split_link_role = link_role.split("/")
     return split_link_role[-1]
 
 
+# Items that are part of the balance sheet regardless of their link role
+BALANCE_SHEET_XML_NAMES = ("Assets", "EquityAndLiabilities")
+
+# Items representing a total or sub-total
+TOTAL_XML_NAMES = frozenset(
+    [
+        # Cash flow statements
+        "CashFlowsFromUsedInOperationsBeforeChangesInWorkingCapital",
+        "CashFlowsFromUsedInOperatingActivities",
+        "CashFlowsFromUsedInFinancingActivities",
+        "CashFlowsFromUsedInInvestingActivities",
+        "IncreaseDecreaseInCashAndCashEquivalents",
+        "IncreaseDecreaseInCashAndCashEquivalentsBeforeEffectOfExchangeRateChanges",
+        # Balance sheet items
+        "NoncurrentAssets",
+        "CurrentAssets",
+        "Assets",
+        "NoncurrentLiabilities",
+        "CurrentLiabilities",
+        # Removed for now, seems this is not used in a good way in XML-files
+        # "Equity",
+        "EquityAndLiabilities",
+        # Income statement items
+        "ProfitLossFromOperatingActivities",
+        "ProfitLossBeforeTax",
+        "ProfitLoss",
+        "ComprehensiveIncome",
+    ]
+)
+
+
 @dataclass
 class EsefData:
     """Represent ESEF data as a dataclass."""
@@ -71,7 +120,7 @@ class EsefData:
         return (
             self.level_1 == StatementName.BALANCE_SHEET.value
             # We need to catch these separately
-            or self.wider_anchor_or_xml_name in ("Assets", "EquityAndLiabilities")
+            or self.wider_anchor_or_xml_name in BALANCE_SHEET_XML_NAMES
         ) and self.membership is None  # Avoid storing duplicates in the balance sheet
 
     @property
@@ -102,52 +151,280 @@ class EsefData:
     @property
     def is_total(self) -> bool:
         """Return True if representing a total or sub-total."""
-        return self.wider_anchor_or_xml_name in [
-            # Cash flow statements
-            "CashFlowsFromUsedInOperationsBeforeChangesInWorkingCapital",
-            "CashFlowsFromUsedInOperatingActivities",
-            "CashFlowsFromUsedInFinancingActivities",
-            "CashFlowsFromUsedInInvestingActivities",
-            "IncreaseDecreaseInCashAndCashEquivalents",
-            "IncreaseDecreaseInCashAndCashEquivalentsBeforeEffectOfExchangeRateChanges",
-            # Balance sheet items
-            "NoncurrentAssets",
-            "CurrentAssets",
-            "Assets",
-            "NoncurrentLiabilities",
-            "CurrentLiabilities",
-            # Removed for now, seems this is not used in a good way in XML-files
-            # "Equity",
-            "EquityAndLiabilities",
-            # Income statement items
-            "ProfitLossFromOperatingActivities",
-            "ProfitLossBeforeTax",
-            "ProfitLoss",
-            "ComprehensiveIncome",
+        return self.wider_anchor_or_xml_name in TOTAL_XML_NAMES
+
+
+class EsefDataColumns:
+    """
+    Collect ESEF data in one list per column.
+
+    This avoids creating an EsefData and a dict per record when building a
+    dataframe, and the statement flags are worked out for all rows at once.
+    """
+
+    FIELD_NAMES = tuple(field.name for field in fields(EsefData))
+
+    def __init__(self) -> None:
+        """Init class."""
+        self.columns: dict[str, list[Any]] = {name: [] for name in self.FIELD_NAMES}
+
+    def __len__(self) -> int:
+        """Return the number of records."""
+        return len(self.columns["xml_name"])
+
+    def append(self, **record: Any) -> None:
+        """Add a record, with the same fields as EsefData."""
+        for name, column in self.columns.items():
+            column.append(record[name])
+
+    @classmethod
+    def from_data_list(cls, data_list: list[EsefData]) -> EsefDataColumns:
+        """Collect a list of ESEF data."""
+        data_columns = cls()
+        for data in data_list:
+            for name, column in data_columns.columns.items():
+                column.append(getattr(data, name))
+        return data_columns
+
+    def to_data_list(self) -> list[EsefData]:
+        """Return the records as a list of ESEF data."""
+        return [
+            EsefData(**dict(zip(self.FIELD_NAMES, row, strict=True)))
+            for row in zip(*self.columns.values(), strict=True)
         ]
 
+    def to_data_frame(self) -> pd.DataFrame:
+        """Return a dataframe with the records and the EsefData statement flags."""
+        data_frame = pd.DataFrame(self.columns, columns=list(self.FIELD_NAMES))
+
+        level_1 = data_frame["level_1"]
+        wider_anchor_or_xml_name = data_frame["wider_anchor_or_xml_name"]
+
+        data_frame["is_cash_flow"] = level_1 == StatementName.CASH_FLOW.value
+        data_frame["is_balance_sheet"] = (
+            (level_1 == StatementName.BALANCE_SHEET.value)
+            | wider_anchor_or_xml_name.isin(BALANCE_SHEET_XML_NAMES)
+        ) & data_frame["membership"].isna()
+        data_frame["is_income_statement"] = (
+            level_1 == StatementName.INCOME_STATEMENT.value
+        )
+        data_frame["is_changes_in_equity"] = (
+            level_1 == StatementName.CHANGES_EQUITY.value
+        )
+        data_frame["is_other"] = ~(
+            data_frame["is_cash_flow"]
+            | data_frame["is_balance_sheet"]
+            | data_frame["is_income_statement"]
+            | data_frame["is_changes_in_equity"]
+        )
+        data_frame["is_total"] = wider_anchor_or_xml_name.isin(TOTAL_XML_NAMES)
+
+        return data_frame
+
+
+# Base taxonomy documents that are never read when extracting facts. Skipping them
+# in a warm session saves parsing the references for every filing.
+BASE_TAXONOMY_SKIP_LOADING = (
+    "http*://xbrl.ifrs.org/taxonomy/*/ref_*.xml",
+    "http*://xbrl.ifrs.org/taxonomy/*/gre_*.xml",
+)
+
+# The formula linkbases of the base taxonomy hold the ESEF formula checks, so they
+# are only skipped in a warm session that doesn't validate
+BASE_TAXONOMY_FORMULA_LINKBASES = ("http*://www.esma.europa.eu/taxonomy/*-for.xml",)
+
+
+@dataclass
+class Entrypoint:
+    """Represent the documents a filing is loaded from, relative to its package."""
+
+    member_list: list[str]
+    # Inline XBRL documents are loaded together as an inline document set
+    is_inline: bool
+
+    @classmethod
+    def from_arelle(
+        cls, package_url: str, entrypoint: dict[str, Any]
+    ) -> Entrypoint | None:
+        """Return an entrypoint Arelle discovered, None if it isn't in the package."""
+        is_inline = "ixds" in entrypoint
+        if is_inline:
+            file_list = [document["file"] for document in entrypoint["ixds"]]
+        else:
+            file_list = [entrypoint["file"]]
+
+        prefix = f"{package_url}/"
+        if not all(
+            isinstance(file, str) and file.startswith(prefix) for file in file_list
+        ):
+            return None
+
+        return cls(
+            member_list=[file.removeprefix(prefix) for file in file_list],
+            is_inline=is_inline,
+        )
+
+    def to_arelle(
+        self, package_url: str, file_source: FileSource
+    ) -> list[dict[str, Any]]:
+        """Return the entrypoint files of a package, the way Arelle discovers them."""
+        entrypoint_files: list[dict[str, Any]] = [
+            {"file": f"{package_url}/{member}"} for member in self.member_list
+        ]
+
+        if self.is_inline:
+            # Group the documents into an inline document set
+            for plugin_xbrl_method in PluginManager.pluginClassMethods(
+                "InlineDocumentSet.Discovery"
+            ):
+                plugin_xbrl_method(file_source, entrypoint_files)
+
+        return entrypoint_files
+
 
 class Controller(Cntlr):  # type: ignore
     """Controller."""
 
-    def __init__(self) -> None:
+    def __init__(self, warm_session: bool = False, validate: bool = True) -> None:
         """Init controller with logging."""
         super().__init__(logFileName="logToPrint", hasGui=False)
+        # Keep session setup between filings instead of redoing it for each load
+        self.warm_session = warm_session
+        # Run the ESEF disclosure system checks when loading filings
+        self.validate = validate
+        self.is_session_prepared = False
+        # The entrypoint of the last filing loaded
+        self.entrypoint: Entrypoint | None = None
+
+
+def add_plugin_modules(validate: bool = True) -> None:
+    """Add the Arelle plugins needed to read ESEF-files."""
+    if validate:
+        PluginManager.addPluginModule("validate/ESEF")
+    else:
+        # Only the inline document set discovery is needed to find the entrypoints.
+        # The ESEF plugin does nothing unless its disclosure system is selected, so
+        # it's fine if it was added earlier in the process.
+        PluginManager.addPluginModule("inlineXbrlDocumentSet")
+
+    # The plugin methods of each class are cached when first looked up, which the
+    # controller does before plugins are added. Without a reset the ESEF disclosure
+    # system type is unknown, and esef is selected without running its checks.
+    PluginManager.reset()
+
+
+def _prepare_session(cntlr: Controller) -> None:
+    """Prepare the model manager for loading an ESEF filing."""
+    if cntlr.warm_session and cntlr.is_session_prepared:
+        # Forget filings closed since the last load to keep memory flat
+        cntlr.modelManager.loadedModelXbrls = [
+            model_xbrl
+            for model_xbrl in cntlr.modelManager.loadedModelXbrls
+            if not model_xbrl.isClosed
+        ]
+        return
+
+    # Load plugin
+    cntlr.modelManager.validateDisclosureSystem = cntlr.validate
+    if cntlr.validate:
+        cntlr.modelManager.disclosureSystem.select("esef")
+
+    if cntlr.warm_session:
+        skip_pattern_list = list(BASE_TAXONOMY_SKIP_LOADING)
+        if not cntlr.validate:
+            skip_pattern_list.extend(BASE_TAXONOMY_FORMULA_LINKBASES)
+        cntlr.modelManager.skipLoading = re.compile(
+            "|".join(fnmatch.translate(pattern) for pattern in skip_pattern_list)
+        )
+        # The base taxonomy doesn't change during a session, don't recheck the cache
+        cntlr.webCache.maxAgeSeconds = math.inf
+
+    cntlr.is_session_prepared = True
+
+
+def load_base_taxonomy(cntlr: Controller, schema_url: str) -> ModelXbrl:
+    """
+    Load a base taxonomy schema, like that of IFRS, through the web cache.
 
+    A base taxonomy isn't a filing, and the ESEF checks would reject it, so they are
+    turned off while it loads. The caller closes the model.
+    """
+    _prepare_session(cntlr)
 
-def load_model_xbrl(zip_file_path: str, cntlr: Controller) -> ModelXbrl:
-    """Load a ModelXbrl from a file path."""
+    if cntlr.validate:
+        cntlr.modelManager.disclosureSystem.select(None)
     try:
-        file_source: FileSource = FileSourceFile.openFileSource(
+        model_xbrl: ModelXbrl = cntlr.modelManager.load(
+            schema_url, "Loading base taxonomy"
+        )
+    finally:
+        if cntlr.validate:
+            cntlr.modelManager.disclosureSystem.select("esef")
+
+    return model_xbrl
+
+
+def find_entrypoint_files(
+    package_url: str, file_source: FileSource, entrypoint: Entrypoint | None
+) -> list[dict[str, Any]]:
+    """Return the entrypoint files of a package, discovering them if not known."""
+    if entrypoint is None:
+        return filesourceEntrypointFiles(
+            filesource=file_source,
+            entrypointFiles=[{"file": package_url}],
+        )
+
+    # Discovery would have activated the mappings of a taxonomy package
+    if file_source.isArchive and file_source.isTaxonomyPackage:
+        file_source.loadTaxonomyPackageMappings()
+
+    return entrypoint.to_arelle(package_url=package_url, file_source=file_source)
+
+
+def open_package_file_source(
+    zip_file_path: str | IO[bytes], cntlr: Controller
+) -> FileSource:
+    """
+    Open a package as an Arelle file source.
+
+    A package in memory is named by the file name of a FileNamedBytesIO, or else
+    POSTupload.zip, and its documents are read from the stream.
+    """
+    if isinstance(zip_file_path, str):
+        return FileSourceFile.openFileSource(
             zip_file_path,
             cntlr,
             checkIfXmlIsEis=False,
         )
 
+    return FileSourceFile.openFileSource(
+        None,
+        cntlr,
+        sourceZipStream=zip_file_path,
+        checkIfXmlIsEis=False,
+    )
+
+
+def load_model_xbrl(
+    zip_file_path: str | IO[bytes],
+    cntlr: Controller,
+    entrypoint: Entrypoint | None = None,
+) -> ModelXbrl:
+    """
+    Load a ModelXbrl from a file path, or a binary stream of a package in memory.
+
+    A known entrypoint saves discovering it, which identifies every document in the
+    package. The entrypoint that was loaded is kept on the controller.
+    """
+    cntlr.entrypoint = None
+    try:
+        file_source = open_package_file_source(zip_file_path, cntlr)
+        # Documents are selected by their URL in the package
+        package_url = file_source.url
+
         # Find entrypoint files
-        _entrypoint_files = filesourceEntrypointFiles(
-            filesource=file_source,
-            entrypointFiles=[{"file": zip_file_path}],
+        _entrypoint_files = find_entrypoint_files(
+            package_url=package_url, file_source=file_source, entrypoint=entrypoint
         )
 
         # This is required to correctly populate _entrypointFiles
@@ -159,17 +436,18 @@ def load_model_xbrl(zip_file_path: str, cntlr: Controller) -> ModelXbrl:
                 None,
                 file_source,
                 _entrypoint_files,
-                sourceZipStream=None,
+                sourceZipStream=(
+                    None if isinstance(zip_file_path, str) else zip_file_path
+                ),
                 responseZipStream=None,
             )
         _entrypoint = _entrypoint_files[0]
         _entrypoint_file = _entrypoint["file"]
         file_source.select(_entrypoint_file)
         cntlr.entrypointFile = _entrypoint_file
+        cntlr.entrypoint = Entrypoint.from_arelle(package_url, _entrypoint)
 
-        # Load plugin
-        cntlr.modelManager.validateDisclosureSystem = True
-        cntlr.modelManager.disclosureSystem.select("esef")
+        _prepare_session(cntlr)
 
         model_xbrl = cntlr.modelManager.load(
             file_source,
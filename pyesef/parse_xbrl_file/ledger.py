@@ -0,0 +1,262 @@
+"""
+A ledger of the packages that have been processed.
+
+Packages are identified by the SHA-256 of their content, so a package is only parsed
+again if it changes, wherever it is stored. A slim package is identified by the hash
+of the package it was made from, so slimming doesn't make it new. The ledger is a JSON
+lines file where each line records one attempt, the last line for a package wins.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from enum import StrEnum
+import hashlib
+import io
+import json
+import os
+from typing import IO
+import zipfile
+
+from pyesef import __version__
+from pyesef.log import LOGGER
+
+from ..const import PATH_PROJECT_ROOT
+from ..error import InvalidPackageError
+from ..utils.decorators import is_retryable_error
+
+PATH_LEDGER = os.path.abspath(os.path.join(PATH_PROJECT_ROOT, "ledger.jsonl"))
+
+# Read packages in chunks of this size when hashing
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# The zip comment of a slim package names the hash of the package it was made from,
+# and the digest of the members it kept, as they were listed in that package
+SLIM_COMMENT_PREFIX = "pyesef-slim sha256="
+SLIM_MEMBERS_SEPARATOR = " members="
+
+
+class LedgerStatus(StrEnum):
+    """Define the outcome of processing a package."""
+
+    OK = "ok"
+    FAILED = "failed"
+
+
+class FailureClass(StrEnum):
+    """Define the kinds of failure when processing a package."""
+
+    # The package can't be read as an ESEF package, trying again won't help
+    INVALID_PACKAGE = "invalid_package"
+    # The package was read but its content couldn't be parsed
+    PARSE = "parse"
+    # Failures that may go away by themselves, like timeouts or memory errors
+    TRANSIENT = "transient"
+
+
+def classify_failure(exc: BaseException) -> FailureClass:
+    """
+    Return the failure class of an exception, based on its root cause.
+
+    A failure is transient if the root cause would be retried by the download, so
+    other OS errors like a missing or unreadable file are parse failures.
+    """
+    while exc.__cause__ is not None:
+        exc = exc.__cause__
+
+    if isinstance(exc, zipfile.BadZipFile | IndexError | InvalidPackageError):
+        return FailureClass.INVALID_PACKAGE
+
+    if is_retryable_error(exc):
+        return FailureClass.TRANSIENT
+
+    return FailureClass.PARSE
+
+
+def file_sha256(file_path: str) -> str:
+    """Return the SHA-256 of a file's content."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def content_sha256(content: bytes) -> str:
+    """Return the hash of a package in memory, the way it is for a file."""
+    return (
+        slim_original_sha256(io.BytesIO(content)) or hashlib.sha256(content).hexdigest()
+    )
+
+
+def members_digest(info_list: Iterable[zipfile.ZipInfo]) -> str:
+    """Return a digest of the names, sizes and CRCs of members of a zip file."""
+    digest = hashlib.sha256()
+    for info in sorted(info_list, key=lambda info: info.filename):
+        digest.update(f"{info.filename}\0{info.file_size}\0{info.CRC:08x}\n".encode())
+    return digest.hexdigest()
+
+
+def _slim_comment(file_path: str | IO[bytes]) -> tuple[str, str | None] | None:
+    """Return the original hash and members digest named by a slim package."""
+    try:
+        with zipfile.ZipFile(file_path, "r") as zip_file:
+            comment = zip_file.comment.decode("utf-8", errors="replace")
+    except (OSError, zipfile.BadZipFile):
+        return None
+
+    if not comment.startswith(SLIM_COMMENT_PREFIX):
+        return None
+    sha256, separator, digest = comment.removeprefix(SLIM_COMMENT_PREFIX).partition(
+        SLIM_MEMBERS_SEPARATOR
+    )
+    return sha256, digest if separator else None
+
+
+def slim_original_sha256(file_path: str | IO[bytes]) -> str | None:
+    """Return the hash of the package a slim package was made from, if it is slim."""
+    slim_comment = _slim_comment(file_path)
+    return None if slim_comment is None else slim_comment[0]
+
+
+def slim_members_digest(file_path: str | IO[bytes]) -> str | None:
+    """Return the digest of the members a slim package kept, if it names one."""
+    slim_comment = _slim_comment(file_path)
+    return None if slim_comment is None else slim_comment[1]
+
+
+@dataclass
+class LedgerEntry:
+    """Represent an attempt to process a package."""
+
+    sha256: str
+    zip_file_path: str
+    file_size: int
+    mtime_ns: int
+    status: LedgerStatus
+    failure_class: FailureClass | None
+    error: str | None
+    pyesef_version: str
+    parse_seconds: float
+    processed_at: str
+
+    @property
+    def is_retryable(self) -> bool:
+        """Return True if the package failed in a way that may go away."""
+        return (
+            self.status == LedgerStatus.FAILED
+            and self.failure_class == FailureClass.TRANSIENT
+        )
+
+
+class ProcessingLedger:
+    """Keep track of the packages that have been processed."""
+
+    def __init__(self, ledger_path: str = PATH_LEDGER) -> None:
+        """Init class."""
+        self.ledger_path = ledger_path
+        self.entry_by_sha256: dict[str, LedgerEntry] = {}
+        # The last known hash of a path, to avoid hashing unchanged files again
+        self.sha256_by_stat: dict[tuple[str, int, int], str] = {}
+
+        if os.path.exists(ledger_path):
+            with open(ledger_path, encoding="UTF-8") as ledger_file:
+                for line_number, line in enumerate(ledger_file, start=1):
+                    if line.strip():
+                        self._add_line(line, line_number)
+
+    def _add_line(self, line: str, line_number: int) -> None:
+        """
+        Add an entry read from the ledger file.
+
+        A line that can't be read, like one torn by a run that was stopped while
+        writing it, is skipped. Its package is processed again.
+        """
+        try:
+            self._add(LedgerEntry(**json.loads(line)))
+        except (ValueError, TypeError) as exc:
+            LOGGER.warning(
+                f"Skipping line {line_number} of {self.ledger_path} due to {exc}"
+            )
+
+    def _add(self, entry: LedgerEntry) -> None:
+        """Add an entry to the lookup tables."""
+        entry.status = LedgerStatus(entry.status)
+        if entry.failure_class is not None:
+            entry.failure_class = FailureClass(entry.failure_class)
+
+        self.entry_by_sha256[entry.sha256] = entry
+        self.sha256_by_stat[(entry.zip_file_path, entry.file_size, entry.mtime_ns)] = (
+            entry.sha256
+        )
+
+    def package_sha256(self, zip_file_path: str) -> str:
+        """Return the hash of a package, reusing the ledger if the file is unchanged."""
+        stat = os.stat(zip_file_path)
+        sha256 = self.sha256_by_stat.get(
+            (zip_file_path, stat.st_size, stat.st_mtime_ns)
+        )
+
+        if sha256 is None:
+            sha256 = slim_original_sha256(zip_file_path) or file_sha256(zip_file_path)
+            self.sha256_by_stat[(zip_file_path, stat.st_size, stat.st_mtime_ns)] = (
+                sha256
+            )
+
+        return sha256
+
+    def should_skip(self, sha256: str, retry_failed: bool = False) -> bool:
+        """Return True if a package has already been processed."""
+        entry = self.entry_by_sha256.get(sha256)
+
+        if entry is None:
+            return False
+
+        if entry.status == LedgerStatus.OK:
+            return True
+
+        return not (retry_failed and entry.is_retryable)
+
+    def record(
+        self,
+        sha256: str,
+        zip_file_path: str,
+        parse_seconds: float,
+        *,
+        failure_class: FailureClass | None = None,
+        error: str | None = None,
+        file_size: int | None = None,
+    ) -> LedgerEntry:
+        """
+        Record an attempt to process a package.
+
+        A package parsed from memory isn't on disk, its size is given instead and it
+        has no modification time.
+        """
+        if file_size is None:
+            stat = os.stat(zip_file_path)
+            file_size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        else:
+            mtime_ns = 0
+
+        entry = LedgerEntry(
+            sha256=sha256,
+            zip_file_path=zip_file_path,
+            file_size=file_size,
+            mtime_ns=mtime_ns,
+            status=LedgerStatus.OK if error is None else LedgerStatus.FAILED,
+            failure_class=failure_class,
+            error=error,
+            pyesef_version=__version__,
+            parse_seconds=round(parse_seconds, 3),
+            processed_at=datetime.now(UTC).isoformat(timespec="seconds"),
+        )
+        self._add(entry)
+
+        os.makedirs(os.path.dirname(self.ledger_path), exist_ok=True)
+        with open(self.ledger_path, "a", encoding="UTF-8") as ledger_file:
+            ledger_file.write(json.dumps(asdict(entry)) + "\n")
+
+        return entry
@@ -0,0 +1,69 @@
+"""Index the concepts of the summation-item network by link role."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from arelle.ModelDtsObject import ModelRelationship
+from arelle.ModelXbrl import ModelXbrl
+from arelle.XbrlConst import summationItem
+
+from ..error import PyEsefError
+from .common import clean_linkrole
+
+
+@dataclass
+class LinkRoleIndex:
+    """
+    Represent the calculation link roles of a filing.
+
+    This allows us to determine what financial statement an item belongs to, eg income
+    statement, cash flow analysis or balance sheet.
+    """
+
+    # The cleaned link role of each summed item by its XML name, the first role wins
+    linkrole_by_concept: dict[str, str] = field(default_factory=dict)
+    # The Clark notation names of the concepts in each link role
+    concepts_by_role: dict[str, set[str]] = field(default_factory=dict)
+
+    def add(
+        self, link_role: str, from_clark: str, to_clark: str, to_local_name: str
+    ) -> None:
+        """Add a summation-item relationship to the index."""
+        if to_local_name not in self.linkrole_by_concept:
+            self.linkrole_by_concept[to_local_name] = clean_linkrole(link_role)
+
+        role_concepts = self.concepts_by_role.setdefault(link_role, set())
+        role_concepts.add(from_clark)
+        role_concepts.add(to_clark)
+
+    def roles_of(self, clark: str) -> list[str]:
+        """Return the link roles a concept takes part in."""
+        return [
+            link_role
+            for link_role, role_concepts in self.concepts_by_role.items()
+            if clark in role_concepts
+        ]
+
+
+def extract_link_role_index(model_xbrl: ModelXbrl) -> LinkRoleIndex:
+    """Walk the summation-item relationships of a filing once."""
+    link_role_index = LinkRoleIndex()
+
+    rel_list: list[ModelRelationship] = model_xbrl.relationshipSet(
+        summationItem
+    ).modelRelationships
+
+    try:
+        for rel in rel_list:
+            to_qname = rel.toModelObject.qname
+            link_role_index.add(
+                link_role=rel.linkrole,
+                from_clark=rel.fromModelObject.qname.clarkNotation,
+                to_clark=to_qname.clarkNotation,
+                to_local_name=to_qname.localName,
+            )
+    except Exception as exc:
+        raise PyEsefError("Unable to load model roles due to ", exc) from exc
+
+    return link_role_index
@@ -4,7 +4,6 @@ from dataclasses import dataclass
 import json
 import os
 
-from arelle import PluginManager
 from arelle.ModelXbrl import ModelXbrl
 from arelle.XbrlConst import parentChild
 import requests
@@ -12,7 +11,8 @@ import requests
 from pyesef.const import PATH_PROJECT_ROOT, PATH_STATIC
 from pyesef.utils.file_handler import delete_folder, unzip_file
 
-from .common import Controller, StatementName, load_model_xbrl
+from .common import Controller, StatementName, add_plugin_modules, load_model_xbrl
+from .statement_index import save_statement_index
 
 
 @dataclass
@@ -86,6 +86,12 @@ class UpdateStatementDefinitionJson:
         "static",
         "statement_definition.json",
     )
+    PATH_INDEX_FILE = os.path.join(
+        PATH_PROJECT_ROOT,
+        "pyesef",
+        "static",
+        "statement_definition.idx",
+    )
 
     def __init__(self) -> None:
         """Init class."""
@@ -96,7 +102,7 @@ class UpdateStatementDefinitionJson:
         self.cntlr = Controller()
 
         # Add support for reading ESEF-files
-        PluginManager.addPluginModule("validate/ESEF")
+        add_plugin_modules()
 
         self.main()
 
@@ -231,6 +237,8 @@ class UpdateStatementDefinitionJson:
         self.output_data_dict[StatementName.CHANGES_EQUITY.value] = sorted_list
 
     def save_dict_to_json(self) -> None:
-        """Save data dict to JSON file."""
+        """Save data dict to JSON file, and as a precompiled index."""
         with open(self.PATH_JSON_MAP_FILE, "w", encoding="UTF-8") as json_file:
             json.dump(self.output_data_dict, json_file)
+
+        save_statement_index(self.PATH_JSON_MAP_FILE, self.PATH_INDEX_FILE)
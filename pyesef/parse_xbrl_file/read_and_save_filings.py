@@ -2,34 +2,53 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Callable, Generator, Iterable, Iterator
+from dataclasses import dataclass, replace
 from functools import cached_property
-import json
 import logging
+import multiprocessing
+from multiprocessing.synchronize import Event
 import os
 from pathlib import Path
+from threading import Event as ThreadEvent, Semaphore
 import time
+from typing import IO, TYPE_CHECKING, Any, cast
 
-from arelle import PluginManager
+from arelle.FileSource import FileNamedBytesIO
 from arelle.ModelDtsObject import ModelRelationship
-from arelle.ModelRelationshipSet import ModelRelationshipSet
-from arelle.ModelValue import QName
 from arelle.ModelXbrl import ModelXbrl
-from arelle.XbrlConst import parentChild, summationItem
+from arelle.XbrlConst import parentChild
 import pandas as pd
 
-from pyesef.utils.data_management import asdict_with_properties
-
 from ..const import PATH_PROJECT_ROOT
 from ..error import PyEsefError
-from .common import Controller, EsefData, clean_linkrole, load_model_xbrl
+from .base_taxonomy import BaseTaxonomyLabels
+from .common import (
+    Controller,
+    EsefData,
+    EsefDataColumns,
+    ExtractionEngine,
+    add_plugin_modules,
+    clean_linkrole,
+    load_model_xbrl,
+)
 from .extract_definitions_to_csv import extract_definitions_to_csv
+from .ledger import FailureClass, ProcessingLedger, classify_failure, content_sha256
+from .link_roles import extract_link_role_index
 from .load_statement_definition import (
     StatementName,
     UpdateStatementDefinitionJson,
 )
-from .read_facts import StatementBaseName, facts_to_data_list
+from .read_facts import StatementBaseName, facts_to_data_columns
+from .read_inline_xbrl import inline_facts_to_data_columns, read_inline_xbrl_package
+from .read_xbrl_json import ExtensionTaxonomyCache, json_report_path, read_xbrl_json
 from .save_excel import SaveToExcel
+from .statement_index import StatementDefinitionIndex, load_statement_index
+from .triage import PackageTriage, TriageCache, triage_package
+
+if TYPE_CHECKING:
+    # The download package imports the archive path from this module
+    from ..download.catalog import FilingCatalog
 
 FILE_ENDING_ZIP = ".zip"
 
@@ -38,52 +57,52 @@ PATH_ARCHIVES = os.path.abspath(os.path.join(PATH_PROJECT_ROOT, "archives"))
 PATH_PARSED = os.path.abspath(os.path.join(PATH_PROJECT_ROOT, "parsed"))
 PATH_FAILED = os.path.abspath(os.path.join(PATH_PROJECT_ROOT, "error"))
 
+# The StatementBaseName field for each statement, in the order they are scored
+STATEMENT_BASE_NAME_FIELDS = {
+    "cash_flow": StatementName.CASH_FLOW.value,
+    "income_statement": StatementName.INCOME_STATEMENT.value,
+    "balance_sheet": StatementName.BALANCE_SHEET.value,
+    "changes_equity": StatementName.CHANGES_EQUITY.value,
+}
 
-def data_list_to_clean_df(data_list: list[EsefData]) -> pd.DataFrame:
-    """Convert a list of filing data to a Pandas dataframe."""
-    data_frame_from_data_class = pd.json_normalize(  # type: ignore[arg-type]
-        asdict_with_properties(obj) for obj in data_list
-    )
+# Workers are forked so they inherit the imported Arelle modules and the loaded
+# statement definitions from the parent process
+MULTIPROCESSING_START_METHOD = "fork"
 
-    if data_frame_from_data_class.empty:
-        return pd.DataFrame()
+# Packages handed to each worker process ahead of its results, when they arrive from
+# a package source
+STREAM_TASKS_PER_JOB = 2
 
-    data_frame_from_data_class["period_end"] = pd.to_datetime(
-        data_frame_from_data_class["period_end"]
-    )
 
-    # Make the value column an int
-    data_frame_from_data_class["value"] = data_frame_from_data_class["value"].astype(
-        int
-    )
+def data_list_to_clean_df(data_list: list[EsefData]) -> pd.DataFrame:
+    """Convert a list of filing data to a Pandas dataframe."""
+    return data_columns_to_clean_df(EsefDataColumns.from_data_list(data_list))
 
-    # Drop beginning-of-year items
-    data_frame_from_data_class = data_frame_from_data_class.query(
-        "not (period_end.dt.month == 1 & period_end.dt.day == 1)"
-    )
 
-    # Drop items before 2020
-    data_frame_from_data_class = data_frame_from_data_class.query(
-        "period_end.dt.year > 2020"
-    )
+def data_columns_to_clean_df(data_columns: EsefDataColumns) -> pd.DataFrame:
+    """Convert columns of filing data to a clean Pandas dataframe."""
+    if not data_columns:
+        return pd.DataFrame()
 
-    # Drop zero values
-    data_frame_from_data_class = data_frame_from_data_class.query("value != 0")
+    data_frame = data_columns.to_data_frame()
 
-    df_before_duplicate_drop = data_frame_from_data_class.copy()
+    data_frame["period_end"] = pd.to_datetime(data_frame["period_end"])
 
-    # It's easier to look for duplicates when using ints than when using floats
-    try:
-        df_before_duplicate_drop.loc[:, "value_int"] = (
-            df_before_duplicate_drop["value"] * 100
-        ).astype(int)
-    except OverflowError:
-        df_before_duplicate_drop.loc[:, "value_int"] = (
-            df_before_duplicate_drop["value"]
-        ).astype(int)
+    # Make the value column an int
+    data_frame["value"] = data_frame["value"].astype(int)
+
+    period_end = data_frame["period_end"].dt
+    keep_mask = (
+        # Drop beginning-of-year items
+        ~((period_end.month == 1) & (period_end.day == 1))
+        # Drop items before 2020
+        & (period_end.year > 2020)
+        # Drop zero values
+        & (data_frame["value"] != 0)
+    )
 
     # Drop any duplicates
-    df_before_duplicate_drop = df_before_duplicate_drop.drop_duplicates(
+    return data_frame[keep_mask].drop_duplicates(
         subset=[
             "period_end",
             "lei",
@@ -95,62 +114,164 @@ def data_list_to_clean_df(data_list: list[EsefData]) -> pd.DataFrame:
         ignore_index=True,
     )
 
-    df_before_duplicate_drop = df_before_duplicate_drop.drop(columns=["value_int"])
 
-    return df_before_duplicate_drop
+def _presentation_concepts_by_role(model_xbrl: ModelXbrl) -> dict[str, set[str]]:
+    """Return the concepts, including roots, of each presentation role in one pass."""
+    from_by_role: dict[str, set[str]] = {}
+    to_by_role: dict[str, set[str]] = {}
+
+    rel_list: list[ModelRelationship] = model_xbrl.relationshipSet(
+        parentChild
+    ).modelRelationships
+    for rel in rel_list:
+        from_by_role.setdefault(rel.linkrole, set()).add(
+            rel.fromModelObject.qname.clarkNotation
+        )
+        to_by_role.setdefault(rel.linkrole, set()).add(
+            rel.toModelObject.qname.clarkNotation
+        )
+
+    return {
+        role: to_by_role[role] | (from_by_role[role] - to_by_role[role])
+        for role in model_xbrl.roleTypes.keys()
+        if role in to_by_role
+    }
+
+
+@dataclass
+class StatementRoleScores:
+    """Represent the link role chosen for each statement."""
 
+    statement_base_name: StatementBaseName
+    # The number of concepts each role shares with each statement, by role
+    score_matrix: dict[str, dict[str, int]]
 
-def _extract_model_roles(
-    model_xbrl: ModelXbrl,
-) -> dict[str, str]:
+
+def score_statement_roles(
+    role_concept_map: dict[str, set[str]],
+    statement_index: StatementDefinitionIndex,
+) -> StatementRoleScores:
     """
-    Extract a lookup table between XML item name and the item's role.
+    Score every presentation role against all statements in a single pass.
 
-    This allows us to determine what financial statement an item belongs to, eg income
-    statement, cash flow analysis or balance sheet.
+    Each statement gets the role sharing the most concepts with it, the first role
+    wins a tie.
     """
-    to_model_to_linkrole_map: dict[str, str] = {}
+    score_matrix: dict[str, dict[str, int]] = {}
+    max_score = dict.fromkeys(STATEMENT_BASE_NAME_FIELDS, 0)
+    filer_role = dict.fromkeys(STATEMENT_BASE_NAME_FIELDS, "")
+
+    for role, role_concept_clarks in role_concept_map.items():
+        statement_scores = statement_index.score(role_concept_clarks)
+        role_scores = score_matrix[role] = {}
+        for field_name, name in STATEMENT_BASE_NAME_FIELDS.items():
+            score = statement_scores.get(name, 0)
+            role_scores[name] = score
+            if score > max_score[field_name]:
+                max_score[field_name] = score
+                filer_role[field_name] = role
+
+    return StatementRoleScores(
+        statement_base_name=StatementBaseName(
+            **{
+                field_name: clean_linkrole(role)
+                for field_name, role in filer_role.items()
+            }
+        ),
+        score_matrix=score_matrix,
+    )
+
 
-    rel_set: ModelRelationshipSet = model_xbrl.relationshipSet(summationItem)
-    concepts_by_roles: dict[str, list[str]] = {}
+@dataclass
+class ParseListData:
+    """Represent file data."""
 
-    model_relationships: list[ModelRelationship] = rel_set.modelRelationships
+    zip_file_path: str
+    language_code: str
+    # The SHA-256 of the package, set when a ledger is used
+    sha256: str | None = None
+    # The content of a package parsed from memory, which the path then only names
+    content: bytes | None = None
 
-    try:
-        for rel in model_relationships:
-            link = concepts_by_roles.get(rel.linkrole, [])
+    @property
+    def package(self) -> str | IO[bytes]:
+        """Return the path of the package, or a stream of its content if in memory."""
+        if self.content is None:
+            return self.zip_file_path
+        return FileNamedBytesIO(os.path.basename(self.zip_file_path), self.content)
 
-            from_clark_qname: QName = rel.fromModelObject.qname
-            to_clark_qname: QName = rel.toModelObject.qname
-            from_clark = from_clark_qname.clarkNotation
-            to_clark = to_clark_qname.clarkNotation
 
-            if to_clark_qname not in to_model_to_linkrole_map:
-                to_model_to_linkrole_map[to_clark_qname.localName] = clean_linkrole(
-                    rel.linkrole
-                )
+def _close_source(package_iter: Iterable[ParseListData]) -> None:
+    """Close a source of packages, like a running download, when parsing stops."""
+    close = getattr(package_iter, "close", None)
+    if close is not None:
+        close()
 
-            if from_clark not in link and from_clark is not None:
-                link.append(from_clark)
 
-            if to_clark not in link and to_clark is not None:
-                link.append(to_clark)
+def _package_sha256(parse_list_data: ParseListData, ledger: ProcessingLedger) -> str:
+    """Return the hash of a package, from its content if it is in memory."""
+    if parse_list_data.content is not None:
+        return content_sha256(parse_list_data.content)
+    return ledger.package_sha256(parse_list_data.zip_file_path)
 
-            if rel.linkrole not in concepts_by_roles:
-                concepts_by_roles[rel.linkrole] = link
 
-    except Exception as exc:
-        raise PyEsefError("Unable to load model roles due to ", exc) from exc
+@dataclass
+class ParseResult:
+    """Represent the outcome of parsing a single file."""
 
-    return to_model_to_linkrole_map
+    parse_list_data: ParseListData
+    df_result: pd.DataFrame | None = None
+    definitions: pd.DataFrame | None = None
+    error: str | None = None
+    failure_class: FailureClass | None = None
+    parse_seconds: float = 0.0
+    # The triage of the package, with the entrypoint Arelle loaded it from
+    triage: PackageTriage | None = None
 
 
 @dataclass
-class ParseListData:
-    """Represent file data."""
+class _WorkerState:
+    """State shared with a forked parser worker."""
 
-    zip_file_path: str
-    language_code: str
+    read_filing: ReadFiling
+    cntlr: Controller
+    definitions_found: Event
+
+
+_WORKER_STATE: dict[str, _WorkerState] = {}
+
+
+def _init_worker(read_filing: ReadFiling, definitions_found: Event) -> None:
+    """Set up a forked worker with its own Arelle controller."""
+    cntlr = Controller(
+        warm_session=read_filing.warm_session, validate=read_filing.validate
+    )
+
+    # Add support for reading ESEF-files
+    add_plugin_modules(validate=read_filing.validate)
+
+    _WORKER_STATE["worker"] = _WorkerState(
+        read_filing=read_filing,
+        cntlr=cntlr,
+        definitions_found=definitions_found,
+    )
+
+
+def _parse_file_in_worker(idx: int) -> ParseResult:
+    """Parse the file at position idx in the parent's file list."""
+    return _parse_data_in_worker(
+        _WORKER_STATE["worker"].read_filing.file_to_parse_list[idx]
+    )
+
+
+def _parse_data_in_worker(parse_list_data: ParseListData) -> ParseResult:
+    """Parse a file sent by the parent, which wasn't known when the worker forked."""
+    state = _WORKER_STATE["worker"]
+    return state.read_filing.parse_file(
+        parse_list_data=parse_list_data,
+        cntlr=state.cntlr,
+        extract_definitions=not state.definitions_found.is_set(),
+    )
 
 
 class ReadFiling:
@@ -164,24 +285,62 @@ class ReadFiling:
 
     def __init__(
         self,
-        filing_folder: str = PATH_ARCHIVES,
-        should_move_parsed_file: bool = True,
+        filing_folder: str | None = None,
+        should_move_parsed_file: bool = False,
+        *,
+        jobs: int = 1,
+        warm_session: bool = False,
+        validate: bool = True,
+        engine: ExtractionEngine = ExtractionEngine.ARELLE,
+        ledger: ProcessingLedger | None = None,
+        retry_failed: bool = False,
+        catalog: FilingCatalog | None = None,
+        package_source: Iterable[ParseListData] | None = None,
+        triage_cache: TriageCache | None = None,
     ) -> None:
-        """Init class."""
+        """
+        Init class.
+
+        Packages are taken from the catalog if one is given, or else from the
+        filing folder, which defaults to the archive folder.
+
+        A package source yields packages as they become available, like a running
+        download. Each package is parsed as it arrives instead of after all are
+        found, so the output is in the order of arrival. Packages in memory, like
+        uploads, are parsed from their content without being written to disk.
+
+        A triage cache keeps the triage and entrypoint of packages with a known hash,
+        so they aren't triaged or have their entrypoint discovered again.
+        """
         start_time = time.time()
 
-        self.filing_folder = filing_folder
+        self.filing_folder = filing_folder or PATH_ARCHIVES
         self.file_to_parse_list: list[ParseListData] = []
         self.should_move_parsed_file = should_move_parsed_file
+        self.jobs = jobs
+        self.warm_session = warm_session
+        self.validate = validate
+        self.engine = engine
+        self.ledger = ledger
+        self.retry_failed = retry_failed
+        self.catalog = catalog
+        self.triage_cache = triage_cache
+        self.skipped_file_count = 0
         self.definitions: pd.DataFrame = pd.DataFrame()
+        self.taxonomy_cache = ExtensionTaxonomyCache()
+        self.base_taxonomy_labels = BaseTaxonomyLabels()
 
-        self.cntlr = Controller()  # The Arelle controller
+        # The Arelle controller
+        self.cntlr = Controller(warm_session=warm_session, validate=validate)
 
         # Add support for reading ESEF-files
-        PluginManager.addPluginModule("validate/ESEF")
+        add_plugin_modules(validate=validate)
 
-        self.find_files()
-        self.parse_file_list()
+        if package_source is None:
+            self.find_files()
+            self.parse_file_list()
+        else:
+            self.parse_file_list(self._iter_parse_list(package_source))
 
         # Close the controller
         self.cntlr.close()
@@ -191,126 +350,384 @@ class ReadFiling:
             f"Parsed {len(self.file_to_parse_list)} files in {total_time}s"
         )
 
-    def find_files(self) -> None:
-        """Loop through the archive folder and locate relevant files to parse."""
-        for subdir, _, files in os.walk(PATH_ARCHIVES):
+    def _iter_archive_files(self) -> Iterator[ParseListData]:
+        """Yield the packages to parse, with their hash if known."""
+        if self.catalog is not None:
+            for row in self.catalog.packages_to_parse(retry_failed=self.retry_failed):
+                yield ParseListData(
+                    zip_file_path=row["write_location"],
+                    language_code=row["country_iso_2"],
+                    sha256=row["sha256"],
+                )
+            return
+
+        for subdir, _, files in os.walk(self.filing_folder):
             for file in files:
-                zip_file_path = os.path.join(subdir, file)
+                if file.endswith(FILE_ENDING_ZIP):
+                    yield ParseListData(
+                        zip_file_path=os.path.join(subdir, file),
+                        language_code=subdir.split("/")[-1],
+                    )
 
-                if not zip_file_path.endswith(FILE_ENDING_ZIP):
-                    continue
+    def _iter_parse_list(
+        self, package_iter: Iterable[ParseListData]
+    ) -> Iterator[ParseListData]:
+        """Yield the packages to parse, leaving out those in the ledger."""
+        # Filing locations that link to the same stored package are parsed once
+        queued_sha256_set: set[str] = set()
+
+        try:
+            for parse_list_data in package_iter:
+                if self.ledger is not None:
+                    if parse_list_data.sha256 is None:
+                        parse_list_data.sha256 = _package_sha256(
+                            parse_list_data, self.ledger
+                        )
+                    if (
+                        self.ledger.should_skip(
+                            parse_list_data.sha256, self.retry_failed
+                        )
+                        or parse_list_data.sha256 in queued_sha256_set
+                    ):
+                        self.skipped_file_count += 1
+                        continue
+                    queued_sha256_set.add(parse_list_data.sha256)
+
+                yield parse_list_data
+        finally:
+            _close_source(package_iter)
 
-                self.file_to_parse_list.append(
-                    ParseListData(
-                        zip_file_path=zip_file_path,
-                        language_code=subdir.split("/")[-1],  # Language code
-                    )
-                )
+    def find_files(self) -> None:
+        """Locate relevant files to parse, in the catalog or the archive folder."""
+        self.file_to_parse_list.extend(
+            self._iter_parse_list(self._iter_archive_files())
+        )
 
-    @cached_property
-    def model_role_map(self) -> dict[str, set[str]]:
-        """Return a map of statement types and their xml items."""
-        with open(
-            UpdateStatementDefinitionJson.PATH_JSON_MAP_FILE, encoding="UTF-8"
-        ) as json_file:
-            return json.loads(json_file.read())
-
-    def find_link_role(self, model_xbrl: ModelXbrl, name: str) -> str:
-        """Find model link roles for cash flow."""
-        base_taxonomy_clarks = set(self.model_role_map[name])
-
-        max_score = 0
-        filer_role = ""
-        for role in model_xbrl.roleTypes.keys():
-            role_pres_rels = model_xbrl.relationshipSet(parentChild, role)
-            role_concept_clarks = {
-                rel.toModelObject.qname.clarkNotation
-                for rel in role_pres_rels.modelRelationships
-            }
-            for root in role_pres_rels.rootConcepts:
-                role_concept_clarks.add(root.qname.clarkNotation)
-            score = len(role_concept_clarks & base_taxonomy_clarks)
-            if score > max_score:
-                max_score = score
-                filer_role = role
-
-        if filer_role == "":
-            model_xbrl.modelManager.cntlr.addToLog(
-                f"Unable to find link role for {name}", logging.WARNING
+        if self.skipped_file_count:
+            self.cntlr.addToLog(
+                f"Skipped {self.skipped_file_count} files already in the ledger"
             )
 
-        clean_role = filer_role.split("/")[-1]
-        return clean_role
+        # Sort to get the same output order regardless of file system or jobs
+        self.file_to_parse_list.sort(key=lambda item: item.zip_file_path)
+
+    @cached_property
+    def statement_index(self) -> StatementDefinitionIndex:
+        """Return the index of statements and their base taxonomy concepts."""
+        return load_statement_index(
+            index_path=UpdateStatementDefinitionJson.PATH_INDEX_FILE,
+            json_path=UpdateStatementDefinitionJson.PATH_JSON_MAP_FILE,
+        )
+
+    def score_statement_roles(
+        self, role_concept_map: dict[str, set[str]], cntlr: Controller
+    ) -> StatementRoleScores:
+        """Find the link role of each statement."""
+        role_scores = score_statement_roles(
+            role_concept_map=role_concept_map,
+            statement_index=self.statement_index,
+        )
+
+        for field_name, name in STATEMENT_BASE_NAME_FIELDS.items():
+            if getattr(role_scores.statement_base_name, field_name) == "":
+                cntlr.addToLog(f"Unable to find link role for {name}", logging.WARNING)
+
+        return role_scores
 
     def get_statement_base_name(self, model_xbrl: ModelXbrl) -> StatementBaseName:
         """Return statement base name."""
-        cash_flow_name = self.find_link_role(
-            model_xbrl=model_xbrl,
-            name=StatementName.CASH_FLOW.value,
+        return self.score_statement_roles(
+            role_concept_map=_presentation_concepts_by_role(model_xbrl=model_xbrl),
+            cntlr=model_xbrl.modelManager.cntlr,
+        ).statement_base_name
+
+    def parse_inline_file(
+        self, parse_list_data: ParseListData, cntlr: Controller
+    ) -> pd.DataFrame | None:
+        """
+        Extract the facts of a file without Arelle.
+
+        Returns None if the package doesn't hold the linkbases needed to place the
+        facts in statements, or its base taxonomy can't be loaded to label them, in
+        which case the file is loaded with Arelle instead.
+        """
+        package = read_inline_xbrl_package(parse_list_data.package)
+
+        if not package.has_linkbases:
+            return None
+
+        base_labels = self.base_taxonomy_labels.get(
+            package.base_schema_urls, cntlr=cntlr
         )
-        income_statement_name = self.find_link_role(
-            model_xbrl=model_xbrl,
-            name=StatementName.INCOME_STATEMENT.value,
+        if base_labels is None:
+            return None
+        package.base_labels = base_labels
+        package.label_language = cntlr.modelManager.defaultLang
+
+        statement_base_name = self.score_statement_roles(
+            role_concept_map=package.presentation_concepts_by_role(),
+            cntlr=cntlr,
+        ).statement_base_name
+
+        data_columns = inline_facts_to_data_columns(
+            package=package,
+            statement_base_name=statement_base_name,
         )
-        balance_sheet_name = self.find_link_role(
-            model_xbrl=model_xbrl,
-            name=StatementName.BALANCE_SHEET.value,
+
+        return data_columns_to_clean_df(data_columns)
+
+    def parse_json_file(
+        self, parse_list_data: ParseListData, cntlr: Controller
+    ) -> pd.DataFrame | None:
+        """
+        Extract the facts of a file from its xBRL-JSON report.
+
+        Returns None if the extension taxonomy doesn't hold the linkbases needed to
+        place the facts in statements, or its base taxonomy can't be loaded to label
+        them, in which case the file is loaded with Arelle instead.
+        """
+        report = read_xbrl_json(json_report_path(parse_list_data.zip_file_path))
+        taxonomy = self.taxonomy_cache.get(
+            parse_list_data.package, namespaces=report.namespaces
+        )
+
+        if not taxonomy.package.has_linkbases:
+            return None
+
+        base_labels = self.base_taxonomy_labels.get(
+            taxonomy.package.base_schema_urls, cntlr=cntlr
         )
-        changes_equity_name = self.find_link_role(
-            model_xbrl=model_xbrl,
-            name=StatementName.CHANGES_EQUITY.value,
+        if base_labels is None:
+            return None
+
+        statement_base_name = self.score_statement_roles(
+            role_concept_map=taxonomy.role_concept_map,
+            cntlr=cntlr,
+        ).statement_base_name
+
+        data_columns = taxonomy.facts_to_data_columns(
+            report=report,
+            statement_base_name=statement_base_name,
+            base_labels=base_labels,
+            label_language=cntlr.modelManager.defaultLang,
+        )
+
+        return data_columns_to_clean_df(data_columns)
+
+    def parse_without_arelle(
+        self, parse_list_data: ParseListData, cntlr: Controller
+    ) -> pd.DataFrame | None:
+        """Extract the facts of a file with the engine, None if Arelle is needed."""
+        if self.engine == ExtractionEngine.JSON and os.path.exists(
+            json_report_path(parse_list_data.zip_file_path)
+        ):
+            return self.parse_json_file(parse_list_data=parse_list_data, cntlr=cntlr)
+
+        return self.parse_inline_file(parse_list_data=parse_list_data, cntlr=cntlr)
+
+    def triage(self, parse_list_data: ParseListData) -> PackageTriage:
+        """Return the cached triage of a file, or triage it."""
+        if self.triage_cache is not None and parse_list_data.sha256 is not None:
+            triage = self.triage_cache.get(parse_list_data.sha256)
+            if triage is not None:
+                return triage
+
+        return triage_package(parse_list_data.package)
+
+    def parse_file(
+        self,
+        parse_list_data: ParseListData,
+        cntlr: Controller,
+        extract_definitions: bool,
+    ) -> ParseResult:
+        """Load a file and extract its facts to a clean dataframe."""
+        start_time = time.perf_counter()
+        try:
+            # Packages that can't hold a report are rejected before they are read
+            triage = self.triage(parse_list_data=parse_list_data)
+
+            # Definitions are only available from the Arelle model
+            if self.engine != ExtractionEngine.ARELLE and not extract_definitions:
+                df_result = self.parse_without_arelle(
+                    parse_list_data=parse_list_data, cntlr=cntlr
+                )
+                if df_result is not None:
+                    return ParseResult(
+                        parse_list_data=parse_list_data,
+                        df_result=df_result,
+                        parse_seconds=time.perf_counter() - start_time,
+                        triage=triage,
+                    )
+
+            # Load zip-file into a ModelXbrl instance
+            model_xbrl = load_model_xbrl(
+                zip_file_path=parse_list_data.package,
+                cntlr=cntlr,
+                entrypoint=triage.entrypoint,
+            )
+            triage = replace(triage, entrypoint=cntlr.entrypoint)
+
+            statement_base_name = self.get_statement_base_name(model_xbrl=model_xbrl)
+
+            definitions = None
+            if extract_definitions and len(model_xbrl.facts):
+                definitions = extract_definitions_to_csv(model_xbrl.facts[0].concept)
+
+            # Extract the model roles
+            link_role_index = extract_link_role_index(model_xbrl=model_xbrl)
+
+            data_columns = facts_to_data_columns(
+                model_xbrl=model_xbrl,
+                to_model_to_linkrole_map=link_role_index.linkrole_by_concept,
+                statement_base_name=statement_base_name,
+            )
+
+            df_result = data_columns_to_clean_df(data_columns)
+
+            model_xbrl.close()
+        except Exception as exc:
+            return ParseResult(
+                parse_list_data=parse_list_data,
+                error=str(exc),
+                failure_class=classify_failure(exc),
+                parse_seconds=time.perf_counter() - start_time,
+            )
+
+        return ParseResult(
+            parse_list_data=parse_list_data,
+            df_result=df_result,
+            definitions=definitions,
+            parse_seconds=time.perf_counter() - start_time,
+            triage=triage,
         )
 
-        return StatementBaseName(
-            balance_sheet=balance_sheet_name,
-            cash_flow=cash_flow_name,
-            income_statement=income_statement_name,
-            changes_equity=changes_equity_name,
+    def _parse_file_list_serial(
+        self, parse_list_iter: Iterable[ParseListData]
+    ) -> Generator[ParseResult, None, None]:
+        """Parse files one at a time in this process."""
+        for parse_list_data in parse_list_iter:
+            yield self.parse_file(
+                parse_list_data=parse_list_data,
+                cntlr=self.cntlr,
+                extract_definitions=self.definitions.empty,
+            )
+
+    def _parse_in_pool(
+        self,
+        func: Callable[[Any], ParseResult],
+        task_iter: Iterable[Any],
+        on_stop: Callable[[], None] | None = None,
+    ) -> Generator[ParseResult, None, None]:
+        """
+        Parse files in a pool of forked worker processes.
+
+        Results are yielded in the order of the tasks, so the output is the same as
+        when parsing serially. on_stop is called before the pool is stopped, as it
+        waits for the thread that takes the tasks.
+        """
+        # Load the statement definitions before forking so workers share them
+        _ = self.statement_index
+
+        context = multiprocessing.get_context(MULTIPROCESSING_START_METHOD)
+        definitions_found = context.Event()
+
+        with context.Pool(
+            processes=self.jobs,
+            initializer=_init_worker,
+            initargs=(self, definitions_found),
+        ) as pool:
+            try:
+                for result in pool.imap(func, task_iter):
+                    # Later files only need definitions until the first are found
+                    if result.definitions is not None and not result.definitions.empty:
+                        definitions_found.set()
+                    yield result
+            finally:
+                if on_stop is not None:
+                    on_stop()
+
+    def _parse_file_list_parallel(self) -> Iterator[ParseResult]:
+        """Parse the file list in a pool of forked worker processes."""
+        return self._parse_in_pool(
+            _parse_file_in_worker, range(len(self.file_to_parse_list))
         )
 
-    def parse_file_list(self) -> None:
-        """PARSE FILE."""
-        for idx, parse_list_data in enumerate(self.file_to_parse_list):
-            filing_list: list[EsefData] = []
+    def _parse_stream(
+        self, parse_list_iter: Iterable[ParseListData]
+    ) -> Iterator[ParseResult]:
+        """
+        Parse files as they arrive, adding them to the file list.
 
+        The pool takes its tasks from a thread of its own, as fast as they come, so
+        it's only given a few packages per worker ahead of the results. The source
+        is then held back by the parser, and a download doesn't fill the disk.
+        """
+        slots = Semaphore(self.jobs * STREAM_TASKS_PER_JOB)
+        is_stopped = ThreadEvent()
+
+        def _take_when_free() -> Generator[ParseListData, None, None]:
             try:
-                # Load zip-file into a ModelXbrl instance
-                model_xbrl = load_model_xbrl(
-                    zip_file_path=parse_list_data.zip_file_path,
-                    cntlr=self.cntlr,
-                )
+                for parse_list_data in parse_list_iter:
+                    if is_stopped.is_set():
+                        return
+                    yield parse_list_data
+                    slots.acquire()  # pylint: disable=consider-using-with
+            finally:
+                _close_source(parse_list_iter)
+
+        def _stop() -> None:
+            # Wake the thread taking tasks if it waits for a slot
+            is_stopped.set()
+            slots.release()
+
+        task_iterator = _take_when_free()
+        result_iterator: Generator[ParseResult, None, None]
+        if self.jobs <= 1:
+            result_iterator = self._parse_file_list_serial(task_iterator)
+        else:
+            result_iterator = self._parse_in_pool(
+                _parse_data_in_worker, task_iterator, on_stop=_stop
+            )
 
-                statement_base_name = self.get_statement_base_name(
-                    model_xbrl=model_xbrl
-                )
+        try:
+            for result in result_iterator:
+                slots.release()
+                self.file_to_parse_list.append(result.parse_list_data)
+                yield result
+        finally:
+            # The pool is stopped first, so the tasks aren't taken any more
+            result_iterator.close()
+            task_iterator.close()
+
+    def parse_file_list(
+        self, parse_list_iter: Iterable[ParseListData] | None = None
+    ) -> None:
+        """Parse the file list, or the files of an iterable as they arrive."""
+        if parse_list_iter is not None:
+            result_iterator = self._parse_stream(parse_list_iter)
+        elif self.jobs > 1 and len(self.file_to_parse_list) > 1:
+            result_iterator = self._parse_file_list_parallel()
+        else:
+            result_iterator = self._parse_file_list_serial(self.file_to_parse_list)
 
-                if self.definitions.empty and len(model_xbrl.facts):
-                    self.definitions = extract_definitions_to_csv(
-                        model_xbrl.facts[0].concept
-                    )
+        for idx, result in enumerate(result_iterator):
+            parse_list_data = result.parse_list_data
 
-                # Extract the model roles
-                to_model_to_linkrole_map = _extract_model_roles(
-                    model_xbrl=model_xbrl,
-                )
+            try:
+                if result.error is not None:
+                    raise PyEsefError(result.error)
 
-                fact_list = facts_to_data_list(
-                    model_xbrl=model_xbrl,
-                    to_model_to_linkrole_map=to_model_to_linkrole_map,
-                    statement_base_name=statement_base_name,
-                )
-                filing_list.extend(fact_list)
+                if self.definitions.empty and result.definitions is not None:
+                    self.definitions = result.definitions
 
-                df_result = data_list_to_clean_df(filing_list)
-                self.save_to_excel(df_result=df_result)
+                self.save_to_excel(df_result=cast(pd.DataFrame, result.df_result))
+                self.record_result(result=result)
 
-                model_xbrl.modelManager.cntlr.addToLog(
+                self.cntlr.addToLog(
                     f"Finished working on: {idx}/{len(self.file_to_parse_list)}"
                 )
 
-                model_xbrl.close()
-
-                if not self.should_move_parsed_file:
+                if not self.should_move(parse_list_data):
                     continue
 
                 self.move_parsed_file(
@@ -322,7 +739,9 @@ class ReadFiling:
                 self.cntlr.addToLog("Moved files to parsed folder")
 
             except Exception as exc:
-                if not self.should_move_parsed_file:
+                self.record_result(result=result, exc=exc)
+
+                if not self.should_move(parse_list_data):
                     continue
                 self.move_parsed_file(
                     zip_file_path=parse_list_data.zip_file_path,
@@ -335,6 +754,51 @@ class ReadFiling:
                     level=logging.WARNING,
                 )
 
+    def record_result(self, result: ParseResult, exc: Exception | None = None) -> None:
+        """Record the outcome of parsing a file in the ledger and the catalog."""
+        parse_list_data = result.parse_list_data
+        failure_class = result.failure_class
+        if failure_class is None and exc is not None:
+            failure_class = classify_failure(exc)
+
+        if self.catalog is not None:
+            self.catalog.record_parse(
+                write_location=parse_list_data.zip_file_path,
+                sha256=parse_list_data.sha256,
+                is_parsed=failure_class is None and exc is None,
+            )
+
+        if parse_list_data.sha256 is None:
+            return
+
+        if (
+            self.triage_cache is not None
+            and result.triage is not None
+            and failure_class is None
+            and exc is None
+        ):
+            self.triage_cache.add(sha256=parse_list_data.sha256, triage=result.triage)
+
+        if self.ledger is None:
+            return
+
+        self.ledger.record(
+            sha256=parse_list_data.sha256,
+            zip_file_path=parse_list_data.zip_file_path,
+            parse_seconds=result.parse_seconds,
+            file_size=(
+                None
+                if parse_list_data.content is None
+                else len(parse_list_data.content)
+            ),
+            failure_class=failure_class,
+            error=None if exc is None else str(exc),
+        )
+
+    def should_move(self, parse_list_data: ParseListData) -> bool:
+        """Return True if a file is moved once parsed, packages in memory never are."""
+        return self.should_move_parsed_file and parse_list_data.content is None
+
     def save_to_excel(self, df_result: pd.DataFrame) -> None:
         """Save data to Excel."""
         SaveToExcel(
@@ -344,10 +808,16 @@ class ReadFiling:
 
     @staticmethod
     def move_parsed_file(zip_file_path: str, target_path: str) -> None:
-        """Move a file from the filings folder to the parsed folder."""
+        """
+        Move a file from the filings folder to the parsed folder.
+
+        Its xBRL-JSON report, if downloaded, is moved along with it.
+        """
         Path(target_path).mkdir(parents=True, exist_ok=True)
 
-        os.replace(
-            zip_file_path,
-            os.path.join(target_path, os.path.basename(zip_file_path)),
-        )
+        for file_path in (zip_file_path, json_report_path(zip_file_path)):
+            if file_path == zip_file_path or os.path.exists(file_path):
+                os.replace(
+                    file_path,
+                    os.path.join(target_path, os.path.basename(file_path)),
+                )
@@ -20,7 +20,7 @@ from pyesef.parse_xbrl_file.load_statement_definition import StatementName
 
 from ..const import NiceType
 from ..error import PyEsefError
-from .common import EsefData
+from .common import EsefData, EsefDataColumns
 
 
 class BaseXBRLiType(Enum):
@@ -80,15 +80,6 @@ def parsed_value(
     return val
 
 
-def _get_label(property_view: tuple[tuple[str, str]]) -> str | None:
-    """Extract label."""
-    for item in property_view:
-        if item[0] == "label":
-            return item[1]
-
-    return None
-
-
 def _get_membership(
     scenario: ModelObject | None,
 ) -> tuple[str, str] | tuple[None, None]:
@@ -174,13 +165,103 @@ def _wider_anchor_to_dict(model_xbrl: ModelXbrl) -> dict[str, Any]:
     return output_map
 
 
+@dataclass
+class _ConceptAttributes:
+    """Represent the attributes shared by all facts of a concept."""
+
+    # True if facts of the concept aren't saved, like number of shares
+    is_skipped: bool
+    xml_name: str
+    wider_anchor: str | None
+    wider_anchor_or_xml_name: str
+    is_company_defined: bool
+    label: str | None
+    level_1: str | None
+
+
+@dataclass
+class _ContextAttributes:
+    """Represent the attributes shared by all facts of a context."""
+
+    period_end: date
+    lei: str
+    membership: str | None
+
+
+def _get_concept_attributes(
+    concept: ModelConcept,
+    wider_anchor_map: dict[str, str],
+    to_model_to_linkrole_map: dict[str, str],
+    statement_base_name: StatementBaseName,
+) -> _ConceptAttributes:
+    """Return the attributes of a concept."""
+    qname: QName = concept.qname
+
+    # The name of the item, eg ComprehensiveIncome
+    xml_name: str = qname.localName
+    wider_anchor = wider_anchor_map.get(xml_name) or None
+
+    try:
+        label = concept.label(lang=concept.modelXbrl.modelManager.defaultLang)
+    except (KeyError, AttributeError):
+        label = None
+
+    return _ConceptAttributes(
+        # We don't want to save number of shares or per share amounts
+        is_skipped=concept.niceType
+        in [
+            NiceType.PER_SHARE.value,
+            NiceType.SHARES.value,
+        ],
+        xml_name=xml_name,
+        wider_anchor=wider_anchor,
+        wider_anchor_or_xml_name=wider_anchor or xml_name,
+        is_company_defined=_get_is_extension(qname.prefix),
+        label=label,
+        level_1=_get_level_1(
+            xml_level_1_key=to_model_to_linkrole_map.get(xml_name),
+            statement_base_name=statement_base_name,
+        ),
+    )
+
+
+def _get_context_attributes(context: ModelContext) -> _ContextAttributes:
+    """Return the attributes of a context."""
+    _, lei = context.entityIdentifier
+    _, membership_name = _get_membership(context.scenario)
+
+    return _ContextAttributes(
+        period_end=_get_period_end(end_date_time=context.endDatetime),
+        lei=lei,
+        membership=membership_name,
+    )
+
+
 def facts_to_data_list(
     model_xbrl: ModelXbrl,
     to_model_to_linkrole_map: dict[str, str],
     statement_base_name: StatementBaseName,
 ) -> list[EsefData]:
     """Read facts of XBRL-files."""
-    fact_list: list[EsefData] = []
+    return facts_to_data_columns(
+        model_xbrl=model_xbrl,
+        to_model_to_linkrole_map=to_model_to_linkrole_map,
+        statement_base_name=statement_base_name,
+    ).to_data_list()
+
+
+def facts_to_data_columns(
+    model_xbrl: ModelXbrl,
+    to_model_to_linkrole_map: dict[str, str],
+    statement_base_name: StatementBaseName,
+) -> EsefDataColumns:
+    """
+    Read facts of XBRL-files into columns.
+
+    Facts share a small number of concepts and contexts, so their attributes are
+    worked out once per filing and looked up for each fact.
+    """
+    data_columns = EsefDataColumns()
     model_xbrl_fact_list: list[ModelFact] = model_xbrl.facts
 
     legal_name = _get_legal_name(facts=model_xbrl.facts)
@@ -188,6 +269,9 @@ def facts_to_data_list(
 
     wider_anchor_map = _wider_anchor_to_dict(model_xbrl=model_xbrl)
 
+    concept_memo: dict[QName, _ConceptAttributes] = {}
+    context_memo: dict[str, _ContextAttributes] = {}
+
     for fact in model_xbrl_fact_list:
         concept: ModelConcept | None = fact.concept
         context: ModelContext | None = fact.context
@@ -197,64 +281,48 @@ def facts_to_data_list(
                 continue
 
             # We don't want to save meta data like company name etc
-            if fact.localName == "nonNumeric" or concept.niceType in [
-                NiceType.PER_SHARE.value,
-                NiceType.SHARES.value,
-            ]:
+            if fact.localName == "nonNumeric":
                 continue
 
-            date_period_end = _get_period_end(end_date_time=context.endDatetime)
-
-            qname: QName = concept.qname
-
-            # The name of the item, eg ComprehensiveIncome
-            xml_name: str = qname.localName
+            concept_attributes = concept_memo.get(concept.qname)
+            if concept_attributes is None:
+                concept_attributes = concept_memo[concept.qname] = (
+                    _get_concept_attributes(
+                        concept=concept,
+                        wider_anchor_map=wider_anchor_map,
+                        to_model_to_linkrole_map=to_model_to_linkrole_map,
+                        statement_base_name=statement_base_name,
+                    )
+                )
 
-            if wider_anchor_map.get(xml_name, False):
-                wider_anchor = wider_anchor_map[xml_name]
-            else:
-                wider_anchor = None
+            if concept_attributes.is_skipped:
+                continue
 
-            _, lei = context.entityIdentifier
-            _, membership_name = _get_membership(context.scenario)
+            context_attributes = context_memo.get(context.id)
+            if context_attributes is None:
+                context_attributes = context_memo[context.id] = _get_context_attributes(
+                    context=context
+                )
 
             value = parsed_value(fact)
 
             if value is None:
                 continue
 
-            if wider_anchor is None:
-                wider_anchor_or_xml_name = xml_name
-            else:
-                wider_anchor_or_xml_name = wider_anchor
-
-            value = cast(int, value)
-
-            if xml_name in to_model_to_linkrole_map:
-                xml_level_1_key = to_model_to_linkrole_map[xml_name]
-            else:
-                xml_level_1_key = None
-
-            level_1 = _get_level_1(
-                xml_level_1_key=xml_level_1_key, statement_base_name=statement_base_name
-            )
-
-            fact_list.append(
-                EsefData(
-                    period_end=date_period_end,
-                    lei=lei,
-                    wider_anchor_or_xml_name=wider_anchor_or_xml_name,
-                    wider_anchor=wider_anchor,
-                    xml_name=xml_name,
-                    currency=fact.unit.value,
-                    value=value,
-                    is_company_defined=_get_is_extension(qname.prefix),
-                    membership=membership_name,
-                    label=_get_label(fact.propertyView),
-                    level_1=level_1,
-                )
+            data_columns.append(
+                period_end=context_attributes.period_end,
+                lei=context_attributes.lei,
+                wider_anchor_or_xml_name=concept_attributes.wider_anchor_or_xml_name,
+                wider_anchor=concept_attributes.wider_anchor,
+                xml_name=concept_attributes.xml_name,
+                currency=fact.unit.value,
+                value=cast(int, value),
+                is_company_defined=concept_attributes.is_company_defined,
+                membership=context_attributes.membership,
+                label=concept_attributes.label,
+                level_1=concept_attributes.level_1,
             )
         except Exception as exc:
             raise PyEsefError(f"Unable to parse fact {fact} ", exc) from exc
 
-    return fact_list
+    return data_columns
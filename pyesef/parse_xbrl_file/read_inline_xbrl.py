@@ -0,0 +1,737 @@
+"""
+Read the numeric facts of an ESEF package with lxml.
+
+This is a fast path for the facts we export. The inline XBRL documents are streamed
+with iterparse and the extension taxonomy is read from the package, so no Arelle
+ModelXbrl is built. Filings that can't be resolved from the package alone are left to
+the Arelle path, which remains the reference implementation.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import cached_property
+from operator import itemgetter
+import posixpath
+from typing import IO, Any
+import zipfile
+
+from arelle import FunctionIxt
+from arelle.ValidateXbrlCalcs import roundValue
+from arelle.XmlUtil import collapseWhitespace
+from lxml import etree
+
+from ..const import NiceType
+from ..error import PyEsefError
+from .common import EsefData, EsefDataColumns
+from .link_roles import LinkRoleIndex
+from .read_facts import (
+    StatementBaseName,
+    _get_is_extension,
+    _get_level_1,
+    _get_membership,
+    _get_period_end,
+)
+
+NS_IX = "http://www.xbrl.org/2013/inlineXBRL"
+NS_XBRLI = "http://www.xbrl.org/2003/instance"
+NS_LINK = "http://www.xbrl.org/2003/linkbase"
+NS_XLINK = "http://www.w3.org/1999/xlink"
+NS_XSD = "http://www.w3.org/2001/XMLSchema"
+NS_XSI = "http://www.w3.org/2001/XMLSchema-instance"
+NS_XML = "http://www.w3.org/XML/1998/namespace"
+
+TAG_IX_NON_FRACTION = f"{{{NS_IX}}}nonFraction"
+TAG_XBRLI_CONTEXT = f"{{{NS_XBRLI}}}context"
+TAG_XBRLI_UNIT = f"{{{NS_XBRLI}}}unit"
+TAG_READ_LIST = (TAG_IX_NON_FRACTION, TAG_XBRLI_CONTEXT, TAG_XBRLI_UNIT)
+
+ARCROLE_PARENT_CHILD = "http://www.xbrl.org/2003/arcrole/parent-child"
+ARCROLE_SUMMATION_ITEM = "http://www.xbrl.org/2003/arcrole/summation-item"
+ARCROLE_CONCEPT_LABEL = "http://www.xbrl.org/2003/arcrole/concept-label"
+ARCROLE_WIDER_NARROWER = "http://www.esma.europa.eu/xbrl/esef/arcrole/wider-narrower"
+ROLE_STANDARD_LABEL = "http://www.xbrl.org/2003/role/label"
+ROLE_DEFAULT_LINK = "http://www.xbrl.org/2003/role/link"
+
+# Measures that mark a fact as a number of shares or an amount per share
+SHARES_MEASURE = "shares"
+
+# Label language used when a package isn't read with a controller, which has its own
+DEFAULT_LABEL_LANGUAGE = "en"
+
+FILE_ENDINGS_INLINE = (".xhtml", ".html", ".htm")
+
+
+@dataclass
+class InlineContext:
+    """Represent the parts of an XBRL context that we export."""
+
+    lei: str
+    period_end: date
+    scenario: str | None
+
+
+@dataclass
+class InlineUnit:
+    """Represent an XBRL unit."""
+
+    value: str
+    is_shares: bool
+
+
+@dataclass
+class InlineFact:
+    """Represent an ix:nonFraction fact."""
+
+    name: str
+    context_ref: str
+    unit_ref: str
+    value: str | None
+    decimals: str | None
+    precision: str | None
+
+
+class _Scenario:
+    """Expose scenario text the way _get_membership expects it."""
+
+    def __init__(self, string_value: str) -> None:
+        """Init class."""
+        self.stringValue = string_value  # pylint: disable=invalid-name
+
+
+def _local_name(qname: str) -> str:
+    """Return the local part of a prefixed name."""
+    return qname.rpartition(":")[2]
+
+
+def _label_rank(label_lang: str, lang: str) -> tuple[int, int] | None:
+    """Return how well a label language matches a language, lowest is best."""
+    if label_lang == lang:
+        return (0, 0)
+    if not label_lang:
+        return None
+    if label_lang.startswith(lang):
+        return (2, len(label_lang))
+    if lang.startswith(label_lang):
+        return (1, -len(label_lang))
+    if label_lang.startswith(lang.partition("-")[0]):
+        return (3, 0)
+    return None
+
+
+def match_label(label_list: list[tuple[str, str]], lang: str) -> str | None:
+    """
+    Return the label in a language, picked the way Arelle picks it.
+
+    A label in the language wins, then one in a more general language, like "en" for
+    "en-GB", then one in a more specific language, and then one in another region of
+    the primary language. Returns None if no label is in any of them.
+    """
+    lang = lang.lower()
+    ranked_list = [
+        (rank, text)
+        for label_lang, text in label_list
+        if (rank := _label_rank(label_lang.lower(), lang)) is not None
+    ]
+    if not ranked_list:
+        return None
+    return min(ranked_list, key=itemgetter(0))[1]
+
+
+def _prefix(qname: str) -> str:
+    """Return the prefix of a prefixed name."""
+    return qname.partition(":")[0] if ":" in qname else ""
+
+
+def _parse_period_end(period_text: str) -> date:
+    """
+    Return the end of a period given as a date or a date time.
+
+    Like Arelle, a date without time means the end of that day.
+    """
+    period_text = period_text.strip()
+    if len(period_text) == 10:
+        return date.fromisoformat(period_text)
+
+    return _get_period_end(datetime.fromisoformat(period_text))
+
+
+def _ix_value(element: Any) -> str | None:
+    """Return the value of an ix:nonFraction the same way Arelle transforms it."""
+    if element.get(f"{{{NS_XSI}}}nil") in ("true", "1"):
+        return None
+
+    raw_value = "".join(element.itertext())
+    format_qname = element.get("format")
+
+    if format_qname is not None:
+        raw_value = collapseWhitespace(raw_value)
+        format_prefix = _prefix(format_qname)
+        format_namespace = element.nsmap.get(format_prefix or None)
+        try:
+            transform = FunctionIxt.ixtNamespaceFunctions[format_namespace][
+                _local_name(format_qname)
+            ]
+        except KeyError as exc:
+            raise PyEsefError(f"Unsupported format {format_qname}") from exc
+        raw_value = transform(raw_value)
+
+    try:
+        num = Decimal(raw_value)
+    except (ValueError, InvalidOperation) as exc:
+        raise PyEsefError(f"Invalid value for number: '{raw_value}'") from exc
+
+    scale = element.get("scale")
+    if scale is not None:
+        num *= 10 ** Decimal(scale)
+    if element.get("sign") == "-":
+        num *= -1
+
+    if num == num.to_integral() and ".0" not in raw_value:
+        num = num.quantize(Decimal(1))
+
+    return f"{num:f}"
+
+
+def parsed_inline_value(fact: InlineFact) -> Decimal | None:
+    """
+    Round a numeric fact value using its reported decimals, as parsed_value does.
+
+    A value without decimals is kept as reported. Its decimals are taken from the
+    number rather than the text, so 100 and the canonical 100.0 give the same value.
+    """
+    if fact.value is None:
+        return None
+
+    dec: int | str | None = fact.decimals
+    if dec is None or dec == "INF":
+        exponent = Decimal(fact.value).normalize().as_tuple().exponent
+        dec = max(-exponent, 0) if isinstance(exponent, int) else 0
+    else:
+        dec = max(min(int(dec), 28), -28)
+
+    return roundValue(fact.value, fact.precision, dec)  # type: ignore[no-any-return]
+
+
+@dataclass
+class _Concept:
+    """Represent a concept referenced from a linkbase."""
+
+    clark: str
+    local_name: str
+    nice_type: str | None = None
+
+
+@dataclass
+class _Arc:
+    """Represent a linkbase arc between two concepts."""
+
+    link_role: str
+    arcrole: str
+    from_concept: _Concept
+    to_concept: _Concept
+
+
+@dataclass
+class InlineXbrlPackage:
+    """The facts and extension taxonomy of an ESEF package."""
+
+    contexts: dict[str, InlineContext] = field(default_factory=dict)
+    units: dict[str, InlineUnit] = field(default_factory=dict)
+    facts: list[InlineFact] = field(default_factory=list)
+    # Prefix to namespace declarations seen in the package
+    namespaces: dict[str, str] = field(default_factory=dict)
+    # Concepts defined in the extension schemas, by schema file name and id
+    extension_concepts: dict[str, _Concept] = field(default_factory=dict)
+    role_types: list[str] = field(default_factory=list)
+    arcs: list[_Arc] = field(default_factory=list)
+    labels: dict[str, list[tuple[str, str]]] = field(default_factory=dict)
+    # The base taxonomy schemas the extension schemas import from outside the package
+    base_schema_urls: list[str] = field(default_factory=list)
+    # The labels of the base taxonomy concepts by clark name, once they are loaded
+    base_labels: dict[str, str] = field(default_factory=dict)
+    # The language labels are picked in, the default language of the controller
+    label_language: str = DEFAULT_LABEL_LANGUAGE
+
+    @property
+    def has_linkbases(self) -> bool:
+        """Return True if the package holds the linkbases we need."""
+        return any(arc.arcrole == ARCROLE_PARENT_CHILD for arc in self.arcs)
+
+    def arcs_by_arcrole(self, arcrole: str) -> Iterator[_Arc]:
+        """Yield all arcs with an arcrole."""
+        return (arc for arc in self.arcs if arc.arcrole == arcrole)
+
+    def presentation_concepts_by_role(self) -> dict[str, set[str]]:
+        """Return the concepts, including roots, in each presentation role."""
+        from_by_role: dict[str, set[str]] = {}
+        to_by_role: dict[str, set[str]] = {}
+        for arc in self.arcs_by_arcrole(ARCROLE_PARENT_CHILD):
+            from_by_role.setdefault(arc.link_role, set()).add(arc.from_concept.clark)
+            to_by_role.setdefault(arc.link_role, set()).add(arc.to_concept.clark)
+
+        # Roles that aren't declared in a schema, like the default link role, are
+        # skipped the same way Arelle's roleTypes skip them
+        role_list = [role for role in self.role_types if role in to_by_role]
+        role_list.extend(
+            role
+            for role in to_by_role
+            if role not in role_list and role != ROLE_DEFAULT_LINK
+        )
+
+        return {
+            role: to_by_role[role] | (from_by_role[role] - to_by_role[role])
+            for role in role_list
+        }
+
+    def link_role_index(self) -> LinkRoleIndex:
+        """Return the calculation link roles of the package."""
+        link_role_index = LinkRoleIndex()
+        for arc in self.arcs_by_arcrole(ARCROLE_SUMMATION_ITEM):
+            link_role_index.add(
+                link_role=arc.link_role,
+                from_clark=arc.from_concept.clark,
+                to_clark=arc.to_concept.clark,
+                to_local_name=arc.to_concept.local_name,
+            )
+        return link_role_index
+
+    def wider_anchor_map(self) -> dict[str, str]:
+        """Return a map between extension concepts and their wider anchor."""
+        output_map: dict[str, str] = {}
+        for arc in self.arcs_by_arcrole(ARCROLE_WIDER_NARROWER):
+            output_map.setdefault(
+                arc.to_concept.local_name, arc.from_concept.local_name
+            )
+        return output_map
+
+    def label(self, name: str) -> str:
+        """
+        Return the standard label of a concept, or its name if there is none.
+
+        Labels in the package win over those of the base taxonomy. Like Arelle, a
+        concept without a label in the label language is named instead.
+        """
+        label = match_label(self.labels.get(name, []), self.label_language)
+        if label is not None:
+            return label
+
+        namespace = self.namespaces.get(_prefix(name))
+        return self.base_labels.get(f"{{{namespace}}}{_local_name(name)}", name)
+
+    @cached_property
+    def _nice_type_by_clark(self) -> dict[str, str | None]:
+        """Return the nice type of each extension concept."""
+        return {
+            concept.clark: concept.nice_type
+            for concept in self.extension_concepts.values()
+        }
+
+    def nice_type(self, name: str) -> str | None:
+        """Return the nice type of an extension concept."""
+        namespace = self.namespaces.get(_prefix(name))
+        return self._nice_type_by_clark.get(f"{{{namespace}}}{_local_name(name)}")
+
+
+def unit_from_measures(multiply_list: list[str], divide_list: list[str]) -> InlineUnit:
+    """Return a unit with a value formatted like Arelle's ModelUnit."""
+
+    def _measures(measure_list: list[str]) -> list[str]:
+        return sorted(
+            (
+                _local_name(measure.strip())
+                if _prefix(measure.strip()) in ("iso4217", "xbrli")
+                else measure.strip()
+            )
+            for measure in measure_list
+        )
+
+    multiply = _measures(multiply_list)
+    divide = _measures(divide_list)
+    value = " ".join(multiply + (["/", *divide] if divide else []))
+
+    return InlineUnit(value=value, is_shares=SHARES_MEASURE in multiply + divide)
+
+
+def _nice_type(type_qname: str | None) -> str | None:
+    """Return a nice type name, e.g. PerShare for perShareItemType."""
+    if not type_qname:
+        return None
+    local_name = _local_name(type_qname)
+    if local_name.endswith("ItemType"):
+        return local_name[0].upper() + local_name[1:-8]
+    return local_name
+
+
+class _PackageReader:
+    """Read the documents of a zip package into an InlineXbrlPackage."""
+
+    def __init__(
+        self, zip_file: zipfile.ZipFile, namespaces: dict[str, str] | None = None
+    ) -> None:
+        """Init class."""
+        self.zip_file = zip_file
+        self.package = InlineXbrlPackage(namespaces=dict(namespaces or {}))
+        self.file_name_list = sorted(
+            name for name in zip_file.namelist() if not name.endswith("/")
+        )
+
+    def read(self) -> InlineXbrlPackage:
+        """Read all relevant documents of the package."""
+        inline_name_list = [
+            name
+            for name in self.file_name_list
+            if name.lower().endswith(FILE_ENDINGS_INLINE)
+        ]
+        report_name_list = [
+            name for name in inline_name_list if "/reports/" in f"/{name}"
+        ]
+        for name in report_name_list or inline_name_list:
+            self.read_inline_document(name)
+
+        return self.read_taxonomy()
+
+    def read_taxonomy(self) -> InlineXbrlPackage:
+        """Read the extension schemas and linkbases of the package."""
+        schema_name_list = [
+            name for name in self.file_name_list if name.lower().endswith(".xsd")
+        ]
+        for name in schema_name_list:
+            self.read_schema(name)
+
+        for name in self.file_name_list:
+            if name.lower().endswith(".xml") and "META-INF/" not in name:
+                self.read_linkbase(name)
+
+        return self.package
+
+    def read_inline_document(self, name: str) -> None:
+        """Stream an inline XBRL document and collect its numeric facts."""
+        package = self.package
+        # Number of facts, contexts and units that are open at the current element
+        open_item_count = 0
+
+        with self.zip_file.open(name) as document:
+            for event, element in etree.iterparse(
+                document, events=("start", "end"), huge_tree=True
+            ):
+                if event == "start":
+                    if element.tag in TAG_READ_LIST:
+                        open_item_count += 1
+                    for prefix, namespace in element.nsmap.items():
+                        if prefix:
+                            package.namespaces.setdefault(prefix, namespace)
+                    continue
+
+                if element.tag in TAG_READ_LIST:
+                    open_item_count -= 1
+                    self._read_item(element)
+
+                # Items are read when they end, keep their content until then
+                if open_item_count == 0:
+                    element.clear(keep_tail=True)
+
+    def _read_item(self, element: Any) -> None:
+        """Read a fact, context or unit element."""
+        if element.tag == TAG_IX_NON_FRACTION:
+            self.package.facts.append(
+                InlineFact(
+                    name=element.get("name"),
+                    context_ref=element.get("contextRef"),
+                    unit_ref=element.get("unitRef"),
+                    value=_ix_value(element),
+                    decimals=element.get("decimals"),
+                    precision=element.get("precision"),
+                )
+            )
+        elif element.tag == TAG_XBRLI_CONTEXT:
+            self.package.contexts[element.get("id")] = self._context(element)
+        else:
+            self.package.units[element.get("id")] = self._unit(element)
+
+    @staticmethod
+    def _context(element: Any) -> InlineContext:
+        """Read a context element."""
+        identifier = element.find(f".//{{{NS_XBRLI}}}identifier")
+        period = element.find(f"{{{NS_XBRLI}}}period")
+        end_date = period.find(f"{{{NS_XBRLI}}}endDate")
+        if end_date is None:
+            end_date = period.find(f"{{{NS_XBRLI}}}instant")
+        scenario = element.find(f"{{{NS_XBRLI}}}scenario")
+
+        return InlineContext(
+            lei=(identifier.text or "").strip(),
+            period_end=_parse_period_end(end_date.text),
+            scenario=None if scenario is None else "".join(scenario.itertext()),
+        )
+
+    @staticmethod
+    def _unit(element: Any) -> InlineUnit:
+        """Read a unit element."""
+        divide = element.find(f"{{{NS_XBRLI}}}divide")
+        if divide is None:
+            multiply_list = element.findall(f"{{{NS_XBRLI}}}measure")
+            divide_list = []
+        else:
+            multiply_list = divide.findall(
+                f"{{{NS_XBRLI}}}unitNumerator/{{{NS_XBRLI}}}measure"
+            )
+            divide_list = divide.findall(
+                f"{{{NS_XBRLI}}}unitDenominator/{{{NS_XBRLI}}}measure"
+            )
+
+        return unit_from_measures(
+            multiply_list=[measure.text for measure in multiply_list],
+            divide_list=[measure.text for measure in divide_list],
+        )
+
+    def _open_xml(self, name: str) -> Any | None:
+        """Parse an XML document in the package, None if it isn't XML."""
+        try:
+            with self.zip_file.open(name) as document:
+                return etree.parse(document).getroot()
+        except etree.XMLSyntaxError:
+            return None
+
+    def read_schema(self, name: str) -> None:
+        """Read the concepts and role types of an extension schema."""
+        root = self._open_xml(name)
+        if root is None or root.tag != f"{{{NS_XSD}}}schema":
+            return
+
+        target_namespace = root.get("targetNamespace")
+        for prefix, namespace in root.nsmap.items():
+            if prefix:
+                self.package.namespaces.setdefault(prefix, namespace)
+
+        for role_type in root.iter(f"{{{NS_LINK}}}roleType"):
+            self.package.role_types.append(role_type.get("roleURI"))
+
+        for schema_import in root.findall(f"{{{NS_XSD}}}import"):
+            self._add_base_schema(schema_import.get("schemaLocation", ""))
+
+        base_name = posixpath.basename(name)
+        for element in root.findall(f"{{{NS_XSD}}}element"):
+            if element.get("id") is None:
+                continue
+            self.package.extension_concepts[f"{base_name}#{element.get('id')}"] = (
+                _Concept(
+                    clark=f"{{{target_namespace}}}{element.get('name')}",
+                    local_name=element.get("name"),
+                    nice_type=_nice_type(element.get("type")),
+                )
+            )
+
+    def _add_base_schema(self, schema_location: str) -> None:
+        """Keep a schema location if it's a base taxonomy outside the package."""
+        if not schema_location.startswith(("http://", "https://")):
+            return
+
+        # Catalogs map the extension schemas of a package to URLs like the base's
+        base_name = posixpath.basename(schema_location)
+        if any(posixpath.basename(name) == base_name for name in self.file_name_list):
+            return
+
+        if schema_location not in self.package.base_schema_urls:
+            self.package.base_schema_urls.append(schema_location)
+
+    def _concept(self, href: str) -> _Concept | None:
+        """Resolve a locator href to a concept."""
+        schema, _, concept_id = href.partition("#")
+        extension_concept = self.package.extension_concepts.get(
+            f"{posixpath.basename(schema)}#{concept_id}"
+        )
+        if extension_concept is not None:
+            return extension_concept
+
+        # Base taxonomy concepts have ids made up of their prefix and name
+        prefix_list = sorted(self.package.namespaces, key=len, reverse=True)
+        for prefix in prefix_list:
+            if concept_id.startswith(f"{prefix}_"):
+                local_name = concept_id[len(prefix) + 1 :]
+                return _Concept(
+                    clark=f"{{{self.package.namespaces[prefix]}}}{local_name}",
+                    local_name=local_name,
+                )
+
+        return None
+
+    def read_linkbase(self, name: str) -> None:
+        """Read the arcs and labels of a linkbase."""
+        root = self._open_xml(name)
+        if root is None or root.tag != f"{{{NS_LINK}}}linkbase":
+            return
+
+        for link in root:
+            if isinstance(link.tag, str):
+                self._read_extended_link(link)
+
+    def _read_resources(
+        self, link: Any
+    ) -> tuple[dict[str, list[_Concept]], dict[str, list[tuple[str, str]]]]:
+        """Return the concepts and standard labels of a link by their xlink label."""
+        concepts_by_label: dict[str, list[_Concept]] = {}
+        labels_by_label: dict[str, list[tuple[str, str]]] = {}
+
+        for child in link:
+            label = child.get(f"{{{NS_XLINK}}}label")
+            if child.tag == f"{{{NS_LINK}}}loc":
+                concept = self._concept(child.get(f"{{{NS_XLINK}}}href", ""))
+                if concept is not None:
+                    concepts_by_label.setdefault(label, []).append(concept)
+            elif (
+                child.tag == f"{{{NS_LINK}}}label"
+                and child.get(f"{{{NS_XLINK}}}role", ROLE_STANDARD_LABEL)
+                == ROLE_STANDARD_LABEL
+            ):
+                labels_by_label.setdefault(label, []).append(
+                    (child.get(f"{{{NS_XML}}}lang", ""), child.text or "")
+                )
+
+        return concepts_by_label, labels_by_label
+
+    def _read_extended_link(self, link: Any) -> None:
+        """Read the arcs and labels of an extended link."""
+        link_role = link.get(f"{{{NS_XLINK}}}role", "")
+        concepts_by_label, labels_by_label = self._read_resources(link)
+
+        for arc in link:
+            if arc.get(f"{{{NS_XLINK}}}type") != "arc":
+                continue
+            arcrole = arc.get(f"{{{NS_XLINK}}}arcrole")
+            from_list = concepts_by_label.get(arc.get(f"{{{NS_XLINK}}}from"), [])
+            to_label = arc.get(f"{{{NS_XLINK}}}to")
+
+            if arcrole == ARCROLE_CONCEPT_LABEL:
+                for from_concept in from_list:
+                    prefix = self._prefix_of(from_concept.clark)
+                    self.package.labels.setdefault(
+                        f"{prefix}:{from_concept.local_name}", []
+                    ).extend(labels_by_label.get(to_label, []))
+                continue
+
+            self.package.arcs.extend(
+                _Arc(
+                    link_role=link_role,
+                    arcrole=arcrole,
+                    from_concept=from_concept,
+                    to_concept=to_concept,
+                )
+                for from_concept in from_list
+                for to_concept in concepts_by_label.get(to_label, [])
+            )
+
+    def _prefix_of(self, clark: str) -> str:
+        """Return the prefix used for the namespace of a clark name."""
+        namespace = clark[1:].partition("}")[0]
+        for prefix, prefix_namespace in self.package.namespaces.items():
+            if prefix_namespace == namespace:
+                return prefix
+        return ""
+
+
+def read_inline_xbrl_package(zip_file_path: str | IO[bytes]) -> InlineXbrlPackage:
+    """Read the facts and extension taxonomy of a zipped ESEF package."""
+    try:
+        with zipfile.ZipFile(zip_file_path, "r") as zip_file:
+            return _PackageReader(zip_file).read()
+    except (zipfile.BadZipFile, etree.XMLSyntaxError, KeyError, ValueError) as exc:
+        raise PyEsefError("Unable to read inline XBRL package due to ", exc) from exc
+
+
+def read_extension_taxonomy(
+    zip_file: zipfile.ZipFile, namespaces: dict[str, str] | None = None
+) -> InlineXbrlPackage:
+    """
+    Read the extension taxonomy of a zipped ESEF package, without its facts.
+
+    The namespaces are those the facts are reported with, as they aren't read from
+    the inline XBRL documents.
+    """
+    try:
+        return _PackageReader(zip_file, namespaces=namespaces).read_taxonomy()
+    except (etree.XMLSyntaxError, KeyError, ValueError) as exc:
+        raise PyEsefError("Unable to read extension taxonomy due to ", exc) from exc
+
+
+def inline_facts_to_data_list(
+    package: InlineXbrlPackage,
+    statement_base_name: StatementBaseName,
+) -> list[EsefData]:
+    """Read the numeric facts of an inline XBRL package."""
+    return inline_facts_to_data_columns(
+        package=package, statement_base_name=statement_base_name
+    ).to_data_list()
+
+
+def inline_facts_to_data_columns(
+    package: InlineXbrlPackage,
+    statement_base_name: StatementBaseName,
+    *,
+    to_model_to_linkrole_map: dict[str, str] | None = None,
+    wider_anchor_map: dict[str, str] | None = None,
+) -> EsefDataColumns:
+    """
+    Read the numeric facts of an inline XBRL package into columns.
+
+    The link roles and wider anchors are worked out from the package, unless they
+    are given.
+    """
+    data_columns = EsefDataColumns()
+
+    if to_model_to_linkrole_map is None:
+        to_model_to_linkrole_map = package.link_role_index().linkrole_by_concept
+    if wider_anchor_map is None:
+        wider_anchor_map = package.wider_anchor_map()
+
+    for fact in package.facts:
+        context = package.contexts.get(fact.context_ref)
+        unit = package.units.get(fact.unit_ref)
+
+        try:
+            if context is None or unit is None:
+                continue
+
+            # We don't want to save number of shares or per share amounts
+            nice_type = package.nice_type(fact.name)
+            if unit.is_shares or nice_type in (
+                NiceType.PER_SHARE.value,
+                NiceType.SHARES.value,
+            ):
+                continue
+
+            value = parsed_inline_value(fact)
+
+            if value is None:
+                continue
+
+            xml_name = _local_name(fact.name)
+            wider_anchor = wider_anchor_map.get(xml_name)
+
+            _, membership_name = _get_membership(
+                None if context.scenario is None else _Scenario(context.scenario)
+            )
+
+            data_columns.append(
+                period_end=context.period_end,
+                lei=context.lei,
+                wider_anchor_or_xml_name=wider_anchor or xml_name,
+                wider_anchor=wider_anchor,
+                xml_name=xml_name,
+                currency=unit.value,
+                value=value,
+                is_company_defined=_get_is_extension(_prefix(fact.name)),
+                membership=membership_name,
+                label=package.label(fact.name),
+                level_1=_get_level_1(
+                    xml_level_1_key=to_model_to_linkrole_map.get(xml_name),
+                    statement_base_name=statement_base_name,
+                ),
+            )
+        except Exception as exc:
+            raise PyEsefError(f"Unable to parse fact {fact} ", exc) from exc
+
+    return data_columns
@@ -0,0 +1,235 @@
+"""
+Read the numeric facts of an ESEF filing from its xBRL-JSON report.
+
+filings.xbrl.org publishes an xBRL-JSON (OIM) rendition next to each package. Its
+facts come with their dimensions, so no inline XBRL is transformed and no Arelle
+ModelXbrl is built. The package is only opened for its extension taxonomy, which
+places the facts in statements. What we need from a taxonomy is read once and cached
+by a fingerprint of its files, so packages that share a taxonomy, or a package that
+is parsed again, don't read it twice.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+import hashlib
+import json
+import os
+import posixpath
+from typing import IO, Any
+import zipfile
+
+from ..error import PyEsefError
+from .common import EsefDataColumns
+from .read_facts import StatementBaseName
+from .read_inline_xbrl import (
+    DEFAULT_LABEL_LANGUAGE,
+    InlineContext,
+    InlineFact,
+    InlineUnit,
+    InlineXbrlPackage,
+    _parse_period_end,
+    inline_facts_to_data_columns,
+    read_extension_taxonomy,
+    unit_from_measures,
+)
+
+FILE_ENDING_JSON = ".json"
+
+# Extension taxonomies kept in memory, at most
+TAXONOMY_CACHE_SIZE = 32
+
+# The dimensions every fact may have, the others are taxonomy defined
+CORE_DIMENSION_LIST = ("concept", "entity", "period", "unit", "language", "noteId")
+
+
+def json_report_path(zip_file_path: str) -> str:
+    """Return where the xBRL-JSON report of a package is kept."""
+    return f"{os.path.splitext(zip_file_path)[0]}{FILE_ENDING_JSON}"
+
+
+def _core_dimension(dimensions: dict[str, Any], name: str) -> Any:
+    """Return a core dimension, which may be given with or without its prefix."""
+    return dimensions.get(name, dimensions.get(f"xbrl:{name}"))
+
+
+def _is_core_dimension(name: str) -> bool:
+    """Return True if a dimension is a core dimension."""
+    return name.removeprefix("xbrl:") in CORE_DIMENSION_LIST
+
+
+def _unit(unit_text: str) -> InlineUnit:
+    """Read a unit string, like iso4217:EUR or (iso4217:EUR)/(xbrli:shares)."""
+    numerator, _, denominator = unit_text.partition("/")
+
+    def _measures(text: str) -> list[str]:
+        return [measure for measure in text.strip("()").split("*") if measure]
+
+    return unit_from_measures(
+        multiply_list=_measures(numerator), divide_list=_measures(denominator)
+    )
+
+
+def _read_report(report: dict[str, Any]) -> InlineXbrlPackage:
+    """Read the numeric facts of a parsed xBRL-JSON report."""
+    package = InlineXbrlPackage(
+        namespaces=dict(report["documentInfo"].get("namespaces", {}))
+    )
+
+    for fact_id, fact in report.get("facts", {}).items():
+        dimensions = fact["dimensions"]
+        unit_text = _core_dimension(dimensions, "unit")
+        # Facts without a unit aren't numeric
+        if unit_text is None:
+            continue
+
+        scenario_list = [
+            str(member)
+            for name, member in dimensions.items()
+            if not _is_core_dimension(name)
+        ]
+        period = _core_dimension(dimensions, "period")
+        package.contexts[fact_id] = InlineContext(
+            lei=_core_dimension(dimensions, "entity").partition(":")[2],
+            period_end=_parse_period_end(period.rpartition("/")[2]),
+            scenario="".join(scenario_list) if scenario_list else None,
+        )
+        if unit_text not in package.units:
+            package.units[unit_text] = _unit(unit_text)
+
+        decimals = fact.get("decimals")
+        package.facts.append(
+            InlineFact(
+                name=_core_dimension(dimensions, "concept"),
+                context_ref=fact_id,
+                unit_ref=unit_text,
+                value=fact.get("value"),
+                decimals=None if decimals is None else str(decimals),
+                precision=None,
+            )
+        )
+
+    return package
+
+
+def read_xbrl_json(json_file: str | IO[bytes]) -> InlineXbrlPackage:
+    """Read the numeric facts of an xBRL-JSON report, without any taxonomy."""
+    try:
+        if isinstance(json_file, str):
+            with open(json_file, "rb") as json_stream:
+                report = json.load(json_stream)
+        else:
+            report = json.load(json_file)
+
+        return _read_report(report)
+    except (json.JSONDecodeError, AttributeError, KeyError, ValueError) as exc:
+        raise PyEsefError("Unable to read xBRL-JSON report due to ", exc) from exc
+
+
+def taxonomy_fingerprint(zip_file: zipfile.ZipFile) -> str:
+    """
+    Return a fingerprint of the extension taxonomy of a package.
+
+    It is built from the names, checksums and sizes of the schemas and linkbases in
+    the central directory, so no file is read to work it out.
+    """
+    digest = hashlib.sha256()
+    for info in sorted(zip_file.infolist(), key=lambda info: info.filename):
+        name = info.filename.lower()
+        if name.endswith(".xsd") or (name.endswith(".xml") and "meta-inf/" not in name):
+            base_name = posixpath.basename(info.filename)
+            digest.update(f"{base_name}:{info.CRC}:{info.file_size}\n".encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class ExtensionTaxonomy:
+    """The parts of an extension taxonomy needed to place facts in statements."""
+
+    package: InlineXbrlPackage
+    # The concepts in each presentation role, used to score the statement roles
+    role_concept_map: dict[str, set[str]]
+    linkrole_by_concept: dict[str, str]
+    wider_anchor_map: dict[str, str]
+
+    @classmethod
+    def read(
+        cls, zip_file: zipfile.ZipFile, namespaces: dict[str, str]
+    ) -> ExtensionTaxonomy:
+        """
+        Read the extension taxonomy of a package.
+
+        The namespaces of the report resolve the base taxonomy concepts that the
+        linkbases point to.
+        """
+        package = read_extension_taxonomy(zip_file, namespaces=namespaces)
+
+        return cls(
+            package=package,
+            role_concept_map=package.presentation_concepts_by_role(),
+            linkrole_by_concept=package.link_role_index().linkrole_by_concept,
+            wider_anchor_map=package.wider_anchor_map(),
+        )
+
+    def facts_to_data_columns(
+        self,
+        report: InlineXbrlPackage,
+        statement_base_name: StatementBaseName,
+        base_labels: dict[str, str] | None = None,
+        label_language: str = DEFAULT_LABEL_LANGUAGE,
+    ) -> EsefDataColumns:
+        """
+        Read the numeric facts of a report into columns.
+
+        The base taxonomy concepts are labelled from the base labels, by clark name,
+        and the labels of the extension concepts are picked in the label language.
+        """
+        return inline_facts_to_data_columns(
+            package=replace(
+                self.package,
+                contexts=report.contexts,
+                units=report.units,
+                facts=report.facts,
+                namespaces={**self.package.namespaces, **report.namespaces},
+                base_labels=base_labels or {},
+                label_language=label_language,
+            ),
+            statement_base_name=statement_base_name,
+            to_model_to_linkrole_map=self.linkrole_by_concept,
+            wider_anchor_map=self.wider_anchor_map,
+        )
+
+
+class ExtensionTaxonomyCache:
+    """Keep the most recently used extension taxonomies by their fingerprint."""
+
+    def __init__(self, max_size: int = TAXONOMY_CACHE_SIZE) -> None:
+        """Init class."""
+        self.max_size = max_size
+        self.hit_count = 0
+        self.miss_count = 0
+        self._taxonomies: OrderedDict[str, ExtensionTaxonomy] = OrderedDict()
+
+    def get(
+        self, zip_file_path: str | IO[bytes], namespaces: dict[str, str]
+    ) -> ExtensionTaxonomy:
+        """Return the extension taxonomy of a package, reading it if not cached."""
+        try:
+            with zipfile.ZipFile(zip_file_path, "r") as zip_file:
+                fingerprint = taxonomy_fingerprint(zip_file)
+                if fingerprint in self._taxonomies:
+                    self.hit_count += 1
+                    self._taxonomies.move_to_end(fingerprint)
+                    return self._taxonomies[fingerprint]
+
+                self.miss_count += 1
+                taxonomy = ExtensionTaxonomy.read(zip_file, namespaces=namespaces)
+        except zipfile.BadZipFile as exc:
+            raise PyEsefError("Unable to read extension taxonomy due to ", exc) from exc
+
+        self._taxonomies[fingerprint] = taxonomy
+        if len(self._taxonomies) > self.max_size:
+            self._taxonomies.popitem(last=False)
+
+        return taxonomy
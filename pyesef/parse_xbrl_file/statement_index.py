@@ -0,0 +1,274 @@
+"""
+A precompiled index of the base taxonomy concepts in each statement.
+
+The index is a binary file holding the sorted concepts of all statements, with a
+bitmask per concept marking the statements it belongs to. Concepts are sorted by
+namespace and local name, and looked up by binary search in a memory map of the file.
+Nothing is decoded up front, so loading is cheap and forked workers share the pages.
+
+Layout, all integers little endian:
+    header: magic, format version, number of statements, namespaces and concepts,
+        and the SHA-256 of the JSON file the index was built from
+    statement names and namespaces: length (uint16) followed by UTF-8 bytes
+    padding up to a multiple of 4 bytes
+    masks: one uint32 per concept
+    namespaces: one uint32 per concept, the position of its namespace
+    offsets: one uint32 per concept, plus the end, into the local names
+    local names: UTF-8 bytes of the local names of the sorted concepts
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+from ..error import PyEsefError
+
+INDEX_MAGIC = b"PYESEFSD"
+INDEX_VERSION = 2
+
+HEADER = struct.Struct("<8sHHHI32s")
+NAME_LENGTH = struct.Struct("<H")
+UINT32 = struct.Struct("<I")
+
+# Masks are stored as uint32, one bit per statement
+MAX_STATEMENT_COUNT = 32
+
+
+def _split_concept(concept: str) -> tuple[str, str]:
+    """Split a concept in Clark notation into its namespace and local name."""
+    namespace, _, local_name = concept[1:].partition("}")
+    return namespace, local_name
+
+
+def encode_statement_index(
+    statement_concept_map: dict[str, list[str]], json_sha256: bytes = bytes(32)
+) -> bytes:
+    """Encode a map of statements and their concepts as a binary index."""
+    statement_name_list = list(statement_concept_map)
+    if len(statement_name_list) > MAX_STATEMENT_COUNT:
+        raise PyEsefError(f"An index can hold at most {MAX_STATEMENT_COUNT} statements")
+
+    mask_by_concept: dict[str, int] = {}
+    for bit, statement_name in enumerate(statement_name_list):
+        for concept in statement_concept_map[statement_name]:
+            mask_by_concept[concept] = mask_by_concept.get(concept, 0) | (1 << bit)
+
+    # Sorted like the lookups search, the concepts of a namespace are adjacent
+    concept_list = sorted(mask_by_concept, key=_split_concept)
+    namespace_list = sorted({_split_concept(concept)[0] for concept in concept_list})
+    namespace_ids = {namespace: idx for idx, namespace in enumerate(namespace_list)}
+
+    data = bytearray(
+        HEADER.pack(
+            INDEX_MAGIC,
+            INDEX_VERSION,
+            len(statement_name_list),
+            len(namespace_list),
+            len(concept_list),
+            json_sha256,
+        )
+    )
+    for name in statement_name_list + namespace_list:
+        encoded_name = name.encode("UTF-8")
+        data += NAME_LENGTH.pack(len(encoded_name)) + encoded_name
+    data += bytes(-len(data) % UINT32.size)
+
+    for concept in concept_list:
+        data += UINT32.pack(mask_by_concept[concept])
+
+    encoded_local_name_list = []
+    for concept in concept_list:
+        namespace, local_name = _split_concept(concept)
+        data += UINT32.pack(namespace_ids[namespace])
+        encoded_local_name_list.append(local_name.encode("UTF-8"))
+
+    offset = 0
+    for encoded_local_name in encoded_local_name_list:
+        data += UINT32.pack(offset)
+        offset += len(encoded_local_name)
+    data += UINT32.pack(offset)
+
+    for encoded_local_name in encoded_local_name_list:
+        data += encoded_local_name
+
+    return bytes(data)
+
+
+def save_statement_index(json_path: str, index_path: str) -> None:
+    """Write the binary index of a JSON file of statements and their concepts."""
+    with open(json_path, "rb") as json_file:
+        content = json_file.read()
+
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, "wb") as index_file:
+        index_file.write(
+            encode_statement_index(
+                json.loads(content), hashlib.sha256(content).digest()
+            )
+        )
+    os.replace(temp_path, index_path)
+
+
+def _uint32_view(
+    buffer: bytes | mmap.mmap, start: int, end: int
+) -> memoryview | list[int]:
+    """Return the little endian uint32 values of a buffer, without copying if we can."""
+    if sys.byteorder == "little" and struct.calcsize("I") == UINT32.size:
+        return memoryview(buffer)[start:end].cast("I")
+    return [value for (value,) in UINT32.iter_unpack(buffer[start:end])]
+
+
+class StatementDefinitionIndex:
+    """Look up the statements that base taxonomy concepts belong to."""
+
+    def __init__(self, buffer: bytes | mmap.mmap) -> None:
+        """Init class."""
+        # Keep a reference to the buffer, the masks are a view into it
+        self._buffer = buffer
+
+        (
+            magic,
+            version,
+            statement_count,
+            namespace_count,
+            concept_count,
+            self.json_sha256,
+        ) = HEADER.unpack_from(buffer)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise PyEsefError("Not a statement definition index")
+
+        position = HEADER.size
+        name_list: list[str] = []
+        for _ in range(statement_count + namespace_count):
+            (name_length,) = NAME_LENGTH.unpack_from(buffer, position)
+            position += NAME_LENGTH.size
+            name_list.append(
+                bytes(buffer[position : position + name_length]).decode("UTF-8")
+            )
+            position += name_length
+        position += -position % UINT32.size
+
+        self.statement_name_list = name_list[:statement_count]
+        self._namespace_list = name_list[statement_count:]
+        self._namespace_ids = {
+            namespace: idx for idx, namespace in enumerate(self._namespace_list)
+        }
+
+        mask_end = position + concept_count * UINT32.size
+        namespace_end = mask_end + concept_count * UINT32.size
+        offset_end = namespace_end + (concept_count + 1) * UINT32.size
+        self.masks = _uint32_view(buffer, position, mask_end)
+        self._concept_namespace_ids = _uint32_view(buffer, mask_end, namespace_end)
+        self._offsets = _uint32_view(buffer, namespace_end, offset_end)
+        self._local_name_start = offset_end
+
+    def _local_name(self, concept_id: int) -> bytes:
+        """Return the UTF-8 local name of a concept."""
+        start = self._local_name_start + self._offsets[concept_id]
+        end = self._local_name_start + self._offsets[concept_id + 1]
+        return bytes(self._buffer[start:end])
+
+    def _concept(self, concept_id: int) -> str:
+        """Return a concept in Clark notation."""
+        namespace = self._namespace_list[self._concept_namespace_ids[concept_id]]
+        return f"{{{namespace}}}{self._local_name(concept_id).decode('UTF-8')}"
+
+    def concept_id(self, concept: str) -> int | None:
+        """Return the position of a concept in the masks, None if it isn't indexed."""
+        namespace, local_name = _split_concept(concept)
+        namespace_id = self._namespace_ids.get(namespace)
+        if namespace_id is None:
+            return None
+
+        # UTF-8 bytes sort in the same order as the names they encode
+        encoded_local_name = local_name.encode("UTF-8")
+        end = bisect_right(self._concept_namespace_ids, namespace_id)
+        concept_id = bisect_left(
+            range(end),
+            encoded_local_name,
+            lo=bisect_left(self._concept_namespace_ids, namespace_id),
+            key=self._local_name,
+        )
+        if concept_id < end and self._local_name(concept_id) == encoded_local_name:
+            return concept_id
+        return None
+
+    @classmethod
+    def from_file(cls, index_path: str) -> StatementDefinitionIndex:
+        """Memory map an index file."""
+        with open(index_path, "rb") as index_file:
+            return cls(mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_dict(
+        cls, statement_concept_map: dict[str, list[str]]
+    ) -> StatementDefinitionIndex:
+        """Build an index in memory from a map of statements and their concepts."""
+        return cls(encode_statement_index(statement_concept_map))
+
+    def __len__(self) -> int:
+        """Return the number of concepts in the index."""
+        return len(self.masks)
+
+    def mask(self, concept: str) -> int:
+        """Return the statements a concept belongs to as a bitmask."""
+        concept_id = self.concept_id(concept)
+        if concept_id is None:
+            return 0
+        return int(self.masks[concept_id])
+
+    def statement_concepts(self, statement_name: str) -> set[str]:
+        """Return the concepts of a statement."""
+        if statement_name not in self.statement_name_list:
+            return set()
+        bit = 1 << self.statement_name_list.index(statement_name)
+        return {
+            self._concept(concept_id)
+            for concept_id in range(len(self))
+            if self.masks[concept_id] & bit
+        }
+
+    def score(self, concepts: Iterable[str]) -> dict[str, int]:
+        """Return the number of concepts shared with each statement."""
+        count_list = [0] * len(self.statement_name_list)
+
+        for concept in concepts:
+            mask = self.mask(concept)
+            bit = 0
+            while mask:
+                if mask & 1:
+                    count_list[bit] += 1
+                mask >>= 1
+                bit += 1
+
+        return dict(zip(self.statement_name_list, count_list, strict=True))
+
+
+def load_statement_index(index_path: str, json_path: str) -> StatementDefinitionIndex:
+    """
+    Load the statement definition index.
+
+    The JSON file is used instead if the index is missing or was built from another
+    version of it. The hash is compared rather than the modification times, which a
+    checkout doesn't keep.
+    """
+    with open(json_path, "rb") as json_file:
+        content = json_file.read()
+
+    if os.path.exists(index_path):
+        try:
+            statement_index = StatementDefinitionIndex.from_file(index_path)
+        except PyEsefError:
+            pass
+        else:
+            if statement_index.json_sha256 == hashlib.sha256(content).digest():
+                return statement_index
+
+    return StatementDefinitionIndex.from_dict(json.loads(content))
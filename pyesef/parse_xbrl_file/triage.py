@@ -0,0 +1,201 @@
+"""
+Triage packages before they are parsed.
+
+Triage reads only the central directory of a package and the small files in its
+META-INF folder, so it takes a fraction of the time of loading the package. Packages
+that can't hold a report, like those without report documents or with encrypted or
+empty ones, are rejected before they reach Arelle.
+
+The triage of a package that was loaded is cached by the hash of the package, with the
+entrypoint Arelle found. The next time the package is parsed it's neither triaged nor
+is its entrypoint discovered again, which identifies every document in the package.
+The cache is a JSON lines file, the last line for a package wins.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import json
+import os
+from typing import IO, Any
+import zipfile
+
+from pyesef.log import LOGGER
+
+from ..const import PATH_PROJECT_ROOT
+from ..error import InvalidPackageError
+from .common import Entrypoint
+from .read_inline_xbrl import FILE_ENDINGS_INLINE
+
+PATH_TRIAGE_CACHE = os.path.abspath(os.path.join(PATH_PROJECT_ROOT, "triage.jsonl"))
+
+FILE_ENDING_INSTANCE = ".xbrl"
+
+FILE_REPORT_PACKAGE = "META-INF/reportPackage.json"
+FILE_TAXONOMY_PACKAGE = "META-INF/taxonomyPackage.xml"
+
+# META-INF files larger than this aren't read
+MAX_META_INF_SIZE = 1024 * 1024
+
+
+@dataclass
+class PackageTriage:
+    """Represent what is known about a package before it is parsed."""
+
+    # The report documents, relative to the package
+    report_member_list: list[str]
+    # The uncompressed size of the report documents
+    report_size: int
+    # The document type of a report package, from META-INF/reportPackage.json
+    document_type: str | None
+    has_taxonomy_package: bool
+    # The entrypoint Arelle loaded the package from, once it has
+    entrypoint: Entrypoint | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> PackageTriage:
+        """Return the triage of a package from its cached form."""
+        entrypoint = data.pop("entrypoint", None)
+        return cls(
+            **data,
+            entrypoint=None if entrypoint is None else Entrypoint(**entrypoint),
+        )
+
+
+def _meta_inf_member(
+    info_by_name: dict[str, zipfile.ZipInfo], file_name: str
+) -> zipfile.ZipInfo | None:
+    """Return a META-INF file of a package, at its root or in its top folder."""
+    for name, info in info_by_name.items():
+        if name == file_name or (
+            name.endswith(f"/{file_name}")
+            and name.count("/") == file_name.count("/") + 1
+        ):
+            return info
+    return None
+
+
+def _document_type(
+    zip_file: zipfile.ZipFile, info: zipfile.ZipInfo | None
+) -> str | None:
+    """Return the document type of a report package, None if it can't be read."""
+    if info is None or info.file_size > MAX_META_INF_SIZE:
+        return None
+
+    try:
+        report_package = json.loads(zip_file.read(info))
+        document_type = report_package["documentInfo"]["documentType"]
+    except (ValueError, KeyError, TypeError, RuntimeError, zipfile.BadZipFile):
+        return None
+
+    return document_type if isinstance(document_type, str) else None
+
+
+def _report_info_list(info_list: list[zipfile.ZipInfo]) -> list[zipfile.ZipInfo]:
+    """
+    Return the report documents of a package.
+
+    Inline XBRL documents are taken from the reports folder, or from anywhere in a
+    package that doesn't have one. XBRL instances are taken if there are none.
+    """
+    document_list = [
+        info
+        for info in info_list
+        if "meta-inf/" not in f"/{info.filename.lower()}"
+        and info.filename.lower().endswith((*FILE_ENDINGS_INLINE, FILE_ENDING_INSTANCE))
+    ]
+    report_list = [
+        info for info in document_list if "/reports/" in f"/{info.filename.lower()}"
+    ]
+
+    candidate_list = report_list or document_list
+    inline_list = [
+        info
+        for info in candidate_list
+        if info.filename.lower().endswith(FILE_ENDINGS_INLINE)
+    ]
+    return inline_list or candidate_list
+
+
+def _triage_zip(zip_file: zipfile.ZipFile) -> PackageTriage:
+    """Triage an open package."""
+    info_list = [info for info in zip_file.infolist() if not info.is_dir()]
+    report_info_list = _report_info_list(info_list)
+
+    if not report_info_list:
+        raise InvalidPackageError("Package has no report documents")
+
+    if any(info.flag_bits & 0x1 for info in report_info_list):
+        raise InvalidPackageError("Package has encrypted report documents")
+
+    report_size = sum(info.file_size for info in report_info_list)
+    if report_size == 0:
+        raise InvalidPackageError("Package has only empty report documents")
+
+    info_by_name = {info.filename: info for info in info_list}
+
+    return PackageTriage(
+        report_member_list=sorted(info.filename for info in report_info_list),
+        report_size=report_size,
+        document_type=_document_type(
+            zip_file, _meta_inf_member(info_by_name, FILE_REPORT_PACKAGE)
+        ),
+        has_taxonomy_package=_meta_inf_member(info_by_name, FILE_TAXONOMY_PACKAGE)
+        is not None,
+    )
+
+
+def triage_package(zip_file_path: str | IO[bytes]) -> PackageTriage:
+    """Triage a package, raising InvalidPackageError if it can't hold a report."""
+    try:
+        with zipfile.ZipFile(zip_file_path, "r") as zip_file:
+            return _triage_zip(zip_file)
+    except zipfile.BadZipFile as exc:
+        raise InvalidPackageError("Package is not a zip file due to ", exc) from exc
+
+
+class TriageCache:
+    """Keep the triage of the packages that were loaded, by their hash."""
+
+    def __init__(self, cache_path: str = PATH_TRIAGE_CACHE) -> None:
+        """Init class."""
+        self.cache_path = cache_path
+        self.triage_by_sha256: dict[str, PackageTriage] = {}
+
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding="UTF-8") as cache_file:
+                for line_number, line in enumerate(cache_file, start=1):
+                    if line.strip():
+                        self._add_line(line, line_number)
+
+    def _add_line(self, line: str, line_number: int) -> None:
+        """
+        Add a triage read from the cache file.
+
+        A line that can't be read, like one torn by a run that was stopped while
+        writing it, or one written by a version with other fields, is skipped. Its
+        package is triaged again.
+        """
+        try:
+            data = json.loads(line)
+            sha256 = data.pop("sha256")
+            self.triage_by_sha256[sha256] = PackageTriage.from_dict(data)
+        except (ValueError, TypeError, KeyError, AttributeError) as exc:
+            LOGGER.warning(
+                f"Skipping line {line_number} of {self.cache_path} due to {exc}"
+            )
+
+    def get(self, sha256: str) -> PackageTriage | None:
+        """Return the cached triage of a package."""
+        return self.triage_by_sha256.get(sha256)
+
+    def add(self, sha256: str, triage: PackageTriage) -> None:
+        """Cache the triage of a package, unless it is cached already."""
+        if self.triage_by_sha256.get(sha256) == triage:
+            return
+
+        self.triage_by_sha256[sha256] = triage
+
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path, "a", encoding="UTF-8") as cache_file:
+            cache_file.write(json.dumps({"sha256": sha256, **asdict(triage)}) + "\n")
@@ -2,52 +2,380 @@
 
 from __future__ import annotations
 
-from collections.abc import Callable
+import asyncio
+from collections import Counter, deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
 import functools
+import inspect
+import random
+from threading import Lock
+import time
 from time import sleep
-from typing import Any, TypeVar
+from typing import Any, TypeVar, cast
+
+import requests
 
 from pyesef.log import LOGGER
 
 RT = TypeVar("RT")
 
+# Responses that say the server is busy or briefly broken, not that the request is bad
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Waits asked for with Retry-After that are longer than this are failures
+MAX_RETRY_AFTER_SECONDS = 300.0
+
+# Exponential backoff with jitter, for the calls of workers sharing a server
+NETWORK_BACKOFF = 2.0
+NETWORK_JITTER = 0.5
+
+# Share of recent attempts that must fail before the circuit breaker opens
+CIRCUIT_FAILURE_RATE = 0.5
+CIRCUIT_WINDOW_SIZE = 20
+CIRCUIT_MIN_CALLS = 10
+CIRCUIT_PAUSE_SECONDS = 30.0
+
+
+def is_retryable_error(err: BaseException) -> bool:
+    """
+    Return True if an error may go away when the call is tried again.
+
+    That is dropped connections, timeouts, running out of memory and responses saying
+    the server is busy. Other HTTP errors, like 404 Not Found, and other OS errors,
+    like missing local files, are not retried. A failed package is classified with
+    the same rule, see classify_failure.
+    """
+    if isinstance(err, requests.HTTPError):
+        return (
+            err.response is not None
+            and err.response.status_code in RETRYABLE_STATUS_CODES
+        )
+    if isinstance(err, requests.RequestException):
+        return isinstance(
+            err,
+            requests.ConnectionError
+            | requests.Timeout
+            | requests.exceptions.ChunkedEncodingError,
+        )
+    return isinstance(err, ConnectionError | TimeoutError | MemoryError)
+
+
+def retry_after_seconds(err: BaseException) -> float | None:
+    """Return the wait asked for by the Retry-After header of a failed response."""
+    response = getattr(err, "response", None)
+    if response is None:
+        return None
+
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+
+    # Either a number of seconds or a HTTP date
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+
+@dataclass
+class RetryStats:
+    """Count the attempts and retries of a decorated function, across threads."""
+
+    call_count: int = 0
+    attempt_count: int = 0
+    retry_count: int = 0
+    failure_count: int = 0
+    retry_after_count: int = 0
+    sleep_seconds: float = 0.0
+    error_count_by_type: Counter[str] = field(default_factory=Counter)
+    _lock: Lock = field(default_factory=Lock, repr=False, compare=False)
+
+    def record_call(self) -> None:
+        """Count a call of the function."""
+        with self._lock:
+            self.call_count += 1
+
+    def record_attempt(self, err: BaseException | None) -> None:
+        """Count an attempt, and its error if it failed."""
+        with self._lock:
+            self.attempt_count += 1
+            if err is not None:
+                self.error_count_by_type[type(err).__name__] += 1
+
+    def record_retry(self, sleep_seconds: float, is_retry_after: bool) -> None:
+        """Count a retry and the time waited before it."""
+        with self._lock:
+            self.retry_count += 1
+            self.retry_after_count += is_retry_after
+            self.sleep_seconds += sleep_seconds
+
+    def record_failure(self) -> None:
+        """Count a call that failed for good."""
+        with self._lock:
+            self.failure_count += 1
+
+    def summary(self) -> str:
+        """Return the statistics on a single line, for the log."""
+        with self._lock:
+            errors = ", ".join(
+                f"{count} {name}" for name, count in self.error_count_by_type.items()
+            )
+            return (
+                f"{self.call_count} calls, {self.attempt_count} attempts, "
+                f"{self.retry_count} retries ({self.retry_after_count} after "
+                f"Retry-After), {self.failure_count} failed, "
+                f"{self.sleep_seconds:.1f}s waited"
+                + (f", errors: {errors}" if errors else "")
+            )
+
+
+class CircuitBreaker:
+    """
+    Pause all callers when too many recent attempts have failed.
+
+    A single breaker is shared by the workers calling the same server. When the
+    share of failures among the recent attempts reaches the failure rate, every
+    worker waits before its next attempt, so a struggling server gets a break.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        window_size: int = CIRCUIT_WINDOW_SIZE,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        pause_seconds: float = CIRCUIT_PAUSE_SECONDS,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Init class."""
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.pause_seconds = pause_seconds
+        self.trip_count = 0
+        self._clock = clock
+        self._outcome_list: deque[bool] = deque(maxlen=window_size)
+        self._open_until = 0.0
+        self._lock = Lock()
+
+    @property
+    def remaining_seconds(self) -> float:
+        """Return the time until the breaker closes again."""
+        with self._lock:
+            return max(0.0, self._open_until - self._clock())
+
+    @property
+    def is_open(self) -> bool:
+        """Return True if callers are paused."""
+        return self.remaining_seconds > 0
+
+    def record(self, failed: bool) -> None:
+        """Record the outcome of an attempt, and open the breaker if needed."""
+        with self._lock:
+            self._outcome_list.append(failed)
+            if (
+                len(self._outcome_list) < self.min_calls
+                or sum(self._outcome_list) / len(self._outcome_list) < self.failure_rate
+            ):
+                return
+
+            self._open_until = self._clock() + self.pause_seconds
+            self._outcome_list.clear()
+            self.trip_count += 1
+
+        LOGGER.warning(
+            f"Too many failures, pausing all workers for {self.pause_seconds}s"
+        )
+
+
+@dataclass(frozen=True)
+class _RetryPolicy:
+    """Decide whether and when to try a call again."""
+
+    num_attempts: int
+    exc: type[BaseException]
+    log: bool
+    sleeptime: float
+    backoff: float
+    max_sleeptime: float
+    jitter: float
+    max_retry_after: float
+    retry_if: Callable[[BaseException], bool] | None
+    circuit_breaker: CircuitBreaker | None
+    stats: RetryStats
+
+    def is_retryable(self, err: BaseException) -> bool:
+        """Return True if an error is one to retry."""
+        return isinstance(err, self.exc) and (
+            self.retry_if is None or self.retry_if(err)
+        )
+
+    def record(self, err: BaseException | None) -> None:
+        """Record the outcome of an attempt."""
+        self.stats.record_attempt(err)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(
+                failed=err is not None and self.is_retryable(err)
+            )
+
+    def pause_seconds(self) -> float:
+        """Return the time to wait for the circuit breaker before an attempt."""
+        if self.circuit_breaker is None:
+            return 0.0
+        return self.circuit_breaker.remaining_seconds
+
+    def delay(self, attempt: int, err: BaseException) -> float:
+        """
+        Return the time to wait before the next attempt, and count the retry.
+
+        The wait grows by the backoff factor for every attempt, and a random part of
+        it is left out so that workers that failed together don't retry together. A
+        longer wait asked for with Retry-After is honoured, up to max_retry_after.
+        """
+        delay = min(self.max_sleeptime, self.sleeptime * self.backoff**attempt)
+        delay *= 1 - self.jitter * random.random()
+
+        is_retry_after = False
+        retry_after = retry_after_seconds(err)
+        if retry_after is not None and retry_after > delay:
+            delay = min(retry_after, self.max_retry_after)
+            is_retry_after = True
+
+        self.stats.record_retry(delay, is_retry_after)
+        if self.log:
+            LOGGER.warning(
+                f"Failed with error {err}, trying again in {delay:.1f}s",
+            )
+        return delay
+
+    def should_retry(self, attempt: int, err: BaseException) -> bool:
+        """
+        Return True if a failed attempt is to be tried again.
+
+        A server asking to wait longer than max_retry_after is not waited for.
+        """
+        retry_after = retry_after_seconds(err)
+        if (
+            attempt == self.num_attempts - 1
+            or not self.is_retryable(err)
+            or (retry_after is not None and retry_after > self.max_retry_after)
+        ):
+            self.stats.record_failure()
+            return False
+        return True
+
+
+def _retry_wrapper(func: Callable[..., RT], policy: _RetryPolicy) -> Callable[..., RT]:
+    """Wrap a function to retry it."""
+
+    @functools.wraps(func)
+    def func_wrapper(*args: Any, **kwargs: Any) -> RT:
+        """Wrap the function."""
+        policy.stats.record_call()
+        for attempt in range(policy.num_attempts):
+            if pause_seconds := policy.pause_seconds():
+                sleep(pause_seconds)
+            try:
+                result = func(*args, **kwargs)
+            except policy.exc as err:
+                policy.record(err)
+                if not policy.should_retry(attempt, err):
+                    raise
+                sleep(policy.delay(attempt, err))
+            else:
+                policy.record(None)
+                return result
+
+        raise ValueError("No attempts made")
+
+    return func_wrapper
+
+
+def _async_retry_wrapper(
+    func: Callable[..., Awaitable[RT]], policy: _RetryPolicy
+) -> Callable[..., Awaitable[RT]]:
+    """Wrap a coroutine function to retry it, waiting without blocking the loop."""
+
+    @functools.wraps(func)
+    async def func_wrapper(*args: Any, **kwargs: Any) -> RT:
+        """Wrap the coroutine function."""
+        policy.stats.record_call()
+        for attempt in range(policy.num_attempts):
+            if pause_seconds := policy.pause_seconds():
+                await asyncio.sleep(pause_seconds)
+            try:
+                result = await func(*args, **kwargs)
+            except policy.exc as err:
+                policy.record(err)
+                if not policy.should_retry(attempt, err):
+                    raise
+                await asyncio.sleep(policy.delay(attempt, err))
+            else:
+                policy.record(None)
+                return result
+
+        raise ValueError("No attempts made")
+
+    return func_wrapper
+
 
 def retry(
     num_attempts: int = 3,
     exc: type[BaseException] = Exception,
     log: bool = False,
-    sleeptime: int = 1,
+    sleeptime: float = 1,
+    *,
+    backoff: float = 1.0,
+    max_sleeptime: float = 60.0,
+    jitter: float = 0.0,
+    max_retry_after: float = MAX_RETRY_AFTER_SECONDS,
+    retry_if: Callable[[BaseException], bool] | None = None,
+    circuit_breaker: CircuitBreaker | None = None,
+    stats: RetryStats | None = None,
 ) -> Callable[[Callable[..., RT]], Callable[..., RT]]:
-    """Retry function."""
+    """
+    Retry function.
+
+    The wait starts at sleeptime and is multiplied by the backoff factor for each
+    attempt, up to max_sleeptime, with up to the jitter share of it left out at
+    random. By default the wait is always sleeptime. A longer wait asked for with
+    Retry-After is honoured, unless it's longer than max_retry_after, which fails the
+    call. Errors of type exc are retried, if retry_if says so. A circuit breaker
+    shared by several functions pauses all of them when too many attempts fail.
+
+    Coroutine functions are awaited and wait with asyncio. The statistics are kept in
+    stats, or in the retry_stats attribute of the decorated function.
+    """
 
     def decorator(func: Callable[..., RT]) -> Callable[..., RT]:
         """Create a decorator."""
+        policy = _RetryPolicy(
+            num_attempts=num_attempts,
+            exc=exc,
+            log=log,
+            sleeptime=sleeptime,
+            backoff=backoff,
+            max_sleeptime=max_sleeptime,
+            jitter=jitter,
+            max_retry_after=max_retry_after,
+            retry_if=retry_if,
+            circuit_breaker=circuit_breaker,
+            stats=stats or RetryStats(),
+        )
 
-        @functools.wraps(func)
-        def func_wrapper(*args: Any, **kwargs: Any) -> Any:
-            """Wrap the function."""
-            last_exception = None  # Initialize last_exception variable
-            for i in range(num_attempts):
-                try:
-                    return func(*args, **kwargs)
-                except exc as err:
-                    last_exception = err  # Update last_exception
-                    if i == num_attempts - 1:
-                        raise
-                    if log:
-                        LOGGER.warning(
-                            f"Failed with error {err}, trying again",
-                        )
-                    sleep(sleeptime)
-
-            # If all attempts fail, raise the last caught exception
-            if last_exception is not None:
-                raise last_exception  # Raise the last caught exception
-
-            raise ValueError(
-                "No exception occurred"
-            )  # Handle case where no exception was caught
-
-        return func_wrapper
+        wrapper: Callable[..., Any]
+        if inspect.iscoroutinefunction(func):
+            wrapper = _async_retry_wrapper(func, policy)
+        else:
+            wrapper = _retry_wrapper(func, policy)
+        setattr(wrapper, "retry_stats", policy.stats)
+        return cast(Callable[..., RT], wrapper)
 
     return decorator
@@ -0,0 +1,109 @@
+"""Common test helpers."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+from threading import Thread
+from typing import Any
+import zipfile
+
+PATH_SAMPLE_FILING = os.path.join("tests", "fixtures", "sample_filing")
+# The xBRL-JSON report of the sample filing, as saved by Arelle's saveLoadableOIM
+PATH_SAMPLE_FILING_JSON = os.path.join("tests", "fixtures", "sample_filing.json")
+# Arelle's web cache with the base taxonomy of the sample filing, which isn't packaged
+PATH_WEB_CACHE = os.path.abspath(os.path.join("tests", "fixtures", "web_cache"))
+
+
+def build_sample_filing_zip(zip_file_path: str, top_folder: str = "sample") -> str:
+    """Package the sample filing fixture as an ESEF report package."""
+    os.makedirs(os.path.dirname(zip_file_path), exist_ok=True)
+
+    with zipfile.ZipFile(zip_file_path, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        for subdir, _, files in os.walk(PATH_SAMPLE_FILING):
+            for file in sorted(files):
+                file_path = os.path.join(subdir, file)
+                zip_ref.write(
+                    file_path,
+                    os.path.join(
+                        top_folder, os.path.relpath(file_path, PATH_SAMPLE_FILING)
+                    ),
+                )
+
+    return zip_file_path
+
+
+def add_non_xbrl_files(zip_file_path: str, top_folder: str = "sample") -> None:
+    """Add an image, a PDF and a font that XBRL doesn't need to a package."""
+    with zipfile.ZipFile(zip_file_path, "a", zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.writestr(f"{top_folder}/reports/logo.png", os.urandom(50_000))
+        zip_ref.writestr(f"{top_folder}/reports/annual-report.pdf", os.urandom(50_000))
+        zip_ref.writestr(f"{top_folder}/reports/fonts/body.woff2", os.urandom(20_000))
+
+
+class FlakyPackageHandler(BaseHTTPRequestHandler):
+    """Serve a package, dropping the connection part of the way on the first try."""
+
+    payload = b""
+    etag = '"package-v1"'
+    drop_after = 0
+    range_header_list: list[str | None] = []
+
+    def log_message(self, *args: Any) -> None:
+        """Keep the test output quiet."""
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Serve the package, or the requested range of it."""
+        range_header = self.headers.get("Range")
+        self.range_header_list.append(range_header)
+
+        first_byte = 0
+        if range_header is not None and self.headers.get("If-Range") == self.etag:
+            first_byte = int(range_header.removeprefix("bytes=").rstrip("-"))
+            self.send_response(206)
+            self.send_header(
+                "Content-Range",
+                f"bytes {first_byte}-{len(self.payload) - 1}/{len(self.payload)}",
+            )
+        else:
+            self.send_response(200)
+
+        body = self.payload[first_byte:]
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+
+        if len(self.range_header_list) == 1:
+            # Drop the connection part of the way through the first transfer
+            self.wfile.write(body[: self.drop_after])
+            self.wfile.flush()
+            return
+
+        self.wfile.write(body)
+
+
+@contextmanager
+def serve_flaky_package(
+    payload: bytes, drop_after: int
+) -> Iterator[tuple[str, list[str | None]]]:
+    """Serve a package on a local port, yield its base URL and the Range headers."""
+    range_header_list: list[str | None] = []
+    handler = type(
+        "Handler",
+        (FlakyPackageHandler,),
+        {
+            "payload": payload,
+            "drop_after": drop_after,
+            "range_header_list": range_header_list,
+        },
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", range_header_list
+    finally:
+        server.shutdown()
+        server.server_close()
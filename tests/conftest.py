@@ -0,0 +1,75 @@
+"""Shared fixtures."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+import os
+from typing import Any
+from unittest.mock import patch
+
+from arelle.ModelXbrl import ModelXbrl
+import pytest
+
+from pyesef.parse_xbrl_file.common import (
+    Controller,
+    add_plugin_modules,
+    load_model_xbrl,
+)
+
+from tests.common import PATH_WEB_CACHE, build_sample_filing_zip
+
+
+@pytest.fixture
+def offline_controller() -> Iterator[None]:
+    """Keep Arelle offline, the base taxonomy of the sample filing is in the cache."""
+    original_init = Controller.__init__
+
+    def _init(self: Controller, *args: Any, **kwargs: Any) -> None:
+        original_init(self, *args, **kwargs)
+        self.webCache.workOffline = True
+        self.webCache.cacheDir = PATH_WEB_CACHE
+
+    with patch.object(Controller, "__init__", _init):
+        yield
+
+
+@pytest.fixture
+def sample_model_xbrl(tmp_path: str) -> Iterator[ModelXbrl]:
+    """Return the sample filing loaded with Arelle."""
+    cntlr = Controller()
+    cntlr.webCache.workOffline = True
+    cntlr.webCache.cacheDir = PATH_WEB_CACHE
+    add_plugin_modules()
+
+    model_xbrl = load_model_xbrl(
+        zip_file_path=build_sample_filing_zip(os.path.join(tmp_path, "sample.zip")),
+        cntlr=cntlr,
+    )
+    yield model_xbrl
+
+    model_xbrl.close()
+    cntlr.close()
+
+
+@pytest.fixture
+def sample_archive(tmp_path: str) -> Iterator[str]:
+    """Return an archive folder with a few copies of the sample filing."""
+    archive_folder = os.path.join(tmp_path, "archives")
+    for country, file_name in (
+        ("FI", "sample-fi.zip"),
+        ("SE", "sample-se-1.zip"),
+        ("SE", "sample-se-2.zip"),
+    ):
+        build_sample_filing_zip(os.path.join(archive_folder, country, file_name))
+
+    with (
+        patch(
+            "pyesef.parse_xbrl_file.read_and_save_filings.PATH_ARCHIVES",
+            archive_folder,
+        ),
+        patch(
+            "pyesef.parse_xbrl_file.save_excel.SaveToExcel.TEMPLATE_OUTPUT_PATH_EXCEL",
+            os.path.join(tmp_path, "output.xlsx"),
+        ),
+    ):
+        yield archive_folder
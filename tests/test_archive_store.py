@@ -0,0 +1,97 @@
+"""Tests for the content-addressed archive store."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+from pathlib import Path
+from unittest.mock import patch
+import zipfile
+
+from pyesef.download.archive_store import (
+    ArchiveStore,
+    has_valid_central_directory,
+    sha256_of_file,
+)
+from pyesef.download.common import Filing
+from pyesef.download.downloader import PackageDownloader
+
+
+def _write_zip(file_path: Path) -> bytes:
+    """Write a small zip file and return its content."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        zip_file.writestr("report.xhtml", "<html>" + "x" * 1000 + "</html>")
+    file_path.write_bytes(buffer.getvalue())
+    return buffer.getvalue()
+
+
+def test_has_valid_central_directory(tmp_path: Path) -> None:
+    """Test the central directory check."""
+    content = _write_zip(tmp_path / "package.zip")
+    assert has_valid_central_directory(str(tmp_path / "package.zip"))
+
+    (tmp_path / "truncated.zip").write_bytes(content[: len(content) // 2])
+    assert not has_valid_central_directory(str(tmp_path / "truncated.zip"))
+
+    (tmp_path / "empty.zip").write_bytes(b"")
+    assert not has_valid_central_directory(str(tmp_path / "empty.zip"))
+
+
+def test_archive_store(tmp_path: Path) -> None:
+    """Test that identical packages are stored once and verified on request."""
+    archive_store = ArchiveStore(str(tmp_path / "store"))
+    content = _write_zip(tmp_path / "first.zip")
+    sha256 = hashlib.sha256(content).hexdigest()
+    assert sha256_of_file(str(tmp_path / "first.zip")).hexdigest() == sha256
+
+    archive_store.add(str(tmp_path / "first.zip"), sha256, str(tmp_path / "SE/a.zip"))
+    _write_zip(tmp_path / "second.zip")
+    archive_store.add(str(tmp_path / "second.zip"), sha256, str(tmp_path / "FI/b.zip"))
+
+    assert archive_store.sha256_list() == [sha256]
+    assert not (tmp_path / "first.zip").exists()
+    assert not (tmp_path / "second.zip").exists()
+    assert os.path.samefile(tmp_path / "SE/a.zip", archive_store.package_path(sha256))
+    assert os.path.samefile(tmp_path / "FI/b.zip", archive_store.package_path(sha256))
+    assert not archive_store.verify_all()
+
+    # Flip a byte of the compressed member data, the central directory is intact
+    corrupt_content = bytearray(content)
+    corrupt_content[50] ^= 0xFF
+    corrupt_path = tmp_path / "corrupt.zip"
+    corrupt_path.write_bytes(corrupt_content)
+    corrupt_sha256 = hashlib.sha256(corrupt_content).hexdigest()
+    archive_store.add(str(corrupt_path), corrupt_sha256, str(tmp_path / "SE/c.zip"))
+
+    assert has_valid_central_directory(str(tmp_path / "SE/c.zip"))
+    assert archive_store.verify_all() == [corrupt_sha256]
+
+
+def test_package_downloader__stored(tmp_path: Path) -> None:
+    """Test that a package already in the store isn't downloaded again."""
+    archive_store = ArchiveStore(str(tmp_path / "store"))
+    content = _write_zip(tmp_path / "package.zip")
+    sha256 = hashlib.sha256(content).hexdigest()
+    archive_store.add(str(tmp_path / "package.zip"), sha256, str(tmp_path / "a.zip"))
+
+    filing = Filing(
+        country_iso_2="SE",
+        package_url="lei/2023-12-31/ESEF/SE/1/republished.zip",
+        period_end="2023-12-31",
+        lei="lei",
+        sha256=sha256,
+    )
+
+    with (
+        patch("pyesef.download.common.PATH_ARCHIVES", str(tmp_path)),
+        patch("requests.Session.get") as mock_get,
+    ):
+        meter = PackageDownloader(archive_store=archive_store).download([filing])
+
+    mock_get.assert_not_called()
+    assert meter.done_count == 1
+    assert os.path.samefile(
+        tmp_path / "SE" / "republished.zip", archive_store.package_path(sha256)
+    )
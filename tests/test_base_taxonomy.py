@@ -0,0 +1,66 @@
+"""Tests for the labels of the base taxonomy."""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from pyesef.parse_xbrl_file.base_taxonomy import (
+    BASE_TAXONOMY_MAX_ATTEMPTS,
+    BaseTaxonomyLabels,
+)
+from pyesef.parse_xbrl_file.common import Controller, add_plugin_modules
+
+NS_IFRS = "{http://xbrl.ifrs.org/taxonomy/2021-03-24/ifrs-full}"
+URL_IFRS = "http://xbrl.ifrs.org/taxonomy/2021-03-24/ifrs-full.xsd"
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_base_taxonomy_labels() -> None:
+    """Test that a base taxonomy is loaded once, and None given if it's missing."""
+    cntlr = Controller()
+    add_plugin_modules()
+    base_taxonomy_labels = BaseTaxonomyLabels()
+
+    with patch.object(
+        cntlr.modelManager, "load", wraps=cntlr.modelManager.load
+    ) as mock_load:
+        label_by_clark = base_taxonomy_labels.get([URL_IFRS], cntlr=cntlr)
+        assert base_taxonomy_labels.get([URL_IFRS], cntlr=cntlr) == label_by_clark
+
+    assert mock_load.call_count == 1
+    assert label_by_clark is not None
+    assert label_by_clark[f"{NS_IFRS}Revenue"] == "Revenue"
+    assert label_by_clark[f"{NS_IFRS}ProfitLoss"] == "Profit (loss)"
+
+    assert (
+        base_taxonomy_labels.get(
+            [URL_IFRS, "http://xbrl.ifrs.org/taxonomy/missing.xsd"], cntlr=cntlr
+        )
+        is None
+    )
+    # The ESEF checks are still run on the filings loaded after a base taxonomy
+    assert cntlr.modelManager.disclosureSystem.ESEFplugin  # pylint: disable=no-member
+
+    cntlr.close()
+
+
+def test_base_taxonomy_labels__retry() -> None:
+    """Test that a schema that failed to load is loaded again, a few times."""
+    base_taxonomy_labels = BaseTaxonomyLabels()
+    cntlr = Mock()
+
+    with patch(
+        "pyesef.parse_xbrl_file.base_taxonomy._load_labels",
+        side_effect=[None, {"{ns}A": "A"}],
+    ) as mock_load:
+        assert base_taxonomy_labels.get(["a.xsd"], cntlr=cntlr) is None
+        for _ in range(2):
+            assert base_taxonomy_labels.get(["a.xsd"], cntlr=cntlr) == {"{ns}A": "A"}
+    assert mock_load.call_count == 2
+
+    with patch(
+        "pyesef.parse_xbrl_file.base_taxonomy._load_labels", return_value=None
+    ) as mock_load:
+        for _ in range(BASE_TAXONOMY_MAX_ATTEMPTS + 2):
+            assert base_taxonomy_labels.get(["b.xsd"], cntlr=cntlr) is None
+    assert mock_load.call_count == BASE_TAXONOMY_MAX_ATTEMPTS
@@ -0,0 +1,16 @@
+"""Tests for the extraction profile benchmark."""
+
+import pytest
+
+from pyesef.parse_xbrl_file.benchmark import ExtractionProfile, benchmark_profiles
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_benchmark_profiles(sample_archive: str) -> None:
+    """Test that every filing is timed with both profiles."""
+    timing_list = benchmark_profiles(filing_folder=sample_archive)
+
+    assert len(timing_list) == 6
+    assert {timing.profile for timing in timing_list} == set(ExtractionProfile)
+    assert all(timing.fact_count == 15 for timing in timing_list)
+    assert all(timing.load_seconds > 0 for timing in timing_list)
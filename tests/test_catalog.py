@@ -0,0 +1,123 @@
+"""Tests for the filing catalog."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from pyesef.download.catalog import (
+    DownloadState,
+    FilingCatalog,
+    ParseState,
+)
+from pyesef.download.common import Filing
+from pyesef.parse_xbrl_file import ReadFiling
+
+
+def _filing(lei: str, country_iso_2: str = "SE", **kwargs: str) -> Filing:
+    """Return a filing."""
+    return Filing(
+        country_iso_2=country_iso_2,
+        package_url=kwargs.get("package_url", f"{lei}/package.zip"),
+        period_end=kwargs.get("period_end", "2023-12-31"),
+        lei=lei,
+        sha256=kwargs.get("sha256"),
+    )
+
+
+def test_filing_from_api() -> None:
+    """Test that a filing keeps the API attributes."""
+    with open("tests/fixtures/api_page.json", encoding="UTF-8") as api_file:
+        item = json.load(api_file)["data"][0]
+
+    filing = Filing.from_api(item)
+    assert filing.filing_id == int(item["id"])
+    assert filing.sha256 == item["attributes"]["sha256"]
+    assert (
+        filing.lei == item["relationships"]["entity"]["links"]["related"].split("/")[-1]
+    )
+
+
+def test_filing_catalog(tmp_path: Path) -> None:
+    """Test querying and updating the catalog."""
+    catalog = FilingCatalog(str(tmp_path / "catalog.sqlite"))
+    catalog.upsert(
+        [
+            _filing("A"),
+            _filing("B", period_end="2022-12-31"),
+            _filing("C", country_iso_2="FI"),
+        ]
+    )
+    assert len(catalog) == 3
+
+    assert [
+        filing.lei for filing in catalog.filings(country_iso_2="SE", year=2023)
+    ] == ["A"]
+    assert [
+        filing.lei for filing in catalog.filings(download_state=DownloadState.PENDING)
+    ] == ["A", "B", "C"]
+
+    catalog.record_download(_filing("A"), str(tmp_path / "A.zip"), "sha-a")
+    catalog.record_download(_filing("B", period_end="2022-12-31"), None, None)
+    assert [
+        filing.lei for filing in catalog.filings(download_state=DownloadState.FAILED)
+    ] == ["B"]
+    assert [row["sha256"] for row in catalog.packages_to_parse()] == ["sha-a"]
+
+    catalog.record_parse(str(tmp_path / "A.zip"), "sha-a", is_parsed=False)
+    assert not catalog.packages_to_parse()
+    assert len(catalog.packages_to_parse(retry_failed=True)) == 1
+
+    # The same filing again keeps its state, a new package starts over
+    catalog.upsert([_filing("A")])
+    assert catalog.filings(parse_state=ParseState.FAILED)[0].lei == "A"
+    catalog.upsert([_filing("A", package_url="A/republished.zip")])
+    assert catalog.filings(parse_state=ParseState.FAILED) == []
+    assert len(catalog) == 3
+
+    catalog.close()
+
+
+def test_filing_catalog__indexed(tmp_path: Path) -> None:
+    """Test that queries on country and period use an index."""
+    catalog = FilingCatalog(str(tmp_path / "catalog.sqlite"))
+    plan = catalog._connection.execute(  # pylint: disable=protected-access
+        "EXPLAIN QUERY PLAN SELECT * FROM filing "
+        "WHERE country_iso_2 = ? AND period_end BETWEEN ? AND ?",
+        ("SE", "2023-01-01", "2023-12-31"),
+    ).fetchall()
+    assert "USING INDEX filing_country_period" in str([tuple(row) for row in plan])
+    catalog.close()
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_read_and_save_filings__catalog(sample_archive: str, tmp_path: Path) -> None:
+    """Test that the parser takes its packages from the catalog."""
+    catalog = FilingCatalog(str(tmp_path / "catalog.sqlite"))
+    catalog.upsert([_filing("A"), _filing("B")])
+    catalog.record_download(
+        _filing("A"), os.path.join(sample_archive, "SE", "sample-se-1.zip"), None
+    )
+
+    read_filing = ReadFiling(catalog=catalog)
+    assert [item.zip_file_path for item in read_filing.file_to_parse_list] == [
+        os.path.join(sample_archive, "SE", "sample-se-1.zip")
+    ]
+    assert [
+        filing.lei for filing in catalog.filings(parse_state=ParseState.PARSED)
+    ] == ["A"]
+    assert not ReadFiling(catalog=catalog).file_to_parse_list
+
+    catalog.close()
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_read_and_save_filings__filing_folder(sample_archive: str) -> None:
+    """Test that the filing folder argument is the folder that is searched."""
+    read_filing = ReadFiling(filing_folder=os.path.join(sample_archive, "FI"))
+    assert [item.zip_file_path for item in read_filing.file_to_parse_list] == [
+        os.path.join(sample_archive, "FI", "sample-fi.zip")
+    ]
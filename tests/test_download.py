@@ -1,18 +1,430 @@
 """Tests for the download package."""
 
-from unittest.mock import patch
+import copy
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+import time
+from unittest.mock import MagicMock, Mock, patch
+import zipfile
 
-from pyesef.download.api_extractor import api_to_filing_record_list
+import pytest
+import requests
+
+from pyesef.download import is_valid_zip
+from pyesef.download.api_extractor import (
+    API_PAGE_SIZE,
+    API_URL,
+    FilingFilter,
+    api_to_filing_record_list,
+    sync_key,
+)
+from pyesef.download.archive_store import ArchiveStore
+from pyesef.download.common import Filing
+from pyesef.download.downloader import (
+    DOWNLOAD_CHUNK_SIZE,
+    HostRateLimiter,
+    PackageDownloader,
+    PartialDownload,
+    TokenBucket,
+)
+from pyesef.download.http_cache import HttpCache, SyncState
+from pyesef.download.stand_in import StandInConfig, serve_stand_in
+from pyesef.parse_xbrl_file.read_xbrl_json import json_report_path, read_xbrl_json
+
+from tests.common import serve_flaky_package
+
+
+def _load_api_page() -> dict:
+    """Load the API page fixture."""
+    with open("tests/fixtures/api_page.json", "rb") as _file:
+        return json.loads(_file.read())
+
+
+def _response(data: dict) -> Mock:
+    """Return a mocked response with JSON data."""
+    response = Mock()
+    response.json.return_value = data
+    return response
 
 
 def test_api_to_filing_record_list() -> None:
     """Test function api_to_filing_record_list."""
-    with patch("urllib.request.urlopen") as mock_url:
-        with open("tests/fixtures/api_page.json", "rb") as _file:
-            # Set the return value of mock_urlopen
-            mock_url.return_value.__enter__.return_value.read.return_value = (
-                _file.read()
+    with patch(
+        "requests.Session.get", return_value=_response(_load_api_page())
+    ) as mock_get:
+        x = api_to_filing_record_list()
+        assert len(x) == 2
+
+    # One query for each Nordic country, 40 filings fit on a single page
+    assert mock_get.call_count == 5
+    assert mock_get.call_args_list[0].args[0] == f"{API_URL}1&filter%5Bcountry%5D=DK"
+
+
+def test_api_to_filing_record_list__pages_in_order() -> None:
+    """Test that pages fetched in parallel are merged in page order."""
+    api_page = _load_api_page()
+    api_page["meta"]["count"] = 1200
+    swedish_filing = next(
+        filing for filing in api_page["data"] if filing["attributes"]["country"] == "SE"
+    )
+
+    page_by_url = {}
+    for page_no in (1, 2, 3):
+        page = copy.deepcopy(api_page)
+        filing = copy.deepcopy(swedish_filing)
+        filing["attributes"]["period_end"] = f"202{page_no}-12-31"
+        page["data"] = [filing]
+        page_by_url[f"{API_URL}{page_no}&filter%5Bcountry%5D=SE"] = page
+
+    def _get(url: str, timeout: int) -> Mock:
+        assert timeout > 0
+        # Let page 2 finish after page 3
+        time.sleep(0.1 if f"{API_URL}2&" in url else 0)
+        return _response(page_by_url[url])
+
+    with patch("requests.Session.get", side_effect=_get) as mock_get:
+        filing_list = api_to_filing_record_list(
+            max_workers=2, filing_filter=FilingFilter(country_list=("SE",))
+        )
+
+    assert mock_get.call_count == 3
+    assert [filing.period_end for filing in filing_list] == [
+        "2021-12-31",
+        "2022-12-31",
+        "2023-12-31",
+    ]
+
+
+def test_api_to_filing_record_list__conditional_requests(tmp_path: Path) -> None:
+    """Test that an unchanged catalog is served from the cache on the next sync."""
+    api_page = _load_api_page()
+    http_cache = HttpCache(cache_folder=str(tmp_path))
+
+    first_response = _response(api_page)
+    first_response.status_code = 200
+    first_response.content = json.dumps(api_page).encode()
+    first_response.headers = {"ETag": '"v1"', "Last-Modified": "Mon, 1 Jan 2024"}
+
+    with patch("requests.Session.get", return_value=first_response) as mock_get:
+        first_filing_list = api_to_filing_record_list(
+            http_cache=http_cache, filing_filter=FilingFilter(country_list=("SE",))
+        )
+
+    assert mock_get.call_args.kwargs["headers"] == {}
+    key = sync_key(FilingFilter(country_list=("SE",)).query_list())
+    sync_state = SyncState.load(key, str(tmp_path))
+    assert sync_state.max_filing_id == max(int(item["id"]) for item in api_page["data"])
+    assert sync_state.max_date_added
+
+    not_modified_response = Mock(status_code=304, content=b"")
+    with patch("requests.Session.get", return_value=not_modified_response) as mock_get:
+        second_filing_list = api_to_filing_record_list(
+            http_cache=http_cache, filing_filter=FilingFilter(country_list=("SE",))
+        )
+
+    assert mock_get.call_args.kwargs["headers"] == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 1 Jan 2024",
+    }
+    not_modified_response.json.assert_not_called()
+    assert second_filing_list == first_filing_list
+    assert http_cache.hit_count == 1
+    assert SyncState.load(key, str(tmp_path)) == sync_state
+
+
+def test_api_to_filing_record_list__incremental_sync(tmp_path: Path) -> None:
+    """Test that the next sync only fetches the pages with filings added since."""
+    api_page = _load_api_page()
+    swedish_filing = next(
+        filing for filing in api_page["data"] if filing["attributes"]["country"] == "SE"
+    )
+
+    def _response_by_url(filing_count: int) -> dict[str, Mock]:
+        # One filing on each page, the newest first
+        response_by_url = {}
+        for page_no in range(1, filing_count + 1):
+            filing_no = filing_count - page_no + 1
+            filing = copy.deepcopy(swedish_filing)
+            filing["id"] = str(filing_no)
+            filing["attributes"]["period_end"] = f"20{10 + filing_no}-12-31"
+            filing["attributes"]["date_added"] = f"2024-01-{filing_no:02} 00:00:00"
+            page = copy.deepcopy(api_page)
+            page["meta"]["count"] = filing_count * API_PAGE_SIZE
+            page["data"] = [filing]
+            response = _response(page)
+            response.status_code = 200
+            response.content = json.dumps(page).encode()
+            response.headers = {}
+            response_by_url[f"{API_URL}{page_no}&filter%5Bcountry%5D=SE"] = response
+        return response_by_url
+
+    def _get(url: str, **_: object) -> Mock:
+        return response_by_url[url]
+
+    http_cache = HttpCache(cache_folder=str(tmp_path))
+    filing_filter = FilingFilter(country_list=("SE",))
+    for filing_count in (3, 5):
+        response_by_url = _response_by_url(filing_count)
+        with patch("requests.Session.get", side_effect=_get) as mock_get:
+            filing_list = api_to_filing_record_list(
+                http_cache=http_cache, filing_filter=filing_filter
             )
 
-            x = api_to_filing_record_list()
-            assert len(x) == 2
+    # The two new filings, and the page that showed there were no more
+    assert [call.args[0] for call in mock_get.call_args_list] == list(response_by_url)[
+        :3
+    ]
+    assert [filing.filing_id for filing in filing_list] == [5, 4, 3]
+    sync_state = SyncState.load(sync_key(filing_filter.query_list()), str(tmp_path))
+    assert sync_state.max_filing_id == 5
+    assert sync_state.max_date_added == "2024-01-05 00:00:00"
+
+
+def test_filing_filter() -> None:
+    """Test that filters the API supports are pushed down and the rest kept."""
+    filing_filter = FilingFilter(
+        country_list=("SE", "FI"), lei_list=("lei-a",), period_end="2023-12-31"
+    )
+    assert filing_filter.query_list() == [
+        {"filter[country]": "SE", "filter[period_end]": "2023-12-31"},
+        {"filter[country]": "FI", "filter[period_end]": "2023-12-31"},
+    ]
+
+    # A year can't be filtered by the API
+    assert FilingFilter(country_list=(), period_end="2023").query_list() == [{}]
+
+    def _filing(
+        country_iso_2: str = "SE", period_end: str = "2023-12-31", lei: str = "lei-a"
+    ) -> Filing:
+        return Filing(
+            country_iso_2=country_iso_2,
+            package_url="package.zip",
+            period_end=period_end,
+            lei=lei,
+        )
+
+    assert filing_filter.matches(_filing())
+    assert not filing_filter.matches(_filing(country_iso_2="NO"))
+    assert not filing_filter.matches(_filing(lei="lei-b"))
+    assert not filing_filter.matches(_filing(period_end="2022-12-31"))
+    assert FilingFilter(period_end="2023").matches(_filing())
+
+
+def test_api_to_filing_record_list__filter_fallback() -> None:
+    """Test that filings are filtered locally when the API ignores a filter."""
+    with patch(
+        "requests.Session.get", return_value=_response(_load_api_page())
+    ) as mock_get:
+        filing_list = api_to_filing_record_list(
+            filing_filter=FilingFilter(country_list=("NO",))
+        )
+
+    mock_get.assert_called_once()
+    assert [filing.country_iso_2 for filing in filing_list] == ["NO"]
+
+
+def test_token_bucket() -> None:
+    """Test that a token bucket allows a burst and then waits for new tokens."""
+    now = [0.0]
+    sleep_list: list[float] = []
+
+    def _sleep(seconds: float) -> None:
+        sleep_list.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=lambda: now[0], sleep=_sleep)
+    for _ in range(3):
+        bucket.acquire()
+
+    assert sleep_list == [0.5]
+
+
+def _zip_bytes() -> bytes:
+    """Return the bytes of a small zip file."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        zip_file.writestr("report.xhtml", "<html/>")
+    return buffer.getvalue()
+
+
+def test_package_downloader(tmp_path: Path) -> None:
+    """Test that packages are downloaded in parallel and failures are counted."""
+    filing_list = [
+        Filing(
+            country_iso_2="SE",
+            package_url=f"lei{idx}/2023-12-31/ESEF/SE/0/package-{idx}.zip",
+            period_end="2023-12-31",
+            lei=f"lei{idx}",
+        )
+        for idx in range(5)
+    ]
+    content = _zip_bytes()
+
+    def _get(url: str, **kwargs: object) -> MagicMock:
+        assert kwargs["stream"] is True
+        response = MagicMock()
+        response.__enter__.return_value = response
+        if url.endswith("package-3.zip"):
+            response.raise_for_status.side_effect = requests.HTTPError("404")
+        response.status_code = 200
+        response.headers = {"Content-Length": str(len(content))}
+        response.iter_content.return_value = [content[:10], content[10:]]
+        return response
+
+    with (
+        patch("pyesef.download.common.PATH_ARCHIVES", str(tmp_path)),
+        patch("pyesef.utils.decorators.sleep"),
+        patch("requests.Session.get", side_effect=_get),
+    ):
+        meter = PackageDownloader(
+            max_workers=3,
+            rate_limiter=HostRateLimiter(rate=1000, capacity=1000),
+            archive_store=ArchiveStore(str(tmp_path / "store")),
+            verify_in_background=True,
+        ).download(filing_list)
+
+    assert meter.done_count == 5
+    assert meter.failed_count == 1
+    assert meter.byte_count == 4 * len(content)
+    assert sorted(os.listdir(tmp_path / "SE")) == [
+        "package-0.zip",
+        "package-1.zip",
+        "package-2.zip",
+        "package-4.zip",
+    ]
+    assert is_valid_zip(str(tmp_path / "SE" / "package-0.zip"))
+
+    # The packages have the same content, so they are stored once
+    sha256 = hashlib.sha256(content).hexdigest()
+    assert ArchiveStore(str(tmp_path / "store")).sha256_list() == [sha256]
+    assert os.path.samefile(
+        tmp_path / "SE" / "package-0.zip", tmp_path / "SE" / "package-4.zip"
+    )
+
+
+def test_package_downloader__resume(tmp_path: Path) -> None:
+    """Test that a dropped download is resumed with a Range request."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        zip_file.writestr("report.xhtml", os.urandom(200_000))
+    payload = buffer.getvalue()
+
+    filing = Filing(
+        country_iso_2="SE",
+        package_url="lei/2023-12-31/ESEF/SE/0/package.zip",
+        period_end="2023-12-31",
+        lei="lei",
+    )
+
+    with (
+        serve_flaky_package(payload, drop_after=80_000) as server,
+        patch("pyesef.download.common.BASE_URL", server[0]),
+        patch("pyesef.download.common.PATH_ARCHIVES", str(tmp_path)),
+        patch("pyesef.utils.decorators.sleep"),
+    ):
+        meter = PackageDownloader(
+            max_workers=1,
+            rate_limiter=HostRateLimiter(rate=1000, capacity=1000),
+            archive_store=ArchiveStore(str(tmp_path / "store")),
+        ).download([filing])
+
+    assert meter.failed_count == 0
+    # The chunk being read when the connection dropped is downloaded again
+    assert server[1] == [None, f"bytes={DOWNLOAD_CHUNK_SIZE}-"]
+    assert meter.byte_count == len(payload)
+    assert sorted(os.listdir(tmp_path / "SE")) == ["package.zip"]
+    assert (tmp_path / "SE" / "package.zip").read_bytes() == payload
+
+
+def test_partial_download__changed_file(tmp_path: Path) -> None:
+    """Test that a .part file is dropped when the server sends the whole file."""
+    part_download = PartialDownload(
+        part_path=str(tmp_path / "package.zip.part"), etag='"v1"', content_length=10
+    )
+    (tmp_path / "package.zip.part").write_bytes(b"12345")
+    part_download.save()
+
+    part_download = PartialDownload.load(str(tmp_path / "package.zip"))
+    assert part_download.range_headers() == {"Range": "bytes=5-", "If-Range": '"v1"'}
+
+    # The file changed on the server, so the If-Range fails and we get all of it
+    response = Mock(status_code=200, headers={"ETag": '"v2"', "Content-Length": "20"})
+    assert part_download.start(response) is False
+    assert PartialDownload.load(str(tmp_path / "package.zip")).etag == '"v2"'
+
+    # A range that doesn't start where the .part file ends is rejected
+    response = Mock(status_code=206, headers={"Content-Range": "bytes 3-19/20"})
+    with pytest.raises(OSError):
+        part_download.start(response)
+    assert not os.listdir(tmp_path)
+
+
+def test_package_downloader__stale_part(tmp_path: Path) -> None:
+    """Test that a .part file longer than the package is dropped on a 416."""
+    config = StandInConfig(filing_count=1, package_size=1024, country_list=("SE",))
+    with (
+        serve_stand_in(config) as base_url,
+        patch("pyesef.utils.decorators.sleep"),
+    ):
+        filing_list = api_to_filing_record_list(
+            http_cache=HttpCache(str(tmp_path / "cache")),
+            filing_filter=FilingFilter(country_list=("SE",)),
+            base_url=base_url,
+        )
+        response = requests.get(filing_list[0].file_url_at(base_url), timeout=5)
+        write_location = filing_list[0].write_location_in(str(tmp_path / "archives"))
+        os.makedirs(os.path.dirname(write_location))
+        part_download = PartialDownload(
+            part_path=f"{write_location}.part",
+            etag=response.headers["ETag"],
+            content_length=len(response.content) * 3,
+        )
+        part_download.save()
+        with open(part_download.part_path, "wb") as part_file:
+            part_file.write(response.content * 2)
+
+        meter = PackageDownloader(
+            max_workers=1,
+            rate_limiter=HostRateLimiter(rate=1000, capacity=1000),
+            archive_store=ArchiveStore(str(tmp_path / "store")),
+            base_url=base_url,
+            archive_folder=str(tmp_path / "archives"),
+        ).download(filing_list)
+
+    assert meter.failed_count == 0
+    assert sorted(os.listdir(os.path.dirname(write_location))) == [
+        os.path.basename(write_location)
+    ]
+    with open(write_location, "rb") as package_file:
+        assert package_file.read() == response.content
+
+
+def test_package_downloader__json(tmp_path: Path) -> None:
+    """Test that the xBRL-JSON reports are downloaded next to their packages."""
+    config = StandInConfig(filing_count=3, package_size=1024, country_list=("SE",))
+    with serve_stand_in(config) as base_url:
+        filing_list = api_to_filing_record_list(
+            http_cache=HttpCache(str(tmp_path / "cache")),
+            filing_filter=FilingFilter(country_list=("SE",)),
+            base_url=base_url,
+        )
+        downloader = PackageDownloader(
+            rate_limiter=HostRateLimiter(rate=1000, capacity=1000),
+            archive_store=ArchiveStore(str(tmp_path / "store")),
+            base_url=base_url,
+            archive_folder=str(tmp_path / "archives"),
+            fetch_json=True,
+        )
+        meter = downloader.download(filing_list)
+
+    assert meter.failed_count == 0
+    file_name_list = sorted(os.listdir(tmp_path / "archives" / "SE"))
+    assert len(file_name_list) == 6
+    for filing in filing_list:
+        json_file_path = json_report_path(
+            filing.write_location_in(str(tmp_path / "archives"))
+        )
+        assert read_xbrl_json(json_file_path).contexts["f1"].lei == filing.lei
@@ -0,0 +1,127 @@
+"""Tests for the processing ledger."""
+
+import os
+from unittest.mock import patch
+import zipfile
+
+import pytest
+
+from pyesef.error import PyEsefError
+from pyesef.parse_xbrl_file.ledger import (
+    FailureClass,
+    LedgerStatus,
+    ProcessingLedger,
+    classify_failure,
+)
+from pyesef.parse_xbrl_file.read_and_save_filings import ReadFiling
+
+
+def test_classify_failure() -> None:
+    """Test that failures are classified by their root cause."""
+    try:
+        try:
+            raise TimeoutError("timed out")
+        except TimeoutError as exc:
+            raise OSError("File not loaded due to ", exc) from exc
+    except OSError as exc:
+        assert classify_failure(exc) == FailureClass.TRANSIENT
+
+    assert classify_failure(zipfile.BadZipFile()) == FailureClass.INVALID_PACKAGE
+    assert classify_failure(PyEsefError("bad fact")) == FailureClass.PARSE
+    assert classify_failure(MemoryError()) == FailureClass.TRANSIENT
+
+    # Local files that are missing or can't be read won't appear by themselves
+    for local_exc in (FileNotFoundError(), PermissionError(), IsADirectoryError()):
+        try:
+            raise OSError("File not loaded due to ", local_exc) from local_exc
+        except OSError as exc:
+            assert classify_failure(exc) == FailureClass.PARSE
+
+
+def test_ledger__persisted(tmp_path: str) -> None:
+    """Test that a ledger is read back from disk."""
+    ledger_path = os.path.join(tmp_path, "ledger.jsonl")
+    zip_file_path = os.path.join(tmp_path, "package.zip")
+    with open(zip_file_path, "wb") as zip_file:
+        zip_file.write(b"package")
+
+    ledger = ProcessingLedger(ledger_path)
+    sha256 = ledger.package_sha256(zip_file_path)
+    ledger.record(
+        sha256=sha256,
+        zip_file_path=zip_file_path,
+        parse_seconds=1.0,
+        failure_class=FailureClass.TRANSIENT,
+        error="timed out",
+    )
+
+    reloaded_ledger = ProcessingLedger(ledger_path)
+    entry = reloaded_ledger.entry_by_sha256[sha256]
+    assert entry.status == LedgerStatus.FAILED
+    assert entry.failure_class == FailureClass.TRANSIENT
+    assert reloaded_ledger.should_skip(sha256)
+    assert not reloaded_ledger.should_skip(sha256, retry_failed=True)
+
+    with patch("pyesef.parse_xbrl_file.ledger.file_sha256", side_effect=AssertionError):
+        # The file is unchanged, so it isn't hashed again
+        assert reloaded_ledger.package_sha256(zip_file_path) == sha256
+
+
+def test_ledger__torn_line(tmp_path: str) -> None:
+    """Test that lines that can't be read are skipped."""
+    ledger_path = os.path.join(tmp_path, "ledger.jsonl")
+    zip_file_path = os.path.join(tmp_path, "package.zip")
+    with open(zip_file_path, "wb") as zip_file:
+        zip_file.write(b"package")
+
+    ledger = ProcessingLedger(ledger_path)
+    sha256 = ledger.package_sha256(zip_file_path)
+    ledger.record(sha256=sha256, zip_file_path=zip_file_path, parse_seconds=1.0)
+    with open(ledger_path, "a", encoding="UTF-8") as ledger_file:
+        ledger_file.write('{"sha256": "abc", "unknown_field": 1}\n')
+        ledger_file.write('{"sha256": "def", "zip_file_path": "pack')
+
+    reloaded_ledger = ProcessingLedger(ledger_path)
+    assert list(reloaded_ledger.entry_by_sha256) == [sha256]
+    assert reloaded_ledger.should_skip(sha256)
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_read_and_save_filings__ledger(sample_archive: str, tmp_path: str) -> None:
+    """Test that packages in the ledger are skipped unless retried."""
+    ledger_path = os.path.join(tmp_path, "ledger.jsonl")
+    with open(os.path.join(sample_archive, "SE", "broken.zip"), "wb") as zip_file:
+        zip_file.write(b"not a zip file")
+
+    def _failure_class_list() -> list[FailureClass | None]:
+        return [
+            entry.failure_class
+            for entry in ProcessingLedger(ledger_path).entry_by_sha256.values()
+        ]
+
+    with patch(
+        "pyesef.parse_xbrl_file.read_and_save_filings.load_model_xbrl",
+        side_effect=TimeoutError("timed out"),
+    ):
+        ReadFiling(ledger=ProcessingLedger(ledger_path))
+
+    # The copies of the sample filing share a single entry, the broken package is
+    # rejected by the triage before it is loaded
+    assert set(_failure_class_list()) == {
+        FailureClass.TRANSIENT,
+        FailureClass.INVALID_PACKAGE,
+    }
+
+    read_filing = ReadFiling(ledger=ProcessingLedger(ledger_path))
+    assert not read_filing.file_to_parse_list
+    assert read_filing.skipped_file_count == 4
+
+    # The copies of the sample filing are only parsed once
+    read_filing = ReadFiling(ledger=ProcessingLedger(ledger_path), retry_failed=True)
+    assert len(read_filing.file_to_parse_list) == 1
+    assert read_filing.skipped_file_count == 3
+    assert set(_failure_class_list()) == {FailureClass.INVALID_PACKAGE, None}
+
+    # Neither a parsed nor an invalid package is retried
+    read_filing = ReadFiling(ledger=ProcessingLedger(ledger_path), retry_failed=True)
+    assert read_filing.skipped_file_count == 4
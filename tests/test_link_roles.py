@@ -0,0 +1,40 @@
+"""Tests for the link role index."""
+
+from arelle.ModelXbrl import ModelXbrl
+
+from pyesef.parse_xbrl_file.link_roles import LinkRoleIndex, extract_link_role_index
+
+ROLE_INCOME = "http://www.example.com/role/IncomeStatement"
+ROLE_BALANCE = "http://www.example.com/role/BalanceSheet"
+NS_IFRS = "{http://xbrl.ifrs.org/taxonomy/2021-03-24/ifrs-full}"
+
+
+def test_link_role_index__first_role_wins() -> None:
+    """Test that an item summed in several roles keeps its first role."""
+    link_role_index = LinkRoleIndex()
+    link_role_index.add(ROLE_INCOME, "{ns}ProfitLoss", "{ns}Revenue", "Revenue")
+    link_role_index.add(ROLE_BALANCE, "{ns}Assets", "{ns}Revenue", "Revenue")
+
+    assert link_role_index.linkrole_by_concept == {"Revenue": "IncomeStatement"}
+    assert link_role_index.concepts_by_role[ROLE_BALANCE] == {
+        "{ns}Assets",
+        "{ns}Revenue",
+    }
+    assert link_role_index.roles_of("{ns}Revenue") == [ROLE_INCOME, ROLE_BALANCE]
+
+
+def test_extract_link_role_index(sample_model_xbrl: ModelXbrl) -> None:
+    """Test that the summation-item network of a filing is indexed."""
+    link_role_index = extract_link_role_index(model_xbrl=sample_model_xbrl)
+
+    assert link_role_index.linkrole_by_concept == {
+        "Revenue": "IncomeStatement",
+        "OtherOperatingIncome": "IncomeStatement",
+        "NoncurrentAssets": "BalanceSheet",
+        "CurrentAssets": "BalanceSheet",
+    }
+    assert link_role_index.concepts_by_role[ROLE_BALANCE] == {
+        f"{NS_IFRS}Assets",
+        f"{NS_IFRS}NoncurrentAssets",
+        f"{NS_IFRS}CurrentAssets",
+    }
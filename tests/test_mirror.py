@@ -0,0 +1,163 @@
+"""Tests for the mirror of downloaded packages."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+import requests
+
+from pyesef.download import download_packages
+from pyesef.download.api_extractor import FilingFilter, api_to_filing_record_list
+from pyesef.download.api_pages import API_FILINGS_PATH
+from pyesef.download.archive_store import ArchiveStore
+from pyesef.download.catalog import FilingCatalog
+from pyesef.download.downloader import HostRateLimiter
+from pyesef.download.http_cache import HttpCache
+from pyesef.download.mirror import RangeNotSatisfiableError, parse_range, serve_mirror
+from pyesef.download.stand_in import StandInConfig, serve_stand_in
+
+
+def test_parse_range() -> None:
+    """Test which byte ranges are served."""
+    assert parse_range("bytes=10-", 100) == (10, 99)
+    assert parse_range("bytes=10-19", 100) == (10, 19)
+    assert parse_range("bytes=90-200", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    assert parse_range("bytes=a-", 100) is None
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range("bytes=100-", 100)
+
+
+def _check_pages(url: str) -> None:
+    """Check that pages are cut from the catalog, and bad parameters rejected."""
+    page_url = f"{url.rstrip('/')}{API_FILINGS_PATH}"
+    params = {"filter[country]": "SE", "page[size]": "3", "page[number]": "2"}
+    page = requests.get(page_url, params=params, timeout=5).json()
+    assert page["meta"]["count"] == 4
+    assert page["links"]["last"] == 2
+    assert len(page["data"]) == 1
+    params = {"sort": "-date_added", "page[size]": "2"}
+    page = requests.get(page_url, params=params, timeout=5).json()
+    date_added_list = [item["attributes"]["date_added"] for item in page["data"]]
+    assert date_added_list == sorted(date_added_list, reverse=True)
+    params = {"filter[country]": "NO"}
+    assert requests.get(page_url, params=params, timeout=5).json()["data"] == []
+    for params in (
+        {"page[size]": "many"},
+        {"page[number]": "x"},
+        {"page[size]": "0"},
+        {"sort": "lei"},
+    ):
+        assert requests.get(page_url, params=params, timeout=5).status_code == 400
+
+
+def test_mirror(tmp_path: Path) -> None:
+    """Test that a node downloads from the mirror of another node."""
+    filing_filter = FilingFilter(country_list=("SE",))
+    rate_limiter = HostRateLimiter(rate=1000, capacity=1000)
+    config = StandInConfig(filing_count=4, package_size=4096, country_list=("SE",))
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    with serve_stand_in(config) as base_url:
+        download_packages(
+            filing_filter=filing_filter,
+            base_url=base_url,
+            data_folder=str(tmp_path / "a"),
+            rate_limiter=rate_limiter,
+            fetch_json=True,
+        )
+
+    with serve_mirror(host="127.0.0.1", port=0, data_folder=str(tmp_path / "a")) as url:
+        meter = download_packages(
+            filing_filter=filing_filter,
+            base_url=url,
+            data_folder=str(tmp_path / "b"),
+            rate_limiter=rate_limiter,
+            fetch_json=True,
+        )
+        # Nothing has changed, so the page is answered with 304 Not Modified
+        http_cache = HttpCache(str(tmp_path / "cache"))
+        for _ in range(2):
+            filing_list = api_to_filing_record_list(
+                http_cache=http_cache, filing_filter=filing_filter, base_url=url
+            )
+        assert http_cache.hit_count == 1
+        assert len(filing_list) == 4
+        assert all(filing.json_url is not None for filing in filing_list)
+
+        catalog = FilingCatalog(str(tmp_path / "b" / "catalog.sqlite"))
+        filing = catalog.filings()[0]
+        catalog.close()
+        content = (tmp_path / "a" / "archives" / "SE" / filing.file_name).read_bytes()
+        package_url = filing.file_url_at(url)
+
+        response = requests.get(package_url, headers={"Range": "bytes=100-"}, timeout=5)
+        assert response.status_code == 206
+        assert response.content == content[100:]
+        assert (
+            response.headers["Content-Range"]
+            == f"bytes 100-{len(content) - 1}/{len(content)}"
+        )
+
+        etag = response.headers["ETag"]
+        assert etag == f'"{filing.sha256}"'
+        headers = {"Range": "bytes=100-", "If-Range": '"changed"'}
+        assert requests.get(package_url, headers=headers, timeout=5).content == content
+        response = requests.get(package_url, headers={"If-None-Match": etag}, timeout=5)
+        assert response.status_code == 304
+        headers = {"If-Modified-Since": response.headers["Last-Modified"]}
+        assert requests.get(package_url, headers=headers, timeout=5).status_code == 304
+        headers = {"Range": f"bytes={len(content)}-"}
+        assert requests.get(package_url, headers=headers, timeout=5).status_code == 416
+        assert requests.get(f"{url}unknown.zip", timeout=5).status_code == 404
+
+        _check_pages(url)
+
+    assert meter.failed_count == 0
+    assert sorted(os.listdir(tmp_path / "b" / "archives" / "SE")) == sorted(
+        os.listdir(tmp_path / "a" / "archives" / "SE")
+    )
+    assert len(os.listdir(tmp_path / "b" / "archives" / "SE")) == 8
+
+
+def test_mirror__slim(tmp_path: Path) -> None:
+    """Test that slim packages are served with their own ETag and stored as slim."""
+    filing_filter = FilingFilter(country_list=("SE",))
+    rate_limiter = HostRateLimiter(rate=1000, capacity=1000)
+    config = StandInConfig(filing_count=2, package_size=4096, country_list=("SE",))
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    with serve_stand_in(config) as base_url:
+        download_packages(
+            filing_filter=filing_filter,
+            base_url=base_url,
+            data_folder=str(tmp_path / "a"),
+            rate_limiter=rate_limiter,
+            slim=True,
+        )
+
+    with serve_mirror(host="127.0.0.1", port=0, data_folder=str(tmp_path / "a")) as url:
+        meter = download_packages(
+            filing_filter=filing_filter,
+            base_url=url,
+            data_folder=str(tmp_path / "b"),
+            rate_limiter=rate_limiter,
+        )
+        catalog = FilingCatalog(str(tmp_path / "b" / "catalog.sqlite"))
+        filing_list = catalog.filings()
+        catalog.close()
+        response = requests.head(filing_list[0].file_url_at(url), timeout=5)
+
+    assert meter.failed_count == 0
+    assert response.headers["ETag"] != f'"{filing_list[0].sha256}"'
+
+    # The packages are stored by the hash of the packages they were made from
+    archive_store = ArchiveStore(str(tmp_path / "b" / "store"))
+    assert archive_store.sha256_list() == sorted(
+        str(filing.sha256) for filing in filing_list
+    )
+    assert not archive_store.verify_all()
@@ -0,0 +1,59 @@
+"""Tests for the crawl, download and parse pipeline."""
+
+import os
+from pathlib import Path
+import time
+from unittest.mock import patch
+
+import pytest
+
+from pyesef.download.api_extractor import FilingFilter
+from pyesef.download.catalog import FilingCatalog, ParseState
+from pyesef.download.downloader import HostRateLimiter
+from pyesef.download.pipeline import run_pipeline
+from pyesef.download.stand_in import StandInConfig, serve_stand_in
+from pyesef.parse_xbrl_file.read_and_save_filings import (
+    ParseListData,
+    ParseResult,
+    ReadFiling,
+)
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_run_pipeline(tmp_path: Path) -> None:
+    """Test that packages are parsed as they land, never far behind the downloads."""
+    archive_folder = tmp_path / "archives"
+    ahead_count_list: list[int] = []
+
+    def _parse_file(
+        self: ReadFiling, parse_list_data: ParseListData, **_: object
+    ) -> ParseResult:
+        # Count the packages on disk that the parser hasn't got to yet
+        ahead_count_list.append(
+            len(list(archive_folder.rglob("*.zip"))) - len(self.file_to_parse_list) - 1
+        )
+        # A slow parser, so the downloads get ahead of it
+        time.sleep(0.05)
+        return ParseResult(parse_list_data=parse_list_data, error="not ESEF")
+
+    config = StandInConfig(filing_count=12, package_size=4096, country_list=("SE",))
+    with (
+        serve_stand_in(config) as base_url,
+        patch.object(ReadFiling, "parse_file", _parse_file),
+    ):
+        read_filing = run_pipeline(
+            max_workers=2,
+            filing_filter=FilingFilter(country_list=("SE",)),
+            queue_size=3,
+            base_url=base_url,
+            data_folder=str(tmp_path),
+            rate_limiter=HostRateLimiter(rate=1000.0, capacity=1000),
+        )
+
+    assert len(read_filing.file_to_parse_list) == 12
+    assert 0 < max(ahead_count_list) <= 3
+    assert os.path.exists(tmp_path / "ledger.jsonl")
+
+    catalog = FilingCatalog(str(tmp_path / "catalog.sqlite"))
+    assert len(catalog.filings(parse_state=ParseState.FAILED)) == 12
+    catalog.close()
@@ -1,15 +1,48 @@
 """Tests for read and save filings."""
 
+from collections.abc import Iterator
 from datetime import date
+import hashlib
+import logging
 import os
+from pathlib import Path
+import shutil
+from typing import Any, cast
 from unittest.mock import patch
+import zipfile
 
-from pyesef.parse_xbrl_file.common import EsefData
+from arelle import Validate
+from arelle.DisclosureSystem import DisclosureSystem
+from arelle.ModelFormulaObject import FormulaOptions
+import pandas as pd
+import pytest
+
+from pyesef.download.slim_archive import slim_package
+from pyesef.parse_xbrl_file.common import (
+    Controller,
+    EsefData,
+    ExtractionEngine,
+    add_plugin_modules,
+    load_model_xbrl,
+)
+from pyesef.parse_xbrl_file.ledger import FailureClass, ProcessingLedger, file_sha256
 from pyesef.parse_xbrl_file.read_and_save_filings import (
+    ParseListData,
+    ParseResult,
     ReadFiling,
     data_list_to_clean_df,
+    score_statement_roles,
 )
+from pyesef.parse_xbrl_file.read_xbrl_json import json_report_path
 from pyesef.parse_xbrl_file.save_excel import SaveToExcel
+from pyesef.parse_xbrl_file.statement_index import StatementDefinitionIndex
+from pyesef.parse_xbrl_file.triage import TriageCache
+
+from tests.common import (
+    PATH_SAMPLE_FILING_JSON,
+    add_non_xbrl_files,
+    build_sample_filing_zip,
+)
 
 
 def test_data_list_to_clean_df__drop_duplicates() -> None:
@@ -47,6 +80,74 @@ def test_data_list_to_clean_df__drop_duplicates() -> None:
     assert len(function_result) == 1
 
 
+def test_data_list_to_clean_df__flags() -> None:
+    """Test that the statement flag columns match the EsefData properties."""
+    data_list = [
+        EsefData(
+            period_end=date(2023, 12, 31),
+            lei="lei123",
+            wider_anchor_or_xml_name=wider_anchor_or_xml_name,
+            xml_name=wider_anchor_or_xml_name,
+            value=idx + 1,
+            wider_anchor=None,
+            membership=membership,
+            label=None,
+            currency="SEK",
+            is_company_defined=False,
+            level_1=level_1,
+        )
+        for idx, (wider_anchor_or_xml_name, membership, level_1) in enumerate(
+            [
+                ("Assets", None, None),
+                ("Assets", "RetainedEarningsMember", None),
+                ("Inventories", None, "BalanceSheet"),
+                ("ProfitLoss", None, "IncomeStatement"),
+                ("CashFlowsFromUsedInOperatingActivities", None, "CashFlow"),
+                ("DividendsPaid", None, "ChangesEquity"),
+                ("Goodwill", None, None),
+            ]
+        )
+    ]
+
+    function_result = data_list_to_clean_df(data_list=data_list)
+
+    for flag in EsefData.__add_to_dict__:
+        assert function_result[flag].tolist() == [
+            getattr(data, flag) for data in data_list
+        ], flag
+
+
+def test_score_statement_roles() -> None:
+    """Test that every role is scored against every statement in one pass."""
+    role_scores = score_statement_roles(
+        role_concept_map={
+            "http://example.com/role/Income": {"{ns}Revenue", "{ns}ProfitLoss"},
+            "http://example.com/role/Balance": {"{ns}Assets", "{ns}ProfitLoss"},
+            "http://example.com/role/Other": {"{ns}ProfitLoss"},
+        },
+        statement_index=StatementDefinitionIndex.from_dict(
+            {
+                "BalanceSheet": ["{ns}Assets"],
+                "CashFlow": ["{ns}ProfitLoss"],
+                "ChangesEquity": [],
+                "IncomeStatement": ["{ns}Revenue", "{ns}ProfitLoss"],
+            }
+        ),
+    )
+
+    assert role_scores.statement_base_name.balance_sheet == "Balance"
+    # Ties go to the first role
+    assert role_scores.statement_base_name.cash_flow == "Income"
+    assert role_scores.statement_base_name.changes_equity == ""
+    assert role_scores.statement_base_name.income_statement == "Income"
+    assert role_scores.score_matrix["http://example.com/role/Balance"] == {
+        "BalanceSheet": 1,
+        "CashFlow": 1,
+        "ChangesEquity": 0,
+        "IncomeStatement": 1,
+    }
+
+
 def test_read_and_save_filings() -> None:
     """Test read_and_save_filings."""
     with patch(
@@ -55,3 +156,317 @@ def test_read_and_save_filings() -> None:
     ):
         ReadFiling(should_move_parsed_file=False)
         assert os.path.exists(SaveToExcel.TEMPLATE_OUTPUT_PATH_EXCEL)
+
+
+def _pop_output_sheets() -> dict[str, pd.DataFrame]:
+    """Read all sheets of the output file and remove it."""
+    sheets = pd.read_excel(SaveToExcel.TEMPLATE_OUTPUT_PATH_EXCEL, sheet_name=None)
+    os.remove(SaveToExcel.TEMPLATE_OUTPUT_PATH_EXCEL)
+    return sheets
+
+
+def _assert_same_sheets(
+    expected: dict[str, pd.DataFrame], actual: dict[str, pd.DataFrame]
+) -> None:
+    """Assert that two outputs have identical sheets."""
+    assert expected.keys() == actual.keys()
+    for sheet_name, df_expected in expected.items():
+        pd.testing.assert_frame_equal(df_expected, actual[sheet_name])
+
+
+@pytest.mark.usefixtures("offline_controller", "sample_archive")
+def test_read_and_save_filings__parallel() -> None:
+    """Test that parsing with a process pool gives the same output as serially."""
+    ReadFiling(should_move_parsed_file=False)
+    serial_sheets = _pop_output_sheets()
+
+    ReadFiling(should_move_parsed_file=False, jobs=2)
+    parallel_sheets = _pop_output_sheets()
+
+    assert len(serial_sheets["Data"]) == 45
+    _assert_same_sheets(serial_sheets, parallel_sheets)
+
+
+@pytest.mark.usefixtures("offline_controller", "sample_archive")
+def test_read_and_save_filings__warm_session() -> None:
+    """Test that a warm session prepares once and gives the same output."""
+    ReadFiling(should_move_parsed_file=False)
+    cold_sheets = _pop_output_sheets()
+
+    with patch(
+        "arelle.DisclosureSystem.DisclosureSystem.select",
+        autospec=True,
+        side_effect=DisclosureSystem.select,
+    ) as mock_select:
+        ReadFiling(should_move_parsed_file=False, warm_session=True)
+
+    assert mock_select.call_count == 1
+    _assert_same_sheets(cold_sheets, _pop_output_sheets())
+
+
+class _MessageCodeHandler(logging.Handler):
+    """Collect the message codes Arelle logs."""
+
+    def __init__(self) -> None:
+        """Init class."""
+        super().__init__()
+        self.code_list: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Collect the message code of a record."""
+        self.code_list.append(getattr(record, "messageCode", ""))
+
+
+def _validation_code_list(cntlr: Controller, zip_file_path: str) -> list[str]:
+    """Load and validate a filing, returning the codes of the messages logged."""
+    handler = _MessageCodeHandler()
+    cntlr.logger.addHandler(handler)
+    try:
+        model_xbrl = load_model_xbrl(zip_file_path=zip_file_path, cntlr=cntlr)
+        Validate.validate(model_xbrl)
+        model_xbrl.close()
+    finally:
+        cntlr.logger.removeHandler(handler)
+    return sorted(handler.code_list)
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_warm_session__validation(tmp_path: str) -> None:
+    """Test that a warm session runs the same ESEF checks as a cold session."""
+    zip_file_path = build_sample_filing_zip(os.path.join(tmp_path, "sample.zip"))
+    cold_cntlr = Controller()
+    warm_cntlr = Controller(warm_session=True)
+    add_plugin_modules()
+
+    code_list_by_session: dict[bool, list[list[str]]] = {}
+    for cntlr in (cold_cntlr, warm_cntlr):
+        cntlr.modelManager.formulaOptions = FormulaOptions()
+        code_list_by_session[cntlr.warm_session] = [
+            _validation_code_list(cntlr, zip_file_path) for _ in range(2)
+        ]
+
+    cold_code_list = code_list_by_session[False][0]
+    assert any(code.startswith("ESEF.") for code in cold_code_list)
+    assert code_list_by_session[False][1] == cold_code_list
+    assert code_list_by_session[True] == [cold_code_list] * 2
+
+    # The ESEF formula linkbases are only skipped when not validating
+    formula_url = "http://www.esma.europa.eu/taxonomy/2022-03-24/esef_cor-for.xml"
+    assert warm_cntlr.modelManager.skipLoading.match(formula_url) is None
+    fast_cntlr = Controller(warm_session=True, validate=False)
+    add_plugin_modules(validate=False)
+    load_model_xbrl(zip_file_path=zip_file_path, cntlr=fast_cntlr).close()
+    assert fast_cntlr.modelManager.skipLoading.match(formula_url) is not None
+
+
+@pytest.mark.usefixtures("offline_controller", "sample_archive")
+def test_read_and_save_filings__no_validation() -> None:
+    """Test that the fast profile gives the same output as the strict profile."""
+    ReadFiling(should_move_parsed_file=False)
+    strict_sheets = _pop_output_sheets()
+
+    ReadFiling(should_move_parsed_file=False, validate=False)
+
+    _assert_same_sheets(strict_sheets, _pop_output_sheets())
+
+
+@pytest.mark.usefixtures("offline_controller", "sample_archive")
+def test_read_and_save_filings__lxml_engine() -> None:
+    """Test that the lxml engine gives the same output as Arelle."""
+    ReadFiling(should_move_parsed_file=False)
+    arelle_sheets = _pop_output_sheets()
+
+    with patch(
+        "pyesef.parse_xbrl_file.read_and_save_filings.load_model_xbrl",
+        wraps=load_model_xbrl,
+    ) as mock_load:
+        ReadFiling(should_move_parsed_file=False, engine=ExtractionEngine.LXML)
+
+    # Only the first file is loaded with Arelle, to extract the definitions
+    assert mock_load.call_count == 1
+    _assert_same_sheets(arelle_sheets, _pop_output_sheets())
+
+
+@pytest.mark.usefixtures("offline_controller", "sample_archive")
+def test_read_and_save_filings__lxml_engine__label_language() -> None:
+    """Test that the lxml engine picks labels in the language Arelle does."""
+    original_init = Controller.__init__
+
+    def _init(self: Controller, *args: Any, **kwargs: Any) -> None:
+        original_init(self, *args, **kwargs)
+        self.modelManager.defaultLang = "sv-SE"
+
+    with patch.object(Controller, "__init__", _init):
+        ReadFiling(should_move_parsed_file=False)
+        arelle_sheets = _pop_output_sheets()
+        ReadFiling(should_move_parsed_file=False, engine=ExtractionEngine.LXML)
+
+    lxml_sheets = _pop_output_sheets()
+    _assert_same_sheets(arelle_sheets, lxml_sheets)
+    assert any(
+        (df == "Övriga rörelseintäkter").any().any() for df in lxml_sheets.values()
+    )
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_read_and_save_filings__json_engine(sample_archive: str) -> None:
+    """Test that the json engine gives the same output as Arelle."""
+    ReadFiling(should_move_parsed_file=False)
+    arelle_sheets = _pop_output_sheets()
+
+    for zip_file_path in Path(sample_archive).rglob("*.zip"):
+        shutil.copy(PATH_SAMPLE_FILING_JSON, json_report_path(str(zip_file_path)))
+
+    with (
+        patch(
+            "pyesef.parse_xbrl_file.read_and_save_filings.load_model_xbrl",
+            wraps=load_model_xbrl,
+        ) as mock_load,
+        patch(
+            "pyesef.parse_xbrl_file.read_and_save_filings.read_inline_xbrl_package"
+        ) as mock_read_inline,
+    ):
+        read_filing = ReadFiling(
+            should_move_parsed_file=False, engine=ExtractionEngine.JSON
+        )
+
+    # Only the first file is loaded with Arelle, to extract the definitions, and the
+    # other two share their extension taxonomy
+    assert mock_load.call_count == 1
+    mock_read_inline.assert_not_called()
+    assert read_filing.taxonomy_cache.miss_count == 1
+    assert read_filing.taxonomy_cache.hit_count == 1
+    _assert_same_sheets(arelle_sheets, _pop_output_sheets())
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_read_and_save_filings__slim(sample_archive: str) -> None:
+    """Test that slim packages give the same output as the original packages."""
+    zip_file_path_list = sorted(Path(sample_archive).rglob("*.zip"))
+    for zip_file_path in zip_file_path_list:
+        add_non_xbrl_files(str(zip_file_path))
+
+    ReadFiling(should_move_parsed_file=False)
+    original_sheets = _pop_output_sheets()
+
+    for zip_file_path in zip_file_path_list:
+        slim_package(str(zip_file_path), file_sha256(str(zip_file_path)))
+
+    ReadFiling(should_move_parsed_file=False)
+
+    _assert_same_sheets(original_sheets, _pop_output_sheets())
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_read_and_save_filings__triage(sample_archive: str, tmp_path: str) -> None:
+    """Test that rejects aren't loaded and entrypoints aren't discovered again."""
+    no_report_path = os.path.join(sample_archive, "SE", "no-report.zip")
+    with zipfile.ZipFile(no_report_path, "w") as zip_file:
+        zip_file.writestr("sample/reports/annual-report.pdf", b"%PDF")
+    cache_path = os.path.join(tmp_path, "triage.jsonl")
+    ledger_path = os.path.join(tmp_path, "ledger.jsonl")
+
+    with patch(
+        "pyesef.parse_xbrl_file.read_and_save_filings.load_model_xbrl",
+        wraps=load_model_xbrl,
+    ) as mock_load:
+        ReadFiling(
+            ledger=ProcessingLedger(ledger_path), triage_cache=TriageCache(cache_path)
+        )
+    discovered_sheets = _pop_output_sheets()
+
+    # The reject never reaches Arelle, the copies of the sample filing are loaded once
+    assert mock_load.call_count == 1
+    ledger = ProcessingLedger(ledger_path)
+    assert {entry.failure_class for entry in ledger.entry_by_sha256.values()} == {
+        None,
+        FailureClass.INVALID_PACKAGE,
+    }
+
+    triage_list = list(TriageCache(cache_path).triage_by_sha256.values())
+    assert len(triage_list) == 1
+    triage = triage_list[0]
+    assert triage.entrypoint is not None
+    assert triage.entrypoint.is_inline
+    assert triage.entrypoint.member_list == triage.report_member_list
+
+    os.remove(ledger_path)
+    with patch(
+        "pyesef.parse_xbrl_file.common.filesourceEntrypointFiles"
+    ) as mock_discover:
+        ReadFiling(
+            ledger=ProcessingLedger(ledger_path), triage_cache=TriageCache(cache_path)
+        )
+
+    mock_discover.assert_not_called()
+    _assert_same_sheets(discovered_sheets, _pop_output_sheets())
+
+
+@pytest.mark.usefixtures("offline_controller")
+def test_read_and_save_filings__in_memory(sample_archive: str, tmp_path: str) -> None:
+    """Test that packages parsed from memory give the same output as from disk."""
+    ReadFiling(ledger=ProcessingLedger(os.path.join(tmp_path, "path-ledger.jsonl")))
+    path_sheets = _pop_output_sheets()
+    assert len(path_sheets["Data"]) == 15
+
+    parse_list = [
+        ParseListData(
+            zip_file_path=str(zip_file_path),
+            language_code=zip_file_path.parent.name,
+            content=zip_file_path.read_bytes(),
+        )
+        for zip_file_path in sorted(Path(sample_archive).rglob("*.zip"))
+    ]
+    # Nothing is read from or moved on disk
+    shutil.rmtree(sample_archive)
+
+    ledger_path = os.path.join(tmp_path, "ledger.jsonl")
+    read_filing = ReadFiling(
+        should_move_parsed_file=True,
+        ledger=ProcessingLedger(ledger_path),
+        package_source=iter(parse_list),
+    )
+
+    # The copies of the sample filing are parsed once, known by their content
+    assert read_filing.skipped_file_count == 2
+    assert list(ProcessingLedger(ledger_path).entry_by_sha256) == [
+        hashlib.sha256(cast(bytes, parse_list[0].content)).hexdigest()
+    ]
+    _assert_same_sheets(path_sheets, _pop_output_sheets())
+
+
+@pytest.mark.usefixtures("offline_controller", "sample_archive")
+def test_read_and_save_filings__stream_failure(tmp_path: str) -> None:
+    """Test that a failing worker stops the pool and closes the package source."""
+    closed_list: list[bool] = []
+
+    def _package_source() -> Iterator[ParseListData]:
+        try:
+            for idx in range(10):
+                yield ParseListData(
+                    zip_file_path=build_sample_filing_zip(
+                        os.path.join(tmp_path, f"package-{idx}.zip")
+                    ),
+                    language_code="SE",
+                )
+        finally:
+            closed_list.append(True)
+
+    original_parse_file = ReadFiling.parse_file
+
+    def _parse_file(
+        self: ReadFiling, parse_list_data: ParseListData, **kwargs: Any
+    ) -> ParseResult:
+        if parse_list_data.zip_file_path.endswith("package-0.zip"):
+            raise RuntimeError("Worker failed")
+        return original_parse_file(self, parse_list_data=parse_list_data, **kwargs)
+
+    # The feeder waits for a free slot when the first package fails, which must not
+    # keep the pool from stopping
+    with (
+        patch.object(ReadFiling, "parse_file", _parse_file),
+        pytest.raises(RuntimeError, match="Worker failed"),
+    ):
+        ReadFiling(jobs=2, package_source=_package_source())
+
+    assert closed_list == [True]
@@ -4,24 +4,17 @@ from datetime import datetime
 from unittest.mock import Mock, patch
 
 from pyesef.parse_xbrl_file.read_facts import (
+    StatementBaseName,
+    _get_concept_attributes,
+    _get_context_attributes,
     _get_is_extension,
-    _get_label,
     _get_legal_name,
     _get_membership,
     _get_period_end,
+    facts_to_data_list,
 )
 
 
-def test_get_label():
-    """Test function _get_label."""
-    property_view = (
-        ("a", "b"),
-        ("label", "bb"),
-        ("c", "c"),
-    )
-    assert _get_label(property_view) == "bb"
-
-
 def test_get_is_extension():
     """Test function _get_is_extension."""
     assert _get_is_extension("US GAAP") is True
@@ -110,3 +103,42 @@ def test_get_legal_name__none(_mock_data):
     facts = []
     result = _get_legal_name(facts)
     assert result is None
+
+
+def test_facts_to_data_list__memo(sample_model_xbrl):
+    """Test that concept and context attributes are worked out once per filing."""
+    with (
+        patch(
+            "pyesef.parse_xbrl_file.read_facts._get_concept_attributes",
+            wraps=_get_concept_attributes,
+        ) as mock_concept,
+        patch(
+            "pyesef.parse_xbrl_file.read_facts._get_context_attributes",
+            wraps=_get_context_attributes,
+        ) as mock_context,
+    ):
+        fact_list = facts_to_data_list(
+            model_xbrl=sample_model_xbrl,
+            to_model_to_linkrole_map={"Revenue": "IncomeStatement"},
+            statement_base_name=StatementBaseName(
+                balance_sheet="BalanceSheet",
+                cash_flow="CashFlow",
+                income_statement="IncomeStatement",
+                changes_equity="ChangesEquity",
+            ),
+        )
+
+    assert len(fact_list) == 15
+    assert mock_concept.call_count == 7
+    assert mock_context.call_count == 5
+
+    other_income = next(
+        fact for fact in fact_list if fact.xml_name == "OtherOperatingIncome"
+    )
+    assert other_income.label == "Other operating income"
+    assert other_income.wider_anchor_or_xml_name == "Revenue"
+    assert other_income.is_company_defined
+    assert {fact.membership for fact in fact_list} == {None, "RetainedEarningsMember"}
+    assert {fact.level_1 for fact in fact_list if fact.xml_name == "Revenue"} == {
+        "IncomeStatement"
+    }
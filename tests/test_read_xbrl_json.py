@@ -0,0 +1,159 @@
+"""Tests for reading xBRL-JSON reports."""
+
+from datetime import date
+from decimal import Decimal
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from pyesef.error import PyEsefError
+from pyesef.parse_xbrl_file.read_facts import StatementBaseName
+from pyesef.parse_xbrl_file.read_inline_xbrl import read_inline_xbrl_package
+from pyesef.parse_xbrl_file.read_xbrl_json import (
+    ExtensionTaxonomyCache,
+    json_report_path,
+    read_xbrl_json,
+)
+
+from tests.common import PATH_SAMPLE_FILING_JSON, build_sample_filing_zip
+
+
+def _report(fact_map: dict) -> io.BytesIO:
+    """Return an xBRL-JSON report with the given facts."""
+    return io.BytesIO(
+        json.dumps(
+            {
+                "documentInfo": {
+                    "documentType": "https://xbrl.org/2021/xbrl-json",
+                    "namespaces": {"ifrs-full": "http://xbrl.ifrs.org/ifrs-full"},
+                },
+                "facts": fact_map,
+            }
+        ).encode()
+    )
+
+
+def test_read_xbrl_json() -> None:
+    """Test that numeric facts are read with their context and unit."""
+    package = read_xbrl_json(
+        _report(
+            {
+                "f1": {
+                    "value": "0.5",
+                    "dimensions": {
+                        "xbrl:concept": "ifrs-full:BasicEarningsLossPerShare",
+                        "xbrl:entity": "lei:LEI123",
+                        "xbrl:period": "2023-01-01T00:00:00/2024-01-01T00:00:00",
+                        "xbrl:unit": "iso4217:EUR/xbrli:shares",
+                    },
+                },
+                "f2": {
+                    "value": None,
+                    "decimals": -3,
+                    "dimensions": {
+                        "concept": "ifrs-full:Equity",
+                        "entity": "lei:LEI123",
+                        "period": "2024-01-01T00:00:00",
+                        "unit": "iso4217:EUR",
+                        "ifrs-full:ComponentsOfEquityAxis": (
+                            "ifrs-full:RetainedEarningsMember"
+                        ),
+                    },
+                },
+                "f3": {
+                    "value": "Company name",
+                    "dimensions": {
+                        "concept": "ifrs-full:NameOfReportingEntity",
+                        "entity": "lei:LEI123",
+                        "period": "2024-01-01T00:00:00",
+                    },
+                },
+            }
+        )
+    )
+
+    # Facts without a unit aren't numeric
+    assert [fact.name for fact in package.facts] == [
+        "ifrs-full:BasicEarningsLossPerShare",
+        "ifrs-full:Equity",
+    ]
+    assert package.facts[0].decimals is None
+    assert package.facts[1].value is None
+    assert package.facts[1].decimals == "-3"
+
+    assert package.contexts["f1"].lei == "LEI123"
+    assert package.contexts["f1"].period_end == date(2023, 12, 31)
+    assert package.contexts["f1"].scenario is None
+    assert package.contexts["f2"].scenario == "ifrs-full:RetainedEarningsMember"
+
+    assert package.units["iso4217:EUR/xbrli:shares"].value == "EUR / shares"
+    assert package.units["iso4217:EUR/xbrli:shares"].is_shares
+    assert not package.units["iso4217:EUR"].is_shares
+
+    with pytest.raises(PyEsefError):
+        read_xbrl_json(io.BytesIO(b"{}"))
+
+
+def test_extension_taxonomy_cache(tmp_path: Path) -> None:
+    """Test that a taxonomy is read once for packages that share it."""
+    report = read_xbrl_json(PATH_SAMPLE_FILING_JSON)
+    first = build_sample_filing_zip(str(tmp_path / "first.zip"))
+    second = build_sample_filing_zip(str(tmp_path / "second.zip"), top_folder="other")
+
+    cache = ExtensionTaxonomyCache(max_size=1)
+    taxonomy = cache.get(first, namespaces=report.namespaces)
+    assert cache.get(second, namespaces=report.namespaces) is taxonomy
+    assert (cache.miss_count, cache.hit_count) == (1, 1)
+
+    assert taxonomy.package.has_linkbases
+    assert not taxonomy.package.facts
+    assert taxonomy.linkrole_by_concept["Revenue"] == "IncomeStatement"
+    assert json_report_path(first) == str(tmp_path / "first.json")
+
+
+def test_extension_taxonomy__base_labels(tmp_path: Path) -> None:
+    """Test that base concepts of a package without their labels are labelled."""
+    report = read_xbrl_json(PATH_SAMPLE_FILING_JSON)
+    zip_file_path = build_sample_filing_zip(str(tmp_path / "package.zip"))
+    taxonomy = ExtensionTaxonomyCache().get(zip_file_path, namespaces=report.namespaces)
+    statement_base_name = StatementBaseName(
+        balance_sheet="BalanceSheet",
+        cash_flow="",
+        income_statement="IncomeStatement",
+        changes_equity="",
+    )
+
+    # The sample filing doesn't bundle the labels of its base taxonomy
+    assert taxonomy.package.base_schema_urls[-1] == (
+        "http://xbrl.ifrs.org/taxonomy/2021-03-24/ifrs-full.xsd"
+    )
+    assert "ifrs-full:Revenue" not in taxonomy.package.labels
+
+    data_list = taxonomy.facts_to_data_columns(
+        report=report,
+        statement_base_name=statement_base_name,
+        base_labels={
+            "{http://xbrl.ifrs.org/taxonomy/2021-03-24/ifrs-full}Revenue": "Revenue"
+        },
+    ).to_data_list()
+    label_by_name = {data.xml_name: data.label for data in data_list}
+    assert label_by_name["Revenue"] == "Revenue"
+    assert label_by_name["OtherOperatingIncome"] == "Other operating income"
+    # Base concepts without a label keep their name, like Arelle labels them
+    assert label_by_name["ProfitLoss"] == "ifrs-full:ProfitLoss"
+
+    # Canonical values have a fraction, they are the same numbers as those reported
+    inline_value_by_key = {
+        (data.xml_name, data.period_end, data.membership): data.value
+        for data in taxonomy.facts_to_data_columns(
+            report=read_inline_xbrl_package(zip_file_path),
+            statement_base_name=statement_base_name,
+        ).to_data_list()
+    }
+    assert {
+        (data.xml_name, data.period_end, data.membership): data.value
+        for data in data_list
+    } == inline_value_by_key
+    assert Decimal(1234000) in {data.value for data in data_list}
@@ -0,0 +1,181 @@
+"""Tests for the retry decorator."""
+
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from pyesef.utils.decorators import (
+    CircuitBreaker,
+    RetryStats,
+    is_retryable_error,
+    retry,
+    retry_after_seconds,
+)
+
+
+def _http_error(status_code: int, headers: dict[str, str] | None = None) -> Exception:
+    """Return the error raised for a response with a status code."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status_code}", response=response)
+
+
+def _failing(error_list: list[Exception]) -> Mock:
+    """Return a function that raises the errors in turn, then returns "done"."""
+    return Mock(side_effect=[*error_list, "done"])
+
+
+def test_is_retryable_error() -> None:
+    """Test which errors are retried."""
+    assert is_retryable_error(_http_error(429))
+    assert is_retryable_error(_http_error(503))
+    assert not is_retryable_error(_http_error(404))
+    assert is_retryable_error(requests.ConnectionError())
+    assert is_retryable_error(ConnectionError("Download stopped"))
+    assert is_retryable_error(TimeoutError())
+    assert is_retryable_error(MemoryError())
+    assert not is_retryable_error(requests.exceptions.InvalidURL())
+    assert not is_retryable_error(OSError("No space left on device"))
+    assert not is_retryable_error(FileNotFoundError())
+    assert not is_retryable_error(IsADirectoryError())
+    assert not is_retryable_error(ValueError())
+
+
+def test_retry_backoff_and_retry_after() -> None:
+    """Test that waits grow exponentially and honour Retry-After."""
+    func = _failing(
+        [
+            requests.ConnectionError(),
+            requests.ConnectionError(),
+            _http_error(429, {"Retry-After": "30"}),
+        ]
+    )
+    stats = RetryStats()
+    wrapped = retry(
+        num_attempts=4, backoff=2.0, retry_if=is_retryable_error, stats=stats
+    )(func)
+
+    with patch("pyesef.utils.decorators.sleep") as mock_sleep:
+        assert wrapped() == "done"
+
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [1.0, 2.0, 30.0]
+    assert stats.call_count == 1
+    assert stats.attempt_count == 4
+    assert stats.retry_count == 3
+    assert stats.retry_after_count == 1
+    assert stats.sleep_seconds == 33.0
+    assert stats.error_count_by_type == {"ConnectionError": 2, "HTTPError": 1}
+    assert retry_after_seconds(_http_error(503, {"Retry-After": "soon"})) is None
+
+
+def test_retry_defaults() -> None:
+    """Test that the wait is always sleeptime unless backoff is asked for."""
+    with patch("pyesef.utils.decorators.sleep") as mock_sleep:
+        retry(num_attempts=4, sleeptime=2)(_failing([OSError()] * 3))()
+
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [2, 2, 2]
+
+
+def test_retry_after_too_long() -> None:
+    """Test that a Retry-After longer than the maximum fails the call."""
+    stats = RetryStats()
+    func = _failing([_http_error(429, {"Retry-After": "301"})])
+    with (
+        patch("pyesef.utils.decorators.sleep") as mock_sleep,
+        pytest.raises(requests.HTTPError),
+    ):
+        retry(max_retry_after=300, retry_if=is_retryable_error, stats=stats)(func)()
+
+    mock_sleep.assert_not_called()
+    assert func.call_count == 1
+    assert stats.failure_count == 1
+
+    func = _failing([_http_error(429, {"Retry-After": "300"})])
+    with patch("pyesef.utils.decorators.sleep") as mock_sleep:
+        assert retry(max_retry_after=300, retry_if=is_retryable_error)(func)() == "done"
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [300.0]
+
+
+def test_retry_jitter() -> None:
+    """Test that jitter only shortens the wait, up to the given share."""
+    with patch("pyesef.utils.decorators.sleep") as mock_sleep:
+        for _ in range(20):
+            retry(num_attempts=2, sleeptime=4, jitter=0.5)(_failing([OSError()]))()
+
+    sleep_list = [call.args[0] for call in mock_sleep.call_args_list]
+    assert all(2.0 <= seconds <= 4.0 for seconds in sleep_list)
+    assert len(set(sleep_list)) > 1
+
+
+def test_retry_gives_up() -> None:
+    """Test that errors that aren't retryable, and the last attempt, are raised."""
+    stats = RetryStats()
+    func = _failing([_http_error(404)])
+    with patch("pyesef.utils.decorators.sleep"), pytest.raises(requests.HTTPError):
+        retry(retry_if=is_retryable_error, stats=stats)(func)()
+    assert func.call_count == 1
+
+    func = _failing([OSError(), OSError(), OSError()])
+    wrapped = retry(num_attempts=3)(func)
+    with patch("pyesef.utils.decorators.sleep"), pytest.raises(OSError):
+        wrapped()
+    assert func.call_count == 3
+    assert wrapped.retry_stats.failure_count == 1  # type: ignore[attr-defined]
+    assert stats.failure_count == 1
+
+
+def test_circuit_breaker() -> None:
+    """Test that the breaker pauses all callers when most attempts fail."""
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_rate=0.5,
+        window_size=4,
+        min_calls=4,
+        pause_seconds=10.0,
+        clock=lambda: now[0],
+    )
+    first = retry(num_attempts=3, jitter=0.0, circuit_breaker=breaker)(
+        _failing([OSError(), OSError()])
+    )
+    second = retry(num_attempts=2, jitter=0.0, circuit_breaker=breaker)(
+        _failing([OSError()])
+    )
+
+    with patch("pyesef.utils.decorators.sleep") as mock_sleep:
+        assert first() == "done"
+        assert not breaker.is_open
+        # The fourth attempt makes three failures out of four
+        assert second() == "done"
+
+    assert breaker.trip_count == 1
+    assert breaker.is_open
+    assert breaker.remaining_seconds == 10.0
+
+    with patch("pyesef.utils.decorators.sleep") as mock_sleep:
+        assert retry(circuit_breaker=breaker)(Mock(return_value="done"))() == "done"
+    mock_sleep.assert_called_once_with(10.0)
+
+    now[0] = 10.0
+    assert not breaker.is_open
+
+
+def test_retry_async() -> None:
+    """Test that coroutine functions are retried without blocking the loop."""
+    call_list: list[int] = []
+
+    @retry(num_attempts=3, jitter=0.0, sleeptime=0.01)
+    async def fetch() -> str:
+        call_list.append(1)
+        if len(call_list) < 3:
+            raise OSError("Connection reset")
+        return "done"
+
+    with patch("pyesef.utils.decorators.sleep") as mock_sleep:
+        assert asyncio.run(fetch()) == "done"
+
+    mock_sleep.assert_not_called()
+    assert len(call_list) == 3
+    assert fetch.retry_stats.retry_count == 2  # type: ignore[attr-defined]
@@ -0,0 +1,109 @@
+"""Tests for slim packages."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from unittest.mock import patch
+import zipfile
+
+import pytest
+
+from pyesef.download.archive_store import ArchiveStore
+from pyesef.download.slim_archive import slim_package, slim_store
+from pyesef.parse_xbrl_file.ledger import (
+    SLIM_COMMENT_PREFIX,
+    ProcessingLedger,
+    slim_original_sha256,
+)
+
+from tests.common import add_non_xbrl_files, build_sample_filing_zip
+
+
+def test_slim_package(tmp_path: Path) -> None:
+    """Test that only the files XBRL needs are kept, naming the original hash."""
+    zip_file_path = build_sample_filing_zip(str(tmp_path / "package.zip"))
+    add_non_xbrl_files(zip_file_path)
+    with open(zip_file_path, "rb") as _file:
+        sha256 = hashlib.sha256(_file.read()).hexdigest()
+    with zipfile.ZipFile(zip_file_path) as zip_file:
+        name_list = zip_file.namelist()
+
+    result = slim_package(zip_file_path, sha256)
+
+    assert result.dropped_count == 3
+    assert result.saved_bytes > 0
+    with zipfile.ZipFile(zip_file_path) as zip_file:
+        assert sorted(zip_file.namelist()) == sorted(
+            name for name in name_list if not name.endswith((".png", ".pdf", ".woff2"))
+        )
+    assert slim_original_sha256(zip_file_path) == sha256
+    assert (
+        slim_original_sha256(build_sample_filing_zip(str(tmp_path / "b.zip"))) is None
+    )
+
+    # The ledger knows the package by the hash of the original
+    ledger = ProcessingLedger(str(tmp_path / "ledger.jsonl"))
+    assert ledger.package_sha256(zip_file_path) == sha256
+
+    # A slim package is left as it is
+    assert slim_package(zip_file_path, sha256).kept_count == 0
+
+
+def test_slim_store(tmp_path: Path) -> None:
+    """Test that stored packages are slimmed in place, for all their locations."""
+    archive_store = ArchiveStore(str(tmp_path / "store"))
+    zip_file_path = build_sample_filing_zip(str(tmp_path / "package.zip"))
+    add_non_xbrl_files(zip_file_path)
+    with open(zip_file_path, "rb") as _file:
+        sha256 = hashlib.sha256(_file.read()).hexdigest()
+    location = str(tmp_path / "archives" / "SE" / "package.zip")
+    archive_store.add(zip_file_path, sha256, location)
+    original_size = os.path.getsize(location)
+
+    result = slim_store(archive_store, str(tmp_path / "archives"))
+
+    assert result.dropped_count == 3
+    assert os.path.getsize(location) < original_size
+    assert os.path.samefile(location, archive_store.package_path(sha256))
+    assert not archive_store.verify_all()
+
+
+def test_slim_package__failure(tmp_path: Path) -> None:
+    """Test that a package is left as it was if its slim package can't be written."""
+    zip_file_path = build_sample_filing_zip(str(tmp_path / "package.zip"))
+    with open(zip_file_path, "rb") as _file:
+        content = _file.read()
+
+    with (
+        patch("zipfile.ZipFile.writestr", side_effect=OSError("No space left")),
+        pytest.raises(OSError),
+    ):
+        slim_package(zip_file_path, hashlib.sha256(content).hexdigest())
+
+    with open(zip_file_path, "rb") as _file:
+        assert _file.read() == content
+    assert os.listdir(tmp_path) == ["package.zip"]
+
+
+def test_slim_package__verify(tmp_path: Path) -> None:
+    """Test that a slim package whose members don't match the original is corrupt."""
+    archive_store = ArchiveStore(str(tmp_path / "store"))
+    zip_file_path = build_sample_filing_zip(str(tmp_path / "package.zip"))
+    with open(zip_file_path, "rb") as _file:
+        sha256 = hashlib.sha256(_file.read()).hexdigest()
+    archive_store.add(zip_file_path, sha256, str(tmp_path / "SE" / "package.zip"))
+    slim_package(archive_store.package_path(sha256), sha256)
+    assert archive_store.verify(sha256)
+
+    # A member that the original package didn't list, with a CRC of its content
+    with zipfile.ZipFile(archive_store.package_path(sha256), "a") as zip_file:
+        zip_file.writestr("sample/reports/other.xhtml", b"<html/>")
+    assert not archive_store.verify(sha256)
+
+    # Any package that only names the original hash
+    with zipfile.ZipFile(archive_store.package_path(sha256), "w") as zip_file:
+        zip_file.writestr("sample/reports/report.xhtml", b"<html/>")
+        zip_file.comment = f"{SLIM_COMMENT_PREFIX}{sha256}".encode()
+    assert not archive_store.verify(sha256)
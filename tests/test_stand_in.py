@@ -0,0 +1,72 @@
+"""Tests for the stand-in server and the download benchmark."""
+
+import json
+from unittest.mock import patch
+
+import requests
+
+from pyesef.download.api_extractor import FilingFilter, api_to_filing_record_list
+from pyesef.download.benchmark import benchmark_download
+from pyesef.download.http_cache import HttpCache
+from pyesef.download.stand_in import StandInConfig, serve_stand_in
+
+
+def test_stand_in_api(tmp_path) -> None:
+    """Test that the stand-in pages and filters filings like the API."""
+    config = StandInConfig(filing_count=12, package_size=1024, country_list=("SE",))
+    with serve_stand_in(config) as base_url:
+        response = requests.get(
+            f"{base_url}api/filings?page%5Bsize%5D=5&page%5Bnumber%5D=3", timeout=5
+        )
+        data = json.loads(response.content)
+        assert data["links"]["last"] == 3
+        assert len(data["data"]) == 2
+        response = requests.get(f"{base_url}api/filings?page%5Bsize%5D=a", timeout=5)
+        assert response.status_code == 400
+
+        http_cache = HttpCache(str(tmp_path))
+        filing_list = api_to_filing_record_list(
+            http_cache=http_cache,
+            filing_filter=FilingFilter(country_list=("SE",), period_end="2022-12-31"),
+            base_url=base_url,
+        )
+        assert len(filing_list) == 4
+        assert {filing.period_end for filing in filing_list} == {"2022-12-31"}
+        # The newest filings come first
+        filing_id_list = [int(filing.filing_id or 0) for filing in filing_list]
+        assert filing_id_list == sorted(filing_id_list, reverse=True)
+
+        # The second sync is answered with 304 Not Modified
+        api_to_filing_record_list(
+            http_cache=http_cache,
+            filing_filter=FilingFilter(country_list=("SE",)),
+            base_url=base_url,
+        )
+        api_to_filing_record_list(
+            http_cache=http_cache,
+            filing_filter=FilingFilter(country_list=("SE",)),
+            base_url=base_url,
+        )
+        assert http_cache.hit_count == 1
+
+
+def test_benchmark_download() -> None:
+    """Test that all packages are downloaded despite injected failures."""
+    config = StandInConfig(
+        filing_count=20,
+        package_size=200_000,
+        error_rate=0.2,
+        drop_rate=0.2,
+        throttle_rate=0.1,
+        seed=1,
+    )
+    with patch("pyesef.utils.decorators.sleep"):
+        benchmark = benchmark_download(config, max_workers=4)
+
+    assert benchmark.filing_count == 20
+    assert benchmark.download_count == 20
+    assert benchmark.failed_count == 0
+    assert benchmark.megabytes >= 20 * 0.2
+    assert benchmark.crawl_filings_per_second > 0
+    assert benchmark.download_filings_per_second > 0
+    assert benchmark.megabytes_per_second > 0
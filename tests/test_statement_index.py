@@ -0,0 +1,84 @@
+"""Tests for the statement definition index."""
+
+import hashlib
+import json
+import os
+
+from pyesef.parse_xbrl_file.load_statement_definition import (
+    UpdateStatementDefinitionJson,
+)
+from pyesef.parse_xbrl_file.statement_index import (
+    StatementDefinitionIndex,
+    load_statement_index,
+    save_statement_index,
+)
+
+
+def test_statement_index__round_trip(tmp_path: str) -> None:
+    """Test that an index file holds the same statements as its source."""
+    statement_concept_map = {
+        "BalanceSheet": ["{http://a}Assets", "{http://a/b}Assets", "{http://b}Ägare"],
+        "CashFlow": ["{http://a}ProfitLoss"],
+        "ChangesEquity": [],
+        "IncomeStatement": ["{http://a}ProfitLoss", "{http://a}Revenue"],
+    }
+    json_path = os.path.join(tmp_path, "statement_definition.json")
+    with open(json_path, "w", encoding="UTF-8") as json_file:
+        json.dump(statement_concept_map, json_file)
+    index_path = os.path.join(tmp_path, "statement_definition.idx")
+    save_statement_index(json_path, index_path)
+
+    statement_index = StatementDefinitionIndex.from_file(index_path)
+
+    assert len(statement_index) == 5
+    assert statement_index.mask("{http://a}ProfitLoss") == 0b1010
+    assert statement_index.mask("{http://a/b}Assets") == 0b0001
+    assert statement_index.mask("{http://a}Unknown") == 0
+    assert statement_index.mask("{http://a}Zzz") == 0
+    assert statement_index.mask("{http://c}Assets") == 0
+    for statement_name, concept_list in statement_concept_map.items():
+        assert statement_index.statement_concepts(statement_name) == set(concept_list)
+    assert statement_index.score(
+        ["{http://a}ProfitLoss", "{http://b}Ägare", "{http://a}Unknown"]
+    ) == {"BalanceSheet": 1, "CashFlow": 1, "ChangesEquity": 0, "IncomeStatement": 1}
+
+
+def test_statement_index__matches_json() -> None:
+    """Test that the shipped index is up to date with the JSON definitions."""
+    with open(UpdateStatementDefinitionJson.PATH_JSON_MAP_FILE, "rb") as json_file:
+        content = json_file.read()
+    statement_concept_map = json.loads(content)
+
+    statement_index = StatementDefinitionIndex.from_file(
+        UpdateStatementDefinitionJson.PATH_INDEX_FILE
+    )
+
+    assert statement_index.json_sha256 == hashlib.sha256(content).digest()
+
+    for statement_name, concept_list in statement_concept_map.items():
+        assert statement_index.statement_concepts(statement_name) == set(concept_list)
+
+
+def test_load_statement_index__stale_index(tmp_path: str) -> None:
+    """Test that the JSON file is used when the index is missing or out of date."""
+    json_path = os.path.join(tmp_path, "statement_definition.json")
+    index_path = os.path.join(tmp_path, "statement_definition.idx")
+    with open(json_path, "w", encoding="UTF-8") as json_file:
+        json.dump({"CashFlow": ["{http://a}ProfitLoss"]}, json_file)
+
+    statement_index = load_statement_index(
+        index_path=os.path.join(tmp_path, "missing.idx"), json_path=json_path
+    )
+    assert statement_index.statement_concepts("CashFlow") == {"{http://a}ProfitLoss"}
+
+    save_statement_index(json_path, index_path)
+    statement_index = load_statement_index(index_path=index_path, json_path=json_path)
+    assert statement_index.json_sha256 != bytes(32)
+
+    # A checkout can leave the index newer than a changed JSON file
+    with open(json_path, "w", encoding="UTF-8") as json_file:
+        json.dump({"CashFlow": ["{http://a}Revenue"]}, json_file)
+    os.utime(json_path, (0, 0))
+
+    statement_index = load_statement_index(index_path=index_path, json_path=json_path)
+    assert statement_index.statement_concepts("CashFlow") == {"{http://a}Revenue"}
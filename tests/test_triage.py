@@ -0,0 +1,64 @@
+"""Tests for the triage of packages."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import zipfile
+
+import pytest
+
+from pyesef.error import InvalidPackageError
+from pyesef.parse_xbrl_file.triage import TriageCache, triage_package
+
+from tests.common import add_non_xbrl_files, build_sample_filing_zip
+
+
+def test_triage_package(tmp_path: Path) -> None:
+    """Test that the report documents are found and unusable packages rejected."""
+    zip_file_path = build_sample_filing_zip(str(tmp_path / "package.zip"))
+    add_non_xbrl_files(zip_file_path)
+    with zipfile.ZipFile(zip_file_path, "a") as zip_file:
+        zip_file.writestr(
+            "sample/META-INF/reportPackage.json",
+            json.dumps(
+                {
+                    "documentInfo": {
+                        "documentType": "https://xbrl.org/report-package/2023/xbri"
+                    }
+                }
+            ),
+        )
+        report_info = zip_file.getinfo("sample/reports/sample-2022-12-31.xhtml")
+
+    triage = triage_package(zip_file_path)
+    assert triage.report_member_list == ["sample/reports/sample-2022-12-31.xhtml"]
+    assert triage.report_size == report_info.file_size
+    assert triage.document_type == "https://xbrl.org/report-package/2023/xbri"
+    assert triage.has_taxonomy_package
+
+    with open(tmp_path / "not-a-zip.zip", "wb") as not_a_zip:
+        not_a_zip.write(b"not a zip file")
+    with zipfile.ZipFile(tmp_path / "no-report.zip", "w") as zip_file:
+        zip_file.writestr("sample/reports/annual-report.pdf", b"%PDF")
+    with zipfile.ZipFile(tmp_path / "empty-report.zip", "w") as zip_file:
+        zip_file.writestr("sample/reports/report.xhtml", b"")
+
+    for file_name in ("not-a-zip.zip", "no-report.zip", "empty-report.zip"):
+        with pytest.raises(InvalidPackageError):
+            triage_package(str(tmp_path / file_name))
+
+
+def test_triage_cache__bad_lines(tmp_path: Path) -> None:
+    """Test that torn lines and lines of other versions are skipped."""
+    cache_path = str(tmp_path / "triage.jsonl")
+    triage = triage_package(build_sample_filing_zip(str(tmp_path / "package.zip")))
+    TriageCache(cache_path).add("abc", triage)
+    with open(cache_path, "a", encoding="UTF-8") as cache_file:
+        cache_file.write('{"sha256": "def", "renamed_field": []}\n')
+        cache_file.write("[]\n")
+        cache_file.write('{"sha256": "ghi", "report_member_list": ["sam')
+
+    cache = TriageCache(cache_path)
+    assert cache.get("abc") == triage
+    assert list(cache.triage_by_sha256) == ["abc"]